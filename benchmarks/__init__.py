@@ -0,0 +1,3 @@
+"""
+Benchmarks for the hot paths of pyjsonnlp, see `python -m benchmarks.run --help`.
+"""
@@ -0,0 +1,17 @@
+from collections import deque
+
+from pyjsonnlp.conversion import iter_conllu, parse_conllu, to_conllu
+
+
+def bench_to_conllu(corpus):
+    return lambda: to_conllu(corpus.json), corpus.tokens
+
+
+def bench_iter_conllu(corpus):
+    """The streaming conversion behind write_conllu, without the file"""
+    return lambda: deque(iter_conllu(corpus.json), maxlen=0), corpus.tokens
+
+
+def bench_parse_conllu(corpus):
+    conllu = corpus.conllu
+    return lambda: parse_conllu(conllu), corpus.tokens
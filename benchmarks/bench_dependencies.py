@@ -0,0 +1,29 @@
+from pyjsonnlp.dependencies import UniversalDependencyParse
+
+
+def _layers(corpus) -> list:
+    return [(doc['dependencies'][0], doc['tokenList']) for doc in corpus.json['documents']]
+
+
+def bench_universal_dependency_parse(corpus):
+    layers = _layers(corpus)
+
+    def parse():
+        for deps, tokens in layers:
+            UniversalDependencyParse(deps, tokens)
+
+    return parse, corpus.tokens
+
+
+def bench_dependency_queries(corpus):
+    """Leaves, compounds and arcs below every sentence head"""
+    parses = [UniversalDependencyParse(deps, tokens) for deps, tokens in _layers(corpus)]
+
+    def query():
+        for parse in parses:
+            for head in parse.sentence_heads.values():
+                parse.get_leaves(head)
+                parse.collect_compounds(head)
+                parse.is_arc_present_below(head, 'nmod')
+
+    return query, corpus.tokens
@@ -0,0 +1,17 @@
+from pyjsonnlp.microservices.flask_server import FlaskMicroservice
+from pyjsonnlp.pipeline import Pipeline
+
+
+class _Pipeline(Pipeline):
+    @staticmethod
+    def process(text='', coreferences=False, constituents=False, dependencies=False, expressions=False, **kwargs):
+        raise NotImplementedError
+
+
+def bench_write_json(corpus):
+    app = FlaskMicroservice('benchmarks', _Pipeline())
+    # Flask 2.3 dropped the JSONIFY_MIMETYPE setting that the responses read
+    app.config.setdefault('JSONIFY_MIMETYPE', 'application/json')
+    context = app.app_context()
+    context.push()
+    return lambda: app.write_json(corpus.json), corpus.tokens
@@ -0,0 +1,9 @@
+from pyjsonnlp.unification import Unifier
+
+
+def bench_extend_a_with_b(corpus):
+    return lambda: Unifier.extend_a_with_b(corpus.json, corpus.json), 2 * corpus.tokens
+
+
+def bench_add_annotation_to_a_from_b(corpus):
+    return lambda: Unifier.add_annotation_to_a_from_b(corpus.json, corpus.json, 'tokens'), corpus.tokens
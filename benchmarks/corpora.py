@@ -0,0 +1,90 @@
+"""
+Synthetic JSON-NLP corpora for the benchmarks, at a given number of tokens.
+"""
+
+import random
+from collections import OrderedDict
+
+from pyjsonnlp import get_base, get_base_document
+from pyjsonnlp.conversion import to_conllu
+
+# scale -> number of tokens
+SCALES = OrderedDict([
+    ('tiny', 10),
+    ('small', 10000),
+    ('large', 1000000),
+])
+
+_WORDS = [('the', 'DET', 'DT', 'det'), ('old', 'ADJ', 'JJ', 'amod'), ('cats', 'NOUN', 'NNS', 'nsubj'),
+          ('of', 'ADP', 'IN', 'case'), ('France', 'PROPN', 'NNP', 'nmod'), ('data', 'NOUN', 'NN', 'compound'),
+          ('quickly', 'ADV', 'RB', 'advmod'), ('liability', 'NOUN', 'NN', 'obj'), ('and', 'CCONJ', 'CC', 'cc')]
+_FEATURES = {'NOUN': {'Number': 'Plur'}, 'PROPN': {'Number': 'Sing'}, 'ADJ': {'Degree': 'Pos'}}
+
+
+def synthetic_document(doc_id: int, tokens: int, sentence_tokens=10, rng: random.Random = None,
+                       created: str = None) -> OrderedDict:
+    """
+    A document with tokens, sentences and universal dependencies. Every sentence is headed by a verb, which governs
+    the other tokens of the sentence directly or through their neighbour.
+    """
+    rng = rng or random.Random(doc_id)
+    doc = get_base_document(doc_id, created=created)
+    arcs = OrderedDict()
+    texts = []
+    offset = 0
+    for s_id, start in enumerate(range(1, tokens + 1, sentence_tokens), 1):
+        end = min(start + sentence_tokens, tokens + 1)
+        root = start + (end - start) // 2
+        doc['sentences'].append({'id': s_id, 'tokenFrom': start, 'tokenTo': end, 'tokens': list(range(start, end))})
+        for t_id in range(start, end):
+            if t_id == root:
+                text, upos, xpos, label, governor = 'shift', 'VERB', 'VBP', 'root', 0
+            else:
+                text, upos, xpos, label = rng.choice(_WORDS)
+                governor = t_id + 1 if t_id < root else t_id - 1
+            token = {'id': t_id, 'text': text, 'lemma': text.lower(), 'upos': upos, 'xpos': xpos,
+                     'characterOffsetBegin': offset, 'characterOffsetEnd': offset + len(text),
+                     'features': dict(_FEATURES.get(upos, {}), Overt='Yes')}
+            doc['tokenList'].append(token)
+            arcs[t_id] = [{'sentenceId': s_id, 'label': label, 'governor': governor, 'dependent': t_id}]
+            texts.append(text)
+            offset += len(text) + 1
+    doc['text'] = ' '.join(texts)
+    doc['dependencies'].append({'style': 'universal', 'arcs': arcs})
+    return doc
+
+
+def synthetic_corpus(tokens: int, doc_tokens=1000, sentence_tokens=10, seed=0, keyed=False) -> OrderedDict:
+    """
+    A JSON-NLP object with documents of doc_tokens tokens (the last one shorter) and tokens tokens in all. With
+    keyed=True, the documents, tokens and sentences are objects keyed by their ids and the document ids are strings,
+    the form the NLP-JSON schema validates, rather than the lists of get_base().
+    """
+    rng = random.Random(seed)
+    j = get_base(created='2021-01-01T00:00:00')
+    for doc_id, start in enumerate(range(0, tokens, doc_tokens), 1):
+        j['documents'].append(synthetic_document(doc_id, min(doc_tokens, tokens - start), sentence_tokens, rng,
+                                                 created=j['meta']['DC.created']))
+    if keyed:
+        for doc in j['documents']:
+            doc['id'] = str(doc['id'])
+            doc['tokenList'] = OrderedDict((t['id'], t) for t in doc['tokenList'])
+            doc['sentences'] = OrderedDict((s['id'], s) for s in doc['sentences'])
+        j['documents'] = OrderedDict((doc['id'], doc) for doc in j['documents'])
+    return j
+
+
+class Corpus:
+    """A synthetic corpus at a scale, with its CoNLL-U built on first use"""
+
+    def __init__(self, scale: str):
+        self.scale = scale
+        self.tokens = SCALES[scale]
+        self.json = synthetic_corpus(self.tokens)
+        self._conllu = None
+
+    @property
+    def conllu(self) -> str:
+        if self._conllu is None:
+            self._conllu = to_conllu(self.json)
+        return self._conllu
@@ -0,0 +1,86 @@
+"""
+Timing, memory and baseline comparison for the benchmarks.
+
+A benchmark is a function taking a Corpus and returning (fn, items): fn is the call that is timed, items the number of
+tokens (or other units) it processes, for the throughput. Anything done before returning fn is setup and not timed.
+"""
+
+import json
+import math
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+# the measures compared with the baseline (lower is better), with the growth below which they count as noise
+COMPARED = OrderedDict([('p50_ms', 1.0), ('peak_kb', 64)])
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """The nearest-rank percentile of samples"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def measure(bench: Callable, corpus, repeat=5, warmup=1) -> OrderedDict:
+    """
+    Run a benchmark, timing repeat calls after warmup calls. The peak memory is traced in a separate call, as tracing
+    slows the calls down.
+    """
+    fn, items = bench(corpus)
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50 = percentile(samples, 50)
+    return OrderedDict([
+        ('items', items),
+        ('repeat', repeat),
+        ('p50_ms', round(p50 * 1000, 3)),
+        ('p95_ms', round(percentile(samples, 95) * 1000, 3)),
+        ('p99_ms', round(percentile(samples, 99) * 1000, 3)),
+        ('items_per_s', round(items / p50) if p50 else None),
+        ('peak_kb', round(peak / 1024)),
+    ])
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, results: Dict[str, dict]) -> None:
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold=0.25) -> List[Tuple[str, str, float, float]]:
+    """
+    The regressions of results against a baseline, as (benchmark, measure, baseline value, value), where a measure
+    grew by more than threshold (a fraction of the baseline value) and its noise floor (see COMPARED). Benchmarks
+    missing from either side are skipped.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for key, floor in COMPARED.items():
+            before, after = baseline[name].get(key), result.get(key)
+            if before and after is not None and after > before * (1 + threshold) and after - before > floor:
+                regressions.append((name, key, before, after))
+    return regressions
@@ -0,0 +1,90 @@
+"""
+Run the benchmarks and compare them with a baseline:
+
+    python -m benchmarks.run --scale small --baseline benchmarks/baseline-small.json --save
+    python -m benchmarks.run --scale small --baseline benchmarks/baseline-small.json --threshold 0.25
+
+Every bench_* function of the benchmarks/bench_*.py modules is run on a synthetic corpus of the given scale. The exit
+status is 1 if a benchmark fails or regresses beyond the threshold against the baseline. Baselines depend on the
+machine, so keep one per machine (or CI runner) and scale.
+"""
+
+import argparse
+import importlib
+import pkgutil
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from typing import Callable, Iterator, Tuple
+
+import benchmarks
+from benchmarks.corpora import SCALES, Corpus
+from benchmarks.harness import compare, load_baseline, measure, save_baseline
+
+
+def iter_benchmarks(pattern: str = None) -> Iterator[Tuple[str, Callable]]:
+    """(module.name, function) of every benchmark, optionally only those whose name contains pattern"""
+    for module_info in pkgutil.iter_modules(benchmarks.__path__):
+        if not module_info.name.startswith('bench_'):
+            continue
+        module = importlib.import_module(f'benchmarks.{module_info.name}')
+        for name in sorted(vars(module)):
+            full_name = f'{module_info.name[6:]}.{name[6:]}'
+            if name.startswith('bench_') and callable(getattr(module, name)) and (not pattern or pattern in full_name):
+                yield full_name, getattr(module, name)
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Benchmarks for pyjsonnlp')
+    parser.add_argument('--scale', choices=list(SCALES), default='small', help='the size of the synthetic corpus')
+    parser.add_argument('--repeat', type=int, default=5, help='timed calls per benchmark')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed calls per benchmark')
+    parser.add_argument('--filter', help='only run the benchmarks whose name contains this')
+    parser.add_argument('--baseline', help='a JSON file with the results to compare with')
+    parser.add_argument('--save', action='store_true', help='write the results to the baseline file instead')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='the tolerated growth of latency and peak memory, as a fraction of the baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    start = time.perf_counter()
+    corpus = Corpus(args.scale)
+    print(f'corpus: {args.scale}, {corpus.tokens} tokens, {len(corpus.json["documents"])} documents '
+          f'({time.perf_counter() - start:.1f}s)')
+    print(f'{"benchmark":<40} {"p50 ms":>10} {"p95 ms":>10} {"p99 ms":>10} {"tokens/s":>12} {"peak KB":>10}')
+
+    results = OrderedDict()
+    errors = []
+    for name, bench in iter_benchmarks(args.filter):
+        try:
+            result = measure(bench, corpus, repeat=args.repeat, warmup=args.warmup)
+        except Exception as e:
+            errors.append(name)
+            print(f'{name:<40} ERROR {type(e).__name__}: {e}')
+            traceback.print_exc(file=sys.stderr)
+            continue
+        results[name] = result
+        print(f'{name:<40} {result["p50_ms"]:>10.3f} {result["p95_ms"]:>10.3f} {result["p99_ms"]:>10.3f} '
+              f'{result["items_per_s"] or 0:>12} {result["peak_kb"]:>10}')
+
+    regressions = []
+    if args.baseline:
+        if args.save:
+            save_baseline(args.baseline, results)
+            print(f'saved {len(results)} results to {args.baseline}')
+        else:
+            baseline = load_baseline(args.baseline)
+            if not baseline:
+                print(f'no baseline in {args.baseline}')
+            regressions = compare(results, baseline, args.threshold)
+            for name, key, before, after in regressions:
+                print(f'REGRESSION {name} {key}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)')
+
+    return 1 if errors or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,84 +15,114 @@ import json
 from json import JSONEncoder
 import datetime
 from collections import OrderedDict
-from typing import List
+from typing import List, Dict, Tuple
 import copy
+import threading
+import weakref
 
 name = "pyjsonnlp"
 __version__ = "0.7"
 
 
-def get_base() -> OrderedDict:
+def _now() -> str:
+    return datetime.datetime.now().replace(microsecond=0).isoformat()
+
+
+def _base_meta(created: str = None) -> dict:
+    """The meta block of a JSON-NLP object or document, created (DC.created and DC.date) now unless given"""
+    created = created or _now()
+    return {
+        "DC.conformsTo": __version__,
+        "DC.author": "",
+        "DC.source": "",  # where did the corpus come from
+        "DC.created": created,
+        "DC.date": created,
+        "DC.creator": "",
+        'DC.publisher': "",
+        "DC.title": "",
+        "DC.description": "",
+        "DC.identifier": "",
+        "DC.language": "",
+        "DC.subject": "",
+        "DC.contributors": "",
+        "DC.type": "",
+        "DC.format": "",
+        "DC.relation": "",
+        "DC.coverage": "",
+        "DC.rights": "",
+        "counts": {},
+    }
+
+
+def get_base(created: str = None) -> OrderedDict:
     """
     Return a base framework for JSON-NLP.
+    :param created: The DC.created and DC.date timestamp, now by default
     :returns Base frame for a JSON-NLP object
     :rtype OrderedDict
     """
 
     return OrderedDict({
-        "meta": {
-            "DC.conformsTo": __version__,
-            "DC.author": "",
-            "DC.source": "",  # where did the corpus come from
-            "DC.created": datetime.datetime.now().replace(microsecond=0).isoformat(),
-            "DC.date": datetime.datetime.now().replace(microsecond=0).isoformat(),
-            "DC.creator": "",
-            'DC.publisher': "",
-            "DC.title": "",
-            "DC.description": "",
-            "DC.identifier": "",
-            "DC.language": "",
-            "DC.subject": "",
-            "DC.contributors": "",
-            "DC.type": "",
-            "DC.format": "",
-            "DC.relation": "",
-            "DC.coverage": "",
-            "DC.rights": "",
-            "counts": {},
-        },
+        "meta": _base_meta(created),
         "conll": {},
         "documents": []
     })
 
 
-def get_base_document(doc_id: int) -> OrderedDict:
-    """Returns a JSON base document."""
+# the fields of a base document after its id, with the types of their empty values
+_DOCUMENT_FIELDS = OrderedDict([
+    ("conllId", str),
+    ("text", str),
+    ("tokenList", list),
+    ("clauses", list),
+    ("sentences", list),
+    ("paragraphs", list),
+    ("dependencies", list),
+    ("coreferences", list),
+    ("constituents", list),
+    ("expressions", list),
+])
 
-    return OrderedDict({
-        "meta": {
-            "DC.conformsTo": __version__,
-            "DC.author": "",
-            "DC.source": "",  # where did the corpus come from
-            "DC.created": datetime.datetime.now().replace(microsecond=0).isoformat(),
-            "DC.date": datetime.datetime.now().replace(microsecond=0).isoformat(),
-            "DC.creator": "",
-            'DC.publisher': "",
-            "DC.title": "",
-            "DC.description": "",
-            "DC.identifier": "",
-            "DC.language": "",
-            "DC.subject": "",
-            "DC.contributors": "",
-            "DC.type": "",
-            "DC.format": "",
-            "DC.relation": "",
-            "DC.coverage": "",
-            "DC.rights": "",
-            "counts": {},
-        },
+
+class LazyDocument(OrderedDict):
+    """
+    A base document that only holds the fields written to it. The meta block and the empty fields of
+    get_base_document() are created on first access by key (doc['tokenList']), so the fields a document never uses are
+    never allocated, and never written out. get() and `in` do not create anything, so write through doc[key].
+    """
+
+    def __init__(self, doc_id=None, created: str = None):
+        super(LazyDocument, self).__init__()
+        self.created = created
+        if doc_id is not None:
+            self['id'] = doc_id
+
+    def __missing__(self, key):
+        if key == 'meta':
+            value = self[key] = _base_meta(self.created)
+        elif key in _DOCUMENT_FIELDS:
+            value = self[key] = _DOCUMENT_FIELDS[key]()
+        else:
+            raise KeyError(key)
+        return value
+
+
+def get_base_document(doc_id: int, created: str = None, lazy=False) -> OrderedDict:
+    """
+    Returns a JSON base document.
+    :param created: The DC.created and DC.date timestamp, e.g. the corpus' one, now by default
+    :param lazy: Return a LazyDocument, which only allocates the fields it is given
+    """
+    if lazy:
+        return LazyDocument(doc_id, created)
+
+    doc = OrderedDict({
+        "meta": _base_meta(created),
         "id": doc_id,
-        "conllId": "",
-        "text": "",
-        "tokenList": [],
-        "clauses": [],
-        "sentences": [],
-        "paragraphs": [],
-        "dependencies": [],
-        "coreferences": [],
-        "constituents": [],
-        "expressions": [],
     })
+    for field, empty in _DOCUMENT_FIELDS.items():
+        doc[field] = empty()
+    return doc
 
 
 def remove_empty_fields(json_nlp: OrderedDict) -> OrderedDict:
@@ -104,30 +134,91 @@ def remove_empty_fields(json_nlp: OrderedDict) -> OrderedDict:
     if 'meta' in cleaned:
         cleaned['meta'] = remove_empty_fields(cleaned['meta'])
     if 'documents' in cleaned:
-        # for i, d in cleaned['documents'].items():
-        for i in range(len(cleaned['documents'])):
-            cleaned['documents'][i] = remove_empty_fields(cleaned['documents'][i])
+        # a new collection, so the documents of json_nlp are left as they are
+        docs = cleaned['documents']
+        if isinstance(docs, dict):
+            cleaned['documents'] = docs.__class__((k, remove_empty_fields(d)) for k, d in docs.items())
+        else:
+            cleaned['documents'] = [remove_empty_fields(d) for d in docs]
     return cleaned
 
 
-def find_head(doc: OrderedDict, token_ids: List[int], sentence_id: int, style='universal') -> int:
+_document_caches: Dict[int, Tuple[weakref.ref, dict]] = {}
+
+# plain dicts (as from json.load) cannot be weakly referenced, so the caches of the last ones used are held here
+PLAIN_DOCUMENT_CACHE_SIZE = 64
+_plain_document_caches: 'OrderedDict[int, Tuple[dict, dict]]' = OrderedDict()
+_plain_document_lock = threading.Lock()
+
+
+def document_cache(doc: OrderedDict) -> dict:
+    """
+    Return a scratch dictionary for derived, non-serialized structures of a document (dependency graphs, indexes).
+    The cache lives as long as the document object and is never written out with it.
+    Plain dicts cannot be weakly referenced, so their caches are kept for the PLAIN_DOCUMENT_CACHE_SIZE documents used
+    most recently, and those documents are held alive until they drop out. To keep the structures of more documents at
+    once, convert them to OrderedDicts, or hold on to the structures themselves (e.g. find_head(graphs=...)).
+    """
+    key = id(doc)
+    entry = _document_caches.get(key)
+    if entry is None or entry[0]() is not doc:
+        try:
+            ref = weakref.ref(doc, lambda _, k=key: _document_caches.pop(k, None))
+        except TypeError:
+            return _plain_document_cache(doc)
+        entry = _document_caches[key] = (ref, {})
+    return entry[1]
+
+
+def _plain_document_cache(doc: dict) -> dict:
+    key = id(doc)
+    with _plain_document_lock:
+        entry = _plain_document_caches.get(key)
+        if entry is not None and entry[0] is doc:
+            _plain_document_caches.move_to_end(key)
+            return entry[1]
+        entry = _plain_document_caches[key] = (doc, {})
+        while len(_plain_document_caches) > PLAIN_DOCUMENT_CACHE_SIZE:
+            _plain_document_caches.popitem(last=False)
+        return entry[1]
+
+
+def _governor_index(doc: OrderedDict, sentence_id, style: str, graphs=None) -> dict:
+    """The dependent -> governors index of a sentence, or of the whole document if it has no sentences"""
+    if graphs is None:
+        from pyjsonnlp.dependencies import get_document_graphs
+        graphs = get_document_graphs(doc)
+    if sentence_id is None or not doc.get('sentences'):
+        return graphs.graph(style).heads
+    return graphs.sentence(sentence_id, style).heads
+
+
+def _head_of(token_ids: List[int], heads: dict) -> int:
+    group = set(token_ids)
+    for t_id in token_ids:
+        if not any(gov.governor in group for gov in heads.get(t_id, [])):
+            return t_id
+    return None
+
+
+def find_head(doc: OrderedDict, token_ids: List[int], sentence_id: int = None, style='universal',
+              graphs=None) -> int:
     """
     Given phrase, clause, or other group of token ids, use a dependency parse to find the head token.
-    We create two sets, governors and dependents of the tokens in token_ids. The elements in gov that do not occur
-    in dependents are the heads. There should be just one.
+    The head is the first token in token_ids whose governors all lie outside of the group. There should be just one.
+    The governor index of the sentence is built once per document and dependency style, so each call is O(|group|).
+    :param graphs: the DocumentGraphs of doc, by default those cached for it (see document_cache)
     """
-    # print(sentence_id, doc['dependencies'],doc['dependencies']['trees'])
+    heads = _governor_index(doc, sentence_id, style, graphs)
     if len(token_ids) == 0:
         return None
-    arcs = doc['dependencies'][sentence_id - 1]['trees']
-    govs = set(token_ids)
-    for x in arcs:
-        if x["dep"] in govs and x["gov"] in govs:
-            govs.remove(x["dep"])
-    govs = list(govs)
-    if len(govs) == 0:
-        return None
-    return govs[0]
+    return _head_of(token_ids, heads)
+
+
+def find_heads(doc: OrderedDict, groups: List[List[int]], style='universal', graphs=None) -> List[int]:
+    """Find the head token of every group of token ids (phrases, clauses, ...) of a document in one pass."""
+    heads = _governor_index(doc, None, style, graphs)
+    return [_head_of(token_ids, heads) if len(token_ids) else None for token_ids in groups]
 
 
 def build_coreference(reference_id: int) -> dict:
@@ -1,6 +1,112 @@
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Tuple
+
+from pyjsonnlp.dependencies import DocumentGraphs, UniversalDependencyParse, get_document_graphs
+from pyjsonnlp.indexes import SpanIndex, TokenIndex, get_span_index, get_token_index
+
+
+def documents(nlp_json: OrderedDict) -> Iterable[OrderedDict]:
+    """The documents of a JSON-NLP object, whether they are kept in a list or a dict"""
+    docs = nlp_json.get('documents', [])
+    return docs.values() if isinstance(docs, dict) else docs
+
+
+class DocumentResources:
+    """
+    The per-document resources shared by all annotators of a chain, built once on first use: the dependency graphs,
+    the token index and the span index. They are cached on the document, so they are rebuilt if an annotator replaces
+    the dependencies or the tokenList.
+    """
+    def __init__(self, doc: OrderedDict):
+        self.doc = doc
+
+    @property
+    def graphs(self) -> DocumentGraphs:
+        return get_document_graphs(self.doc)
+
+    @property
+    def tokens(self) -> TokenIndex:
+        return get_token_index(self.doc)
+
+    @property
+    def spans(self) -> SpanIndex:
+        return get_span_index(self.doc)
+
+    def parse(self, style='universal') -> UniversalDependencyParse:
+        return self.graphs.parse(style)
 
 
 class Annotator:
+    """
+    An annotator adds annotations to each document of a JSON-NLP object, in place.
+    It names the annotations it needs already present in requires, and those it adds in provides, so an
+    AnnotatorChain can order it after the annotators it depends on.
+    """
+    requires: Tuple[str, ...] = ()
+    provides: Tuple[str, ...] = ()
+
     def annotate(self, nlp_json: OrderedDict) -> None:
-        raise NotImplementedError
\ No newline at end of file
+        for doc in documents(nlp_json):
+            self.annotate_document(doc, DocumentResources(doc))
+
+    def annotate_document(self, doc: OrderedDict, resources: DocumentResources) -> None:
+        raise NotImplementedError
+
+
+class AnnotatorChain(Annotator):
+    """
+    Runs a list of annotators over every document, ordered so that each runs after the annotators providing what it
+    requires (and otherwise in the order given). Requirements that no annotator of the chain provides are expected
+    to be present in the documents already. The resources of a document are built once and passed to every
+    annotator. Documents are independent, so with workers they are annotated concurrently on a thread pool. The
+    threads only help annotators that wait on I/O or release the GIL (e.g. ones calling a remote service); pure Python
+    annotators get no speedup from them, so run CPU-bound ones with their own process pool instead
+    (e.g. RelationAnnotator(workers=4).annotate(nlp_json)).
+    """
+    def __init__(self, annotators: List[Annotator], workers: int = None):
+        self.annotators = AnnotatorChain.order(annotators)
+        self.workers = workers
+
+    @property
+    def requires(self) -> Tuple[str, ...]:
+        provided = set(p for a in self.annotators for p in a.provides)
+        return tuple(OrderedDict.fromkeys(r for a in self.annotators for r in a.requires if r not in provided))
+
+    @property
+    def provides(self) -> Tuple[str, ...]:
+        return tuple(OrderedDict.fromkeys(p for a in self.annotators for p in a.provides))
+
+    @staticmethod
+    def order(annotators: List[Annotator]) -> List[Annotator]:
+        """Topologically sort annotators by their requires and provides, keeping the given order where possible"""
+        providers = {}
+        for i, a in enumerate(annotators):
+            for p in a.provides:
+                providers.setdefault(p, []).append(i)
+        depends = [set(j for r in a.requires for j in providers.get(r, []) if j != i)
+                   for i, a in enumerate(annotators)]
+
+        ordered, done = [], set()
+        while len(ordered) < len(annotators):
+            ready = [i for i in range(len(annotators)) if i not in done and depends[i] <= done]
+            if not ready:
+                cycle = ', '.join(type(annotators[i]).__name__ for i in range(len(annotators)) if i not in done)
+                raise ValueError(f'Circular annotator requirements between {cycle}!')
+            ordered.append(annotators[ready[0]])
+            done.add(ready[0])
+        return ordered
+
+    def annotate(self, nlp_json: OrderedDict) -> None:
+        docs = list(documents(nlp_json))
+        if self.workers is None or self.workers < 2 or len(docs) < 2:
+            for doc in docs:
+                self.annotate_document(doc, DocumentResources(doc))
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for _ in executor.map(lambda doc: self.annotate_document(doc, DocumentResources(doc)), docs):
+                pass
+
+    def annotate_document(self, doc: OrderedDict, resources: DocumentResources) -> None:
+        for annotator in self.annotators:
+            annotator.annotate_document(doc, resources)
@@ -1,43 +1,153 @@
+import csv
+import os
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import Dict, Iterable, List, Tuple, Union
 
-from pyjsonnlp.annotation import Annotator
-from pyjsonnlp.dependencies import UniversalDependencyParse
+from pyjsonnlp.annotation import Annotator, DocumentResources, documents
+from pyjsonnlp.indexes import TokenIndex, get_token_index
+from pyjsonnlp.layers import LayerManifest
+
+
+def _values(collection):
+    return collection.values() if isinstance(collection, dict) else collection
+
+
+def _head(argument) -> int:
+    """The head token of a relation argument, a grammar object or a list of token ids"""
+    if isinstance(argument, dict):
+        return argument['head']
+    return argument[0] if isinstance(argument, list) else argument
+
+
+def _extract_relations(args: tuple) -> Dict[int, dict]:
+    """
+    Extract the relations of a batch of sentences (the unit of work of RelationAnnotator.annotate). The annotator
+    class is passed rather than the annotator, which would send its manifest along with every batch.
+    """
+    annotator_class, sentences, r_id = args
+    return annotator_class.extract(sentences, r_id)
 
 
 class RelationAnnotator(Annotator):
+    """
+    Extracts relations from the subjects, main verbs and objects of simple transitive sentences.
+    With workers, annotate() extracts the relations of documents in a process pool; only the sentences to process
+    are sent to the workers, and only the new relations are sent back. With incremental=True, sentences that
+    relations were already extracted from are skipped, so re-annotating a grown corpus only costs the new documents.
+    With a LayerManifest, documents whose sentences, clauses and dependencies did not change since their relations
+    were last extracted are skipped, and the relations of documents whose inputs changed are extracted anew.
+    The preconditions of all documents are checked before any document is annotated.
+    """
+    requires = ('clauses', )
+    provides = ('relations', )
+
+    def __init__(self, workers: int = None, incremental=False, chunksize: int = None,
+                 manifest: LayerManifest = None):
+        self.workers = workers
+        self.incremental = incremental
+        self.chunksize = chunksize
+        self.manifest = manifest
+
+    def _reset(self, doc: OrderedDict) -> None:
+        """Drop the outdated relations of a document whose inputs changed since they were extracted"""
+        if self.manifest is not None and self.manifest.is_recorded(doc, 'relations') and not self.incremental:
+            doc['relations'] = {}
+        if 'relations' not in doc:
+            doc['relations'] = {}
+
+    def pending(self, doc: OrderedDict, resources: DocumentResources = None) -> List[dict]:
+        """The sentences of a document to extract relations from: all of them, or the ones without relations yet"""
+        sentences = list(_values(doc.get('sentences', {})))
+        relations = doc.get('relations')
+        if not self.incremental or not relations:
+            return sentences
+        spans = (resources or DocumentResources(doc)).spans
+        covered = set(id(sent) for rel in _values(relations)
+                      for sent in spans.covering('sentences', _head(rel['predicate'])))
+        return [sent for sent in sentences if id(sent) not in covered]
+
+    @staticmethod
+    def check(doc: OrderedDict, sentences: List[dict]) -> None:
+        for sent in sentences:
+            if 'complex' not in sent:
+                raise BrokenPipeError(f'You must do clause extraction first! '
+                                      f'(document {doc.get("id")}, sentence {sent.get("id")})')
+
+    @staticmethod
+    def _next_id(doc: OrderedDict) -> int:
+        return max((rel['id'] for rel in _values(doc.get('relations', {}))), default=0) + 1
+
     def annotate(self, nlp_json: OrderedDict) -> None:
-        for doc in nlp_json['documents'].values():
-            if 'relations' not in doc:
-                doc['relations'] = {}
-            r_id = len(doc['relations']) + 1
-            d = UniversalDependencyParse(doc['dependencies'][0], doc['tokenList'])
-            for s_id, sent in doc['sentences'].items():
-                if 'complex' not in sent:
-                    raise BrokenPipeError('You must do clause extraction first!')
-                if not sent['complex']:
-                    if sent.get('transitivity') == 'transitive':
-                        doc['relations'][r_id] = self.build_relation(r_id=r_id,
-                                                                     predicate=sent['mainVerb'],
-                                                                     p_from=sent['subject'],
-                                                                     p_to=sent['object'])
-                    elif sent.get('transitivity') == 'intransitive':
-                        # these are attributes rather than relations (He died -> He is dead)
-                        pass
-                    elif sent.get('transitivity') == 'ditransitive':
-                        pass
-                        # the idea here is to combine the obj and iobj, but it needs more thought.
-                        # trans_rel = self.build_relation(r_id=r_id, predicate=sent['mainVerb'],
-                        #                                 p_from=sent['subject'],
-                        #                                 p_to=sent['object'])
-                        # intrans_rel = dict(trans_rel)
-                        # doc['relations'][r_id] = trans_rel,
-                        # r_id += 1
-                        # intrans_rel['id'] = r_id,
-                        # intrans_rel['predicate'].extend(intrans_rel['to'])
-                        # intrans_rel['to'] = [t['id'] for t in d.get_leaves(sent['indirectObject'][0])]
-                        # doc['relations'][r_id] = intrans_rel
-
-                    r_id += 1
+        if self.manifest is None:
+            dirty = [(doc, None) for doc in documents(nlp_json)]
+        else:
+            dirty = list(self.manifest.dirty(documents(nlp_json), 'relations'))
+        docs = [doc for doc, _ in dirty]
+        work = [(doc, self.pending(doc)) for doc in docs]
+        for doc, sentences in work:
+            self.check(doc, sentences)
+        for doc in docs:
+            self._reset(doc)
+        work = [(doc, self.pending(doc)) for doc in docs]
+        work = [(doc, sentences) for doc, sentences in work if sentences]
+
+        batches = [(type(self), sentences, self._next_id(doc)) for doc, sentences in work]
+        if self.workers is None or self.workers < 2 or len(batches) < 2:
+            results = map(_extract_relations, batches)
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                chunksize = self.chunksize or max(1, len(batches) // (4 * self.workers))
+                results = list(executor.map(_extract_relations, batches, chunksize=chunksize))
+        for (doc, _), relations in zip(work, results):
+            doc['relations'].update(relations)
+        if self.manifest is not None:
+            for doc, inputs in dirty:
+                self.manifest.mark(doc, 'relations', inputs)
+
+    def annotate_document(self, doc: OrderedDict, resources: DocumentResources) -> None:
+        inputs = None
+        if self.manifest is not None:
+            inputs = self.manifest.inputs(doc, 'relations')
+            if not self.manifest.is_dirty(doc, 'relations', inputs):
+                return
+        self.check(doc, self.pending(doc, resources))
+        self._reset(doc)
+        doc['relations'].update(self.extract(self.pending(doc, resources), self._next_id(doc)))
+        if self.manifest is not None:
+            self.manifest.mark(doc, 'relations', inputs)
+
+    @classmethod
+    def extract(cls, sentences: List[dict], r_id: int) -> Dict[int, dict]:
+        """The relations of a list of sentences, numbered from r_id"""
+        relations = OrderedDict()
+        for sent in sentences:
+            if not sent['complex']:
+                if sent.get('transitivity') == 'transitive':
+                    relations[r_id] = cls.build_relation(r_id=r_id,
+                                                         predicate=sent['mainVerb'],
+                                                         p_from=sent['subject'],
+                                                         p_to=sent['object'])
+                elif sent.get('transitivity') == 'intransitive':
+                    # these are attributes rather than relations (He died -> He is dead)
+                    pass
+                elif sent.get('transitivity') == 'ditransitive':
+                    pass
+                    # the idea here is to combine the obj and iobj, but it needs more thought.
+                    # trans_rel = self.build_relation(r_id=r_id, predicate=sent['mainVerb'],
+                    #                                 p_from=sent['subject'],
+                    #                                 p_to=sent['object'])
+                    # intrans_rel = dict(trans_rel)
+                    # relations[r_id] = trans_rel,
+                    # r_id += 1
+                    # intrans_rel['id'] = r_id,
+                    # intrans_rel['predicate'].extend(intrans_rel['to'])
+                    # intrans_rel['to'] = [t['id'] for t in d.get_leaves(sent['indirectObject'][0])]
+                    # relations[r_id] = intrans_rel
+
+                r_id += 1
+        return relations
 
     @staticmethod
     def build_relation(r_id: int, predicate: dict, p_from: dict, p_to: dict) -> dict:
@@ -50,17 +160,142 @@ class RelationAnnotator(Annotator):
 
 
 class PresuppositionRelationAnnotator(Annotator):
-    def annotate(self, nlp_json: OrderedDict) -> None:
-        for doc in nlp_json['documents'].values():
-            if 'relations' not in doc:
-                doc['relations'] = {}
-            r_id = len(doc['relations']) + 1
-            d = UniversalDependencyParse(doc['dependencies'][0], doc['tokenList'])
-            for s_id, sent in doc['sentences'].items():
-                pass
-
-
-def write_snap(nlp_json: OrderedDict, file='relations.csv'):
-    for doc in nlp_json.get('documents', {}).values():
-        for rel in doc.get('relations', {}).values():
-            pass
+    provides = ('relations', )
+
+    def annotate_document(self, doc: OrderedDict, resources: DocumentResources) -> None:
+        # todo: extract presupposition relations from the sentences' dependency parses (resources.parse())
+        if 'relations' not in doc:
+            doc['relations'] = {}
+
+
+class RelationWriter:
+    """
+    Streams the relations of documents into an edge list, one document at a time, so only the current batch of edges
+    is held in memory. Nodes are the surface strings of the relations' arguments (the tokens of the 'phrase' of a
+    grammar object, or the token ids of a plain list), interned to integer ids across all documents. Each new node is
+    written to a separate node file the first time it is seen.
+    Formats: 'snap' (tab-separated SNAP edge list), 'csv', or 'parquet' (record batches, requires pyarrow).
+    Edges have the columns document, relation, from, to and predicate (the predicate's surface string). SNAP readers
+    take the first two columns as the source and destination nodes, so SNAP edge lists start with from and to.
+    """
+    formats = ('snap', 'csv', 'parquet')
+    edge_columns = ('document', 'relation', 'from', 'to', 'predicate')
+    snap_edge_columns = ('from', 'to', 'document', 'relation', 'predicate')
+    node_columns = ('id', 'label')
+
+    def __init__(self, file='relations.csv', file_format: str = None, nodes_file: str = None, batch_size=10000):
+        base, ext = os.path.splitext(file)
+        if file_format is None:
+            file_format = {'.csv': 'csv', '.parquet': 'parquet'}.get(ext.lower(), 'snap')
+        if file_format not in RelationWriter.formats:
+            raise ValueError(f'{file_format} is not one of {", ".join(RelationWriter.formats)}!')
+        self.file = file
+        self.format = file_format
+        self.columns = RelationWriter.snap_edge_columns if file_format == 'snap' else RelationWriter.edge_columns
+        self._order = itemgetter(*(RelationWriter.edge_columns.index(c) for c in self.columns))
+        self.nodes_file = nodes_file or f'{base}.nodes{ext}'
+        self.batch_size = batch_size
+        self.nodes: Dict[str, int] = {}
+        self.edge_count = 0
+        self._edges: List[tuple] = []
+        self._new_nodes: List[tuple] = []
+        self._outputs = [self._open(self.file, self.columns),
+                         self._open(self.nodes_file, RelationWriter.node_columns)]
+
+    def _open(self, file: str, columns: Tuple[str, ...]):
+        if self.format == 'parquet':
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError('Writing parquet requires pyarrow (pip install pyarrow)!')
+            types = {'document': pyarrow.int64(), 'relation': pyarrow.int64(), 'from': pyarrow.int64(),
+                     'to': pyarrow.int64(), 'predicate': pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+                     'id': pyarrow.int64(), 'label': pyarrow.string()}
+            schema = pyarrow.schema([(c, types[c]) for c in columns])
+            return pyarrow.parquet.ParquetWriter(file, schema)
+        f = open(file, 'w', newline='', encoding='utf-8')
+        if self.format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(columns)
+        else:
+            writer = csv.writer(f, delimiter='\t', quoting=csv.QUOTE_NONE, escapechar='\\')
+            f.write('# ' + '\t'.join(columns) + '\n')
+        return f, writer
+
+    def _label(self, tokens: TokenIndex, argument) -> str:
+        if isinstance(argument, dict):
+            token_ids = argument.get('phrase') or [argument['head']]
+        elif isinstance(argument, list):
+            token_ids = argument
+        else:
+            token_ids = [argument]
+        return ' '.join(tokens.token(t_id)['text'] if t_id in tokens else str(t_id) for t_id in token_ids)
+
+    def _node(self, label: str) -> int:
+        node = self.nodes.get(label)
+        if node is None:
+            node = self.nodes[label] = len(self.nodes) + 1
+            self._new_nodes.append((node, label))
+        return node
+
+    def write_document(self, doc: OrderedDict) -> None:
+        relations = doc.get('relations', {})
+        if not relations:
+            return
+        tokens = get_token_index(doc)
+        for rel in (relations.values() if isinstance(relations, dict) else relations):
+            self._edges.append(self._order((doc.get('id'), rel['id'], self._node(self._label(tokens, rel['from'])),
+                                            self._node(self._label(tokens, rel['to'])),
+                                            self._label(tokens, rel['predicate']))))
+        if len(self._edges) >= self.batch_size:
+            self.flush()
+
+    def write(self, docs: Iterable[OrderedDict]) -> None:
+        for doc in docs:
+            self.write_document(doc)
+
+    def _write_rows(self, output, columns: Tuple[str, ...], rows: List[tuple]) -> None:
+        if self.format == 'parquet':
+            import pyarrow
+            output.write_table(pyarrow.Table.from_pylist([dict(zip(columns, row)) for row in rows],
+                                                         schema=output.schema))
+        else:
+            output[1].writerows(rows)
+
+    def flush(self) -> None:
+        """Write out the buffered edges and new nodes"""
+        if self._edges:
+            self._write_rows(self._outputs[0], self.columns, self._edges)
+            self.edge_count += len(self._edges)
+            self._edges = []
+        if self._new_nodes:
+            self._write_rows(self._outputs[1], RelationWriter.node_columns, self._new_nodes)
+            self._new_nodes = []
+
+    def close(self) -> None:
+        self.flush()
+        for output in self._outputs:
+            if self.format == 'parquet':
+                output.close()
+            else:
+                output[0].close()
+
+    def __enter__(self) -> 'RelationWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def write_snap(nlp_json: Union[OrderedDict, Iterable[OrderedDict]], file='relations.csv', file_format: str = None,
+               nodes_file: str = None, batch_size=10000) -> Tuple[int, int]:
+    """
+    Export the relations of a JSON-NLP object, or of an iterable of documents (e.g. from Unifier.stream), as an edge
+    list (see RelationWriter). The format follows the file extension unless given.
+    :returns the number of edges and the number of nodes written
+    """
+    docs = documents(nlp_json) if isinstance(nlp_json, dict) and 'documents' in nlp_json else nlp_json
+    with RelationWriter(file, file_format=file_format, nodes_file=nodes_file, batch_size=batch_size) as writer:
+        writer.write(docs)
+    return writer.edge_count, len(writer.nodes)
@@ -0,0 +1,245 @@
+"""
+Columnar export and import of JSON-NLP corpora as Arrow IPC streams or Parquet files (requires pyarrow).
+
+A corpus is stored as three tables, each in its own file next to the given one (corpus.parquet becomes
+corpus.documents.parquet, corpus.sentences.parquet and corpus.tokens.parquet):
+    documents  document, conllId, text, meta (JSON)
+    sentences  document, sentence, conllId, tokenFrom, tokenTo, text
+    tokens     document, token, sentence, text, lemma, upos, xpos, features (JSON), head, deprel,
+               characterOffsetBegin, characterOffsetEnd, misc (JSON)
+head and deprel are taken from the universal dependencies. The repetitive token columns (lemma, tags, features,
+labels) are dictionary-encoded. Tables are written and read in record batches, one document at a time.
+"""
+
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from pyjsonnlp import get_base, get_base_document
+from pyjsonnlp.conversion import get_dep_head_rel
+from pyjsonnlp.corpus import read_documents
+
+TABLES = ('documents', 'sentences', 'tokens')
+
+# column -> type; 'category' columns are dictionary-encoded strings
+COLUMNS = OrderedDict([
+    ('documents', OrderedDict([('document', 'int'), ('conllId', 'string'), ('text', 'string'), ('meta', 'string')])),
+    ('sentences', OrderedDict([('document', 'int'), ('sentence', 'int'), ('conllId', 'string'), ('tokenFrom', 'int'),
+                               ('tokenTo', 'int'), ('text', 'string')])),
+    ('tokens', OrderedDict([('document', 'int'), ('token', 'int'), ('sentence', 'int'), ('text', 'string'),
+                            ('lemma', 'category'), ('upos', 'category'), ('xpos', 'category'),
+                            ('features', 'category'), ('head', 'int'), ('deprel', 'category'),
+                            ('characterOffsetBegin', 'int'), ('characterOffsetEnd', 'int'), ('misc', 'category')])),
+])
+
+_JSON_COLUMNS = ('meta', 'features', 'misc')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Columnar export requires pyarrow (pip install pyarrow)!')
+    return pyarrow
+
+
+def _schema(pa, table: str):
+    types = {'int': pa.int64(), 'string': pa.string(), 'category': pa.dictionary(pa.int32(), pa.string())}
+    return pa.schema([(c, types[t]) for c, t in COLUMNS[table].items()])
+
+
+def table_files(file: str) -> Dict[str, str]:
+    """The files of the documents, sentences and tokens tables of a corpus"""
+    base, ext = os.path.splitext(file)
+    return OrderedDict((table, f'{base}.{table}{ext}') for table in TABLES)
+
+
+def _format(file: str, file_format: str = None) -> str:
+    if file_format is None:
+        file_format = 'parquet' if os.path.splitext(file)[1].lower() == '.parquet' else 'arrow'
+    if file_format not in TableWriter.formats:
+        raise ValueError(f'{file_format} is not one of {", ".join(TableWriter.formats)}!')
+    return file_format
+
+
+def _json(value) -> Union[str, None]:
+    return json.dumps(value, separators=(',', ':')) if value else None
+
+
+def _values(collection):
+    return collection.values() if isinstance(collection, dict) else collection
+
+
+class TableWriter:
+    """
+    Streams documents into the documents, sentences and tokens tables of a corpus, buffering the rows of up to
+    batch_size tokens column by column before writing them as a record batch.
+    Formats: 'arrow' (Arrow IPC stream) or 'parquet', following the file extension unless given.
+    """
+    formats = ('arrow', 'parquet')
+
+    def __init__(self, file='corpus.parquet', file_format: str = None, batch_size=100000):
+        self.pa = _pyarrow()
+        self.format = _format(file, file_format)
+        self.files = table_files(file)
+        self.batch_size = batch_size
+        self.counts = dict((table, 0) for table in TABLES)
+        self._columns = dict((table, dict((c, []) for c in COLUMNS[table])) for table in TABLES)
+        self._outputs = OrderedDict()
+        for table, path in self.files.items():
+            schema = _schema(self.pa, table)
+            if self.format == 'parquet':
+                self._outputs[table] = self.pa.parquet.ParquetWriter(path, schema)
+            else:
+                self._outputs[table] = self.pa.ipc.new_stream(path, schema)
+
+    def _append(self, table: str, *row) -> None:
+        for column, value in zip(self._columns[table].values(), row):
+            column.append(value)
+
+    def write_document(self, doc: OrderedDict) -> None:
+        d_id = doc['id']
+        self._append('documents', d_id, doc.get('conllId') or None, doc.get('text') or None, _json(doc.get('meta')))
+
+        sentence_of = {}
+        for s in _values(doc.get('sentences', [])):
+            token_ids = s.get('tokens') or range(s['tokenFrom'], s['tokenTo'])
+            for t_id in token_ids:
+                sentence_of[t_id] = s['id']
+            self._append('sentences', d_id, s['id'], s.get('conllId') or None, s.get('tokenFrom'), s.get('tokenTo'),
+                         s.get('text'))
+
+        for t in _values(doc.get('tokenList', [])):
+            t_id = t['id']
+            head, rel = get_dep_head_rel(doc, t_id)
+            has_head = rel != '_'
+            self._append('tokens', d_id, t_id, sentence_of.get(t_id), t.get('text'), t.get('lemma'), t.get('upos'),
+                         t.get('xpos'), _json(t.get('features')), head if has_head else None,
+                         rel if has_head else None, t.get('characterOffsetBegin'), t.get('characterOffsetEnd'),
+                         _json(t.get('misc')))
+
+        if len(self._columns['tokens']['token']) >= self.batch_size:
+            self.flush()
+
+    def write(self, docs: Iterable[OrderedDict]) -> None:
+        for doc in docs:
+            self.write_document(doc)
+
+    def flush(self) -> None:
+        """Write out the buffered rows of each table as a record batch"""
+        for table, columns in self._columns.items():
+            rows = len(columns['document'])
+            if not rows:
+                continue
+            schema = _schema(self.pa, table)
+            batch = self.pa.Table.from_pydict(columns, schema=schema)
+            self._outputs[table].write_table(batch)
+            self.counts[table] += rows
+            self._columns[table] = dict((c, []) for c in COLUMNS[table])
+
+    def close(self) -> None:
+        self.flush()
+        for output in self._outputs.values():
+            output.close()
+
+    def __enter__(self) -> 'TableWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def write_tables(nlp_json: Union[OrderedDict, str, Iterable[OrderedDict]], file='corpus.parquet',
+                 file_format: str = None, batch_size=100000) -> Dict[str, int]:
+    """
+    Export a JSON-NLP object, an iterable of documents, or a JSON Lines corpus or corpus container to the documents,
+    sentences and tokens tables of a corpus (see TableWriter).
+    :returns the number of rows written per table
+    """
+    if isinstance(nlp_json, dict):
+        docs = _values(nlp_json['documents'])
+    else:
+        docs = read_documents(nlp_json)
+    with TableWriter(file, file_format=file_format, batch_size=batch_size) as writer:
+        writer.write(docs)
+    return writer.counts
+
+
+def _batches(pa, path: str, file_format: str) -> Iterator:
+    if file_format == 'parquet':
+        yield from pa.parquet.ParquetFile(path).iter_batches()
+    else:
+        with pa.ipc.open_stream(path) as reader:
+            yield from reader
+
+
+def _rows_by_document(pa, path: str, file_format: str) -> Iterator[Tuple[int, List[dict]]]:
+    """The rows of a table grouped by document, in the order they were written"""
+    d_id, rows = None, []
+    for batch in _batches(pa, path, file_format):
+        for row in batch.to_pylist():
+            if row['document'] != d_id and rows:
+                yield d_id, rows
+                rows = []
+            d_id = row['document']
+            rows.append(row)
+    if rows:
+        yield d_id, rows
+
+
+def _without_nulls(row: dict, columns: Iterable[str]) -> OrderedDict:
+    item = OrderedDict()
+    for c in columns:
+        if row.get(c) is not None:
+            item[c] = json.loads(row[c], object_pairs_hook=OrderedDict) if c in _JSON_COLUMNS else row[c]
+    return item
+
+
+def iter_tables(file='corpus.parquet', file_format: str = None) -> Iterator[OrderedDict]:
+    """Read the documents of a corpus exported with write_tables() one at a time"""
+    pa = _pyarrow()
+    file_format = _format(file, file_format)
+    files = table_files(file)
+    sentences = _rows_by_document(pa, files['sentences'], file_format)
+    tokens = _rows_by_document(pa, files['tokens'], file_format)
+    next_sentences, next_tokens = next(sentences, None), next(tokens, None)
+    for _, rows in _rows_by_document(pa, files['documents'], file_format):
+        row = rows[0]
+        doc = get_base_document(row['document'])
+        doc.update(_without_nulls(row, ('conllId', 'text', 'meta')))
+
+        if next_sentences is not None and next_sentences[0] == row['document']:
+            for s in next_sentences[1]:
+                sentence = _without_nulls(s, ('conllId', 'tokenFrom', 'tokenTo', 'text'))
+                sentence['id'] = s['sentence']
+                sentence.move_to_end('id', last=False)
+                doc['sentences'].append(sentence)
+            next_sentences = next(sentences, None)
+
+        if next_tokens is not None and next_tokens[0] == row['document']:
+            arcs = OrderedDict()
+            for t in next_tokens[1]:
+                token = _without_nulls(t, ('text', 'lemma', 'upos', 'xpos', 'features', 'characterOffsetBegin',
+                                           'characterOffsetEnd', 'misc'))
+                token['id'] = t['token']
+                token.move_to_end('id', last=False)
+                doc['tokenList'].append(token)
+                if t['deprel'] is not None:
+                    arc = {'label': t['deprel'], 'governor': t['head'], 'dependent': t['token']}
+                    if t['sentence'] is not None:
+                        arc['sentenceId'] = t['sentence']
+                    arcs[t['token']] = [arc]
+            if arcs:
+                doc['dependencies'].append({'style': 'universal', 'arcs': arcs})
+            next_tokens = next(tokens, None)
+        yield doc
+
+
+def read_tables(file='corpus.parquet', file_format: str = None) -> OrderedDict:
+    """Load a corpus exported with write_tables() as a JSON-NLP object"""
+    j = get_base()
+    j['documents'] = list(iter_tables(file, file_format))
+    return j
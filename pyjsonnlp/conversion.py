@@ -9,47 +9,86 @@ Licensed under the Apache License 2.0, see the file LICENSE for more details.
 
 Brought to you by the NLP-Lab.org (https://nlp-lab.org/)!
 """
-from collections import OrderedDict, defaultdict
-from typing import Dict, Tuple, List
+import os
+from collections import OrderedDict
+from typing import Dict, Tuple, List, Iterable, Iterator, TextIO, Union
 
 import conllu
 
 from pyjsonnlp import get_base, get_base_document
+from pyjsonnlp.corpus import read_documents
+from pyjsonnlp.indexes import get_token_index
+from pyjsonnlp.jsonl import DocumentWriter
+from pyjsonnlp.layers import LayerManifest
+from pyjsonnlp.vocabulary import Vocabulary, get_vocabulary
 
 
-def to_conllu(j: OrderedDict) -> str:
+def to_conllu(j: Union[OrderedDict, str, Iterable[OrderedDict]], manifest: LayerManifest = None) -> str:
     """
     Converts JSON-NLP to CoNLL-U (no enhanced dependencies, coref, or ner)
     Baseline functionality is for Xrenner to be able to use spaCy dependencies to do coref
+    j is a JSON-NLP object, an iterable of documents, or the path to a JSON Lines corpus or corpus container.
+    With a LayerManifest, only the documents whose tokens, sentences or dependencies changed since their last export
+    are converted, and they are marked as exported.
     """
-    c = ""
-    #for d in j['documents'].values():
-    for d in j['documents']:
-        c = f"{c}# newdoc id = {d['id']}\n"
-        token_offset = 0
-        for s in d['sentences'].values():
-            c = f"{c}# sent id = {s['id']}\n"
-            tl = d['tokenList']
-            i = 0
-            for t_id in range(s['tokenFrom'], s['tokenTo']):
-                i += 1
-                head, rel = get_dep_head_rel(d, t_id)
-                text = tl[t_id-1].get('text')
-                # spacy pronoun "lemmas"
-                lemma = tl[t_id-1].get('lemma', '_') if tl[t_id-1].get('lemma', '_') != '-PRON-' else text
-                c = f"{c}{t_id-token_offset}" \
-                    f"\t{text}" \
-                    f"\t{lemma.lower()}" \
-                    f"\t{tl[t_id].get('upos', tl[t_id].get('xpos', '_'))}" \
-                    f"\t{tl[t_id].get('xpos', '_')}" \
-                    f"\t{encode_features(tl[t_id].get('features', {}))}" \
-                    f"\t{max(0, head-token_offset)}" \
-                    f"\t{rel}" \
-                    f"\t_\t_\n"
-            c = f"{c}\n"
-            token_offset += i
-
-    return c.rstrip()
+    return ''.join(iter_conllu(j, manifest)).rstrip()
+
+
+def write_conllu(j: Union[OrderedDict, str, Iterable[OrderedDict]], file: str, manifest: LayerManifest = None) -> int:
+    """
+    Converts JSON-NLP to a CoNLL-U file one document at a time, see to_conllu()
+    :returns the number of documents written
+    """
+    count = 0
+    with open(file, 'w') as f:
+        for c in iter_conllu(j, manifest):
+            f.write(c)
+            count += 1
+    return count
+
+
+def iter_conllu(j: Union[OrderedDict, str, Iterable[OrderedDict]], manifest: LayerManifest = None) -> Iterator[str]:
+    """The CoNLL-U of each document, see to_conllu()"""
+    if isinstance(j, dict):
+        docs = j['documents'].values() if isinstance(j['documents'], dict) else j['documents']
+    else:
+        docs = read_documents(j)
+    if manifest is None:
+        for d in docs:
+            yield document_to_conllu(d)
+        return
+    for d, inputs in manifest.dirty(docs, 'conllu'):
+        yield document_to_conllu(d)
+        manifest.mark(d, 'conllu', inputs)
+
+
+def document_to_conllu(d: OrderedDict) -> str:
+    """Converts a single JSON-NLP document to CoNLL-U"""
+    lines = [f"# newdoc id = {d['id']}"]
+    token_offset = 0
+    tl = get_token_index(d)
+    for s in (d['sentences'].values() if isinstance(d['sentences'], dict) else d['sentences']):
+        lines.append(f"# sent id = {s['id']}")
+        i = 0
+        for t_id in range(s['tokenFrom'], s['tokenTo']):
+            i += 1
+            head, rel = get_dep_head_rel(d, t_id)
+            t = tl.token(t_id)
+            text = t.get('text')
+            # spacy pronoun "lemmas"
+            lemma = t.get('lemma', '_') if t.get('lemma', '_') != '-PRON-' else text
+            lines.append(f"{t_id-token_offset}"
+                         f"\t{text}"
+                         f"\t{lemma.lower()}"
+                         f"\t{t.get('upos', t.get('xpos', '_'))}"
+                         f"\t{t.get('xpos', '_')}"
+                         f"\t{encode_features(t.get('features', {}))}"
+                         f"\t{max(0, head-token_offset)}"
+                         f"\t{rel}"
+                         f"\t_\t_")
+        lines.append('')
+        token_offset += i
+    return '\n'.join(lines) + '\n'
 
 
 def get_dep_head_rel(d: OrderedDict, t_id: int) -> Tuple[int, str]:
@@ -61,39 +100,36 @@ def get_dep_head_rel(d: OrderedDict, t_id: int) -> Tuple[int, str]:
     return 0, '_'  # defaults
 
 
-def parse_conllu(c: str, dependency_arc_style='universal') -> OrderedDict:
+def parse_conllu(c: str, dependency_arc_style='universal', vocabulary: Vocabulary = None) -> OrderedDict:
     """
     Convert CoNLL-U format to NLP-JSON
+    Tags, feature keys and values, arc labels and styles are interned in the vocabulary (by default the shared one).
     # todo detect contractions, head, expression types
     # todo reconstruct sentence text
     # todo syntax, coref, and other conllu-plus columns
     # todo test par/sent/doc ids and par splitting
     """
-    par_num = 1
     doc_num = 1
+    if vocabulary is None:
+        vocabulary = get_vocabulary()
 
     def new_paragraph_mid_sentence():
-        nonlocal par_num
         # if an opening paragraph wasn't specified, retroactively create one
         if not document['paragraphs']:
-            conll_id = sent.metadata.get('newpar id', '')
-            document['paragraphs'][par_num] = {
-                'id': par_num,
-                'conllId': conll_id,
-                'tokens': [t_id+1 for t_id in range(len(document['tokenList']))]
-            }
-            par_num += 1
+            document['paragraphs'].append({
+                'id': 1,
+                'conllId': sent.metadata.get('newpar id', ''),
+                'tokens': [t['id'] for t in document['tokenList']]
+            })
         # create the new paragraph
-        document['paragraphs'][par_num] = {
-            'id': par_num,
+        document['paragraphs'].append({
+            'id': len(document['paragraphs']) + 1,
             'tokens': []
-        }
-        par_num += 1
+        })
 
     def wrap_up_doc():
-        if all(map(lambda ds: 'text' in ds, document['sentences'].values())):
-            document['text'] = ' '.join(map(lambda ds: ds['text'], document['sentences'].values()))
-        #j['documents'][document['id']] = document
+        if all(map(lambda ds: 'text' in ds, document['sentences'])):
+            document['text'] = ' '.join(map(lambda ds: ds['text'], document['sentences']))
         j['documents'].append(document)
 
     # init
@@ -101,6 +137,7 @@ def parse_conllu(c: str, dependency_arc_style='universal') -> OrderedDict:
     token_lookup: Dict[Tuple[int, str], int] = {}
     token_id = 1
     document = None
+    sent_documents: List[OrderedDict] = []  # sent_num -> the document of the sentence
     parsed = conllu.parse(c)
 
     # start parsing sentences
@@ -109,17 +146,19 @@ def parse_conllu(c: str, dependency_arc_style='universal') -> OrderedDict:
         if 'newdoc id' in sent.metadata or 'newdoc' in sent.metadata or document is None:
             if document is not None:
                 wrap_up_doc()
-            document = get_base_document(doc_num)
+            # the documents share the corpus' timestamps
+            document = get_base_document(doc_num, created=j['meta']['DC.created'])
             document['conllId'] = sent.metadata.get('newdoc id', '')
             doc_num += 1
+            token_id = 1
+        sent_documents.append(document)
 
         # paragraphs
         if 'newpar id' in sent.metadata or 'newpar' in sent.metadata:
-            document['paragraphs'][par_num] = {
-                'id': par_num,
+            document['paragraphs'].append({
+                'id': len(document['paragraphs']) + 1,
                 'conllId': sent.metadata.get('newpar id', ''),
-                'tokens': []}
-            par_num += 1
+                'tokens': []})
 
         # initialize a sentence
         if 'sent_id' in sent.metadata:
@@ -132,7 +171,7 @@ def parse_conllu(c: str, dependency_arc_style='universal') -> OrderedDict:
             'tokenTo': token_id + len(sent),
             'tokens': sent_tokens
         }
-        document['sentences'][sent_num] = current_sent
+        document['sentences'].append(current_sent)
 
         # sentence text
         if 'text' in sent.metadata:
@@ -155,7 +194,7 @@ def parse_conllu(c: str, dependency_arc_style='universal') -> OrderedDict:
             # multi-token expressions
             if '-' in str_token_id:
                 # this will be in the range token, not the word itself
-                if token.get('misc', defaultdict()).get('NewPar') == True:
+                if (token.get('misc') or {}).get('NewPar') == True:
                     new_paragraph_mid_sentence()
                 # ignore ranges otherwise during token parsing
                 continue
@@ -165,14 +204,14 @@ def parse_conllu(c: str, dependency_arc_style='universal') -> OrderedDict:
                 'id': token_id,
                 'text': token['form'],
                 'lemma': token['lemma'],
-                'upos': token['upostag'],  # universal pos
-                'xpos': token['xpostag'],  # language-specific pos
+                'upos': vocabulary.intern(token['upostag']),  # universal pos
+                'xpos': vocabulary.intern(token['xpostag']),  # language-specific pos
                 'features': OrderedDict({
                     'Overt': True
                 })
             }
             if token.get('feats'):
-                t['features'].update(token['feats'])
+                t['features'].update(vocabulary.intern_features(token['feats']))
             if token.get('misc'):
                 t['misc'] = token['misc']
                 # morphemes in two places
@@ -190,53 +229,119 @@ def parse_conllu(c: str, dependency_arc_style='universal') -> OrderedDict:
             token_lookup[(sent_num, str_token_id)] = token_id
             current_sent['tokens'].append(token_id)
             if document['paragraphs']:
-                document['paragraphs'][par_num]['tokens'].append('token_id')
-            #document['tokenList'][token_id] = t
+                document['paragraphs'][-1]['tokens'].append(token_id)
             document['tokenList'].append(t)
             token_id += 1
 
         # expressions (now we handle id ranges)
-        expr_id = 1
         for token in sent:
             if isinstance(token['id'], tuple) and token['id'][1] == '-':
                 document['expressions'].append({
-                    'id': expr_id,
+                    'id': len(document['expressions']) + 1,
                     'type': 'conll-range',
                     'tokens': [token_lookup[(sent_num, str(t))] for t in range(token['id'][0], token['id'][2] + 1)]
                 })
-                expr_id += 1
 
-    # dependencies
+    if document is None:
+        return j
+    wrap_up_doc()
+
+    # dependencies, a layer per style in every document
     for token_key, style in (('deprel', dependency_arc_style), ('deps', 'enhanced')):
-        deps = {'style': style, 'arcs': {}}
+        layers = OrderedDict()
+        for d in j['documents']:
+            layers[id(d)] = {'style': vocabulary.intern(style), 'arcs': {}}
+            d['dependencies'].append(layers[id(d)])
         for sent_num, sent in enumerate(parsed):
+            arcs = layers[id(sent_documents[sent_num])]['arcs']
             for token in sent:
                 # None, '_', or not present
                 if token.get(token_key, '_') == '_' or not token.get(token_key):
                     continue
                 dependent = token_lookup[(sent_num, str(token['id']))]
-                deps['arcs'][dependent] = []
+                arcs[dependent] = []
                 if token_key == 'deps':
                     for rel, head in token[token_key]:
-                        deps['arcs'][dependent].append({
-                            'label': rel.lower(),
+                        arcs[dependent].append({
+                            'label': vocabulary.intern(rel.lower()),
                             'governor': 0 if rel.upper() == 'ROOT' else token_lookup[(sent_num, str(head))],
                             'dependent': dependent
                         })
                 else:
-                    deps['arcs'][dependent].append({
-                        'label': token[token_key] if token[token_key] != 'ROOT' else 'root',
+                    arcs[dependent].append({
+                        'label': vocabulary.intern(token[token_key]) if token[token_key] != 'ROOT' else 'root',
                         'governor': 0 if token[token_key].upper() == 'ROOT' else token_lookup[(sent_num, str(token['head']))],
                         'dependent': dependent
                     })
-        if deps:
-            document['dependencies'].append(deps)
-
-    wrap_up_doc()
 
     return j
 
 
+def _conllu_chunks(f: TextIO) -> Iterator[str]:
+    """The CoNLL-U of each document (# newdoc) of a file"""
+    chunk, has_tokens = [], False
+    for line in f:
+        if line.startswith('# newdoc') and has_tokens:
+            yield ''.join(chunk)
+            chunk, has_tokens = [], False
+        chunk.append(line)
+        has_tokens = has_tokens or (line.strip() != '' and not line.startswith('#'))
+    if has_tokens:
+        yield ''.join(chunk)
+
+
+def _parse_conllu_file(file: Union[str, TextIO], dependency_arc_style='universal') -> Iterator[OrderedDict]:
+    if isinstance(file, str):
+        with open(file, 'r') as f:
+            yield from _parse_conllu_file(f, dependency_arc_style)
+        return
+    for c in _conllu_chunks(file):
+        yield parse_conllu(c, dependency_arc_style)
+
+
+def iter_conllu_documents(file: Union[str, TextIO], dependency_arc_style='universal') -> Iterator[OrderedDict]:
+    """
+    Convert a CoNLL-U file to NLP-JSON one document (# newdoc) at a time, so the file never has to be held in memory.
+    Documents are numbered in the order they are read.
+    """
+    doc_num = 1
+    for j in _parse_conllu_file(file, dependency_arc_style):
+        for document in j['documents']:
+            document['id'] = doc_num
+            doc_num += 1
+            yield document
+
+
+def conllu_to_jsonl(file: Union[str, TextIO], jsonl_file: str, dependency_arc_style='universal') -> int:
+    """
+    Convert a CoNLL-U file to a JSON Lines corpus (see pyjsonnlp.jsonl) one document at a time. The header is taken
+    from the first document. The corpus is written next to jsonl_file and only replaces it once the whole CoNLL-U file
+    has been converted, so an existing jsonl_file is left untouched if the conversion fails.
+    :returns the number of documents written
+    """
+    partial = f'{jsonl_file}.partial'
+    writer = None
+    doc_num = 1
+    try:
+        for j in _parse_conllu_file(file, dependency_arc_style):
+            if writer is None:
+                writer = DocumentWriter(partial, header=j)
+            for document in j['documents']:
+                document['id'] = doc_num
+                doc_num += 1
+                writer.write(document)
+        if writer is None:
+            writer = DocumentWriter(partial, header=get_base())
+        writer.close()
+        os.replace(partial, jsonl_file)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(partial)
+        raise
+    return writer.count
+
+
 def encode_features(features: dict) -> str:
     """Encodes features from a dictionary/JSON to CONLLU format."""
 
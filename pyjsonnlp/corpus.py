@@ -0,0 +1,251 @@
+"""
+A binary container for JSON-NLP corpora with random access by document id.
+
+Layout:
+    header   MAGIC, format version
+    records  kind (1 byte), length (4 bytes), zlib-compressed JSON; one record for the corpus meta data, then one per
+             document, appended in the order they are written
+    footer   zlib-compressed JSON index of [document id, record offset] pairs and the meta record offset, then the
+             index offset, the index length and FOOTER_MAGIC
+
+Readers memory-map the file and decode only the records they are asked for. Writers append records to an existing
+corpus and write a new footer on close; if a writer dies before that, the index is recovered by scanning the records.
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Union
+
+from pyjsonnlp.jsonl import _int_keys, iter_documents
+
+MAGIC = b'JSONNLPC'
+FOOTER_MAGIC = b'JSONNLPI'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sH')
+_RECORD = struct.Struct('<BI')
+_FOOTER = struct.Struct('<QI8s')
+
+META = 0
+DOCUMENT = 1
+
+
+class CorpusError(Exception):
+    pass
+
+
+def _encode(obj, level: int) -> bytes:
+    return zlib.compress(json.dumps(obj, separators=(',', ':')).encode('utf-8'), level)
+
+
+def _decode(data) -> OrderedDict:
+    return json.loads(zlib.decompress(data).decode('utf-8'), object_pairs_hook=_int_keys)
+
+
+def is_corpus(path: str) -> bool:
+    """Whether a file is a corpus container"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _read_index(data, size: int) -> tuple:
+    """The index and meta offset of a corpus, from its footer or, without a valid footer, by scanning its records"""
+    if size >= _HEADER.size + _FOOTER.size:
+        index_offset, index_length, magic = _FOOTER.unpack_from(data, size - _FOOTER.size)
+        if magic == FOOTER_MAGIC and index_offset + index_length + _FOOTER.size == size:
+            footer = _decode(data[index_offset:index_offset + index_length])
+            return [tuple(entry) for entry in footer['documents']], footer['meta'], index_offset
+
+    index, meta_offset, offset = [], None, _HEADER.size
+    while offset + _RECORD.size <= size:
+        kind, length = _RECORD.unpack_from(data, offset)
+        end = offset + _RECORD.size + length
+        if kind not in (META, DOCUMENT) or end > size:
+            break
+        try:
+            record = _decode(data[offset + _RECORD.size:end])
+        except (zlib.error, ValueError):
+            # a partially written record
+            break
+        if kind == META:
+            meta_offset = offset
+        else:
+            index.append((record.get('id'), offset))
+        offset = end
+    return index, meta_offset, offset
+
+
+class CorpusReader:
+    """
+    Random access to the documents of a corpus container by id (reader[123456]), or in order by iteration.
+    Only the index is loaded; documents are decompressed from the memory-mapped file on demand.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._file.close()
+            raise CorpusError(f'{path} is not a JSON-NLP corpus!')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = _HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version > VERSION:
+            self.close()
+            raise CorpusError(f'{path} is not a JSON-NLP corpus (version {VERSION})!')
+        index, self._meta_offset, _ = _read_index(self._data, size)
+        self.index: Dict = OrderedDict(index)
+
+    def _record(self, offset: int) -> OrderedDict:
+        _, length = _RECORD.unpack_from(self._data, offset)
+        start = offset + _RECORD.size
+        return _decode(self._data[start:start + length])
+
+    @property
+    def meta(self) -> OrderedDict:
+        return OrderedDict() if self._meta_offset is None else self._record(self._meta_offset)
+
+    def ids(self) -> List:
+        return list(self.index.keys())
+
+    def _offset(self, doc_id) -> int:
+        """The offset of a document's record, or None; ids given as strings of digits also find int ids"""
+        offset = self.index.get(doc_id)
+        if offset is None and isinstance(doc_id, str) and doc_id.isdigit():
+            offset = self.index.get(int(doc_id))
+        return offset
+
+    def get(self, doc_id, default=None) -> OrderedDict:
+        offset = self._offset(doc_id)
+        return default if offset is None else self._record(offset)
+
+    def __getitem__(self, doc_id) -> OrderedDict:
+        doc = self.get(doc_id)
+        if doc is None:
+            raise KeyError(doc_id)
+        return doc
+
+    def __contains__(self, doc_id) -> bool:
+        return self._offset(doc_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[OrderedDict]:
+        for offset in sorted(self.index.values()):
+            yield self._record(offset)
+
+    def close(self) -> None:
+        if getattr(self, '_data', None) is not None:
+            self._data.close()
+            self._data = None
+        self._file.close()
+
+    def __enter__(self) -> 'CorpusReader':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class CorpusWriter:
+    """
+    Writes documents to a corpus container one at a time. With append=True, the documents are added to an existing
+    corpus; its records are kept as they are, and only the footer is replaced. Document ids must be unique.
+    """
+
+    def __init__(self, path: str, meta: OrderedDict = None, append=False, level=6):
+        self.path = path
+        self.level = level
+        self.index: List[tuple] = []
+        meta_offset = None
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            if not is_corpus(path):
+                raise CorpusError(f'{path} is not a JSON-NLP corpus!')
+            self._file = open(path, 'r+b')
+            with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                self.index, meta_offset, end = _read_index(data, len(data))
+            # drop the old footer, the records stay as they are
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self._ids = set(doc_id for doc_id, _ in self.index)
+        self._meta_offset = meta_offset
+        if meta is not None:
+            self._meta_offset = self._write_record(META, meta)
+
+    def _write_record(self, kind: int, obj) -> int:
+        offset = self._file.tell()
+        data = _encode(obj, self.level)
+        self._file.write(_RECORD.pack(kind, len(data)))
+        self._file.write(data)
+        return offset
+
+    def write(self, doc: OrderedDict) -> None:
+        if doc.get('id') in self._ids:
+            raise CorpusError(f"Document {doc.get('id')} is already in {self.path}!")
+        self._ids.add(doc.get('id'))
+        self.index.append((doc.get('id'), self._write_record(DOCUMENT, doc)))
+
+    def write_all(self, docs: Iterable[OrderedDict]) -> None:
+        for doc in docs:
+            self.write(doc)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        data = _encode({'documents': self.index, 'meta': self._meta_offset}, self.level)
+        self._file.write(data)
+        self._file.write(_FOOTER.pack(index_offset, len(data), FOOTER_MAGIC))
+        self._file.close()
+
+    def __enter__(self) -> 'CorpusWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def write_corpus(path: str, nlp_json: Union[OrderedDict, Iterable[OrderedDict]], meta: OrderedDict = None,
+                 append=False) -> int:
+    """
+    Write a JSON-NLP object, or an iterable of documents, to a corpus container.
+    :returns the number of documents in the corpus
+    """
+    if isinstance(nlp_json, dict) and 'documents' in nlp_json:
+        meta = nlp_json.get('meta') if meta is None else meta
+        docs = nlp_json['documents']
+        nlp_json = docs.values() if isinstance(docs, dict) else docs
+    with CorpusWriter(path, meta=meta, append=append) as writer:
+        writer.write_all(nlp_json)
+    return len(writer.index)
+
+
+def read_corpus(path: str) -> OrderedDict:
+    """Load a whole corpus container as a JSON-NLP object with a list of documents"""
+    with CorpusReader(path) as reader:
+        j = OrderedDict()
+        j['meta'] = reader.meta
+        j['documents'] = list(reader)
+    return j
+
+
+def read_documents(source: Union[str, Iterable[OrderedDict]]) -> Iterator[OrderedDict]:
+    """Documents from an iterable, a corpus container, or a JSON Lines corpus, one at a time"""
+    if not isinstance(source, str):
+        yield from source
+    elif is_corpus(source):
+        with CorpusReader(source) as reader:
+            yield from reader
+    else:
+        yield from iter_documents(source)
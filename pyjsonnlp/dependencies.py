@@ -2,10 +2,181 @@
 
 """
 
+import sys
 from collections import OrderedDict, namedtuple
 from typing import List, Union, Tuple, Dict
 
+from pyjsonnlp import document_cache
+from pyjsonnlp.indexes import TokenIndex, get_token_index
+
 Dependency = namedtuple('Dep', 'dependent arc')  # int, str
+Governor = namedtuple('Gov', 'governor arc')  # int, str
+
+
+class DependencyGraph:
+    """
+    Adjacency structure for a single dependency layer (one entry of doc['dependencies']).
+    Every arc listed for a dependent is kept, so enhanced graphs with several heads per token are represented as well.
+    Arc labels are interned with sys.intern, so the label comparisons of the parses succeed on identity. A graph does
+    not add them to the shared vocabulary, which would keep every label it was ever given.
+    """
+
+    def __init__(self, dependencies: dict):
+        self.deps: dict = dependencies
+        self.nodes: Dict[int, List[Dependency]] = {}  # governor -> dependents
+        self.heads: Dict[int, List[Governor]] = {}  # dependent -> governors
+        self.sentence_heads: Dict[int, int] = {}  # sentenceId -> head
+        self._build_nodes()
+
+    @property
+    def style(self) -> str:
+        return self.deps.get('style', 'universal')
+
+    def _build_nodes(self):
+        for dependent, arcs in self.deps.get('arcs', {}).items():
+            for arc in arcs:
+                self.add_arc(arc.get('dependent', dependent), arc['governor'], arc.get('label', ''),
+                             arc.get('sentenceId'))
+
+    def add_arc(self, dependent: int, governor: int, label: str, sentence_id=None) -> None:
+        label = sys.intern(label) if isinstance(label, str) else label
+        if governor not in self.nodes:
+            self.nodes[governor] = []
+        if dependent not in self.heads:
+            self.heads[dependent] = []
+        if governor == 0 and sentence_id is not None and sentence_id not in self.sentence_heads:
+            self.sentence_heads[sentence_id] = dependent
+        self.nodes[governor].append(Dependency(dependent=dependent, arc=label))
+        self.heads[dependent].append(Governor(governor=governor, arc=label))
+
+
+class SentenceGraph(DependencyGraph):
+    """
+    A DependencyGraph shard for a single sentence. Only the arcs of the sentence's own tokens are read, and the
+    sentence's tokens are held in a local list, so queries on the shard never touch the rest of the document.
+    """
+
+    def __init__(self, dependencies: dict, tokens: list, sentence: dict):
+        """:param tokens: the tokens of the sentence, in order"""
+        self.sentence_id = sentence['id']
+        self.tokens: list = tokens
+        self.index = TokenIndex(self.tokens)
+        super(SentenceGraph, self).__init__(dependencies)
+
+    def _build_nodes(self):
+        arcs = self.deps.get('arcs', {})
+        for t in self.tokens:
+            for arc in arcs.get(t['id'], []):
+                self.add_arc(arc.get('dependent', t['id']), arc['governor'], arc.get('label', ''),
+                             self.sentence_id)
+
+
+class DocumentGraphs:
+    """
+    All dependency layers of a document, built once and queried by style.
+    Layers are built on first access, and per-sentence shards (see SentenceGraph) are built on first access to a
+    sentence. Use get_document_graphs() to share a single instance between the consumers of a document.
+    The document's TokenIndex is only built for whole-document parses, or for sentences whose tokens cannot be found
+    directly by id (see _sentence_tokens).
+    """
+
+    def __init__(self, doc: OrderedDict):
+        self.doc = doc
+        self.tokens = doc.get('tokenList', [])
+        self.sentences = doc.get('sentences', {})
+        self._dependencies: Dict[str, dict] = OrderedDict()
+        for dependencies in doc.get('dependencies', []):
+            self._dependencies.setdefault(dependencies.get('style', 'universal'), dependencies)
+        self.layers: Dict[str, DependencyGraph] = {}
+        self.shards: Dict[Tuple[str, int], SentenceGraph] = {}
+        self._sentence_lookup: Dict[int, dict] = None
+
+    @property
+    def index(self) -> TokenIndex:
+        return get_token_index(self.doc)
+
+    @property
+    def styles(self) -> List[str]:
+        return list(self._dependencies.keys())
+
+    def _layer(self, style: str) -> dict:
+        if style not in self._dependencies:
+            raise ValueError(f'No {style} dependencies found!')
+        return self._dependencies[style]
+
+    def graph(self, style='universal') -> DependencyGraph:
+        if style not in self.layers:
+            self.layers[style] = DependencyGraph(self._layer(style))
+        return self.layers[style]
+
+    def _sentence(self, sentence_id: int) -> dict:
+        if isinstance(self.sentences, dict) and self.sentences.get(sentence_id, {}).get('id') == sentence_id:
+            return self.sentences[sentence_id]
+        if self._sentence_lookup is None:
+            values = self.sentences.values() if isinstance(self.sentences, dict) else self.sentences
+            self._sentence_lookup = dict((s['id'], s) for s in values)
+        if sentence_id not in self._sentence_lookup:
+            raise ValueError(f'No sentence {sentence_id} found!')
+        return self._sentence_lookup[sentence_id]
+
+    def _sentence_tokens(self, sentence: dict) -> list:
+        """
+        The tokens of a sentence. A dict tokenList is keyed by token id, and a list tokenList normally holds token n at
+        offset n-1, so they are looked up directly. The document's TokenIndex is only used where that does not hold.
+        """
+        token_ids = sentence.get('tokens') or list(range(sentence['tokenFrom'], sentence['tokenTo']))
+        if isinstance(self.tokens, dict):
+            tokens = [self.tokens.get(t_id) for t_id in token_ids]
+        else:
+            size = len(self.tokens)
+            tokens = [self.tokens[t_id - 1] if isinstance(t_id, int) and 0 < t_id <= size else None
+                      for t_id in token_ids]
+        if all(t is not None and t['id'] == t_id for t, t_id in zip(tokens, token_ids)):
+            return tokens
+        return [self.index.token(t_id) for t_id in token_ids]
+
+    def sentence(self, sentence_id: int, style='universal') -> SentenceGraph:
+        """Return the dependency graph shard of a single sentence, building it on first access"""
+        key = (style, sentence_id)
+        if key not in self.shards:
+            sentence = self._sentence(sentence_id)
+            self.shards[key] = SentenceGraph(self._layer(style), self._sentence_tokens(sentence), sentence)
+        return self.shards[key]
+
+    def build_sentences(self, style='universal') -> None:
+        """Build the shards of all sentences up front"""
+        values = self.sentences.values() if isinstance(self.sentences, dict) else self.sentences
+        for s_id in [s['id'] for s in values if (style, s['id']) not in self.shards]:
+            self.sentence(s_id, style)
+
+    def parse(self, style='universal', sentence_id=None) -> 'UniversalDependencyParse':
+        """
+        Return a parse over the cached graph of the given style, without rebuilding it.
+        With a sentence_id, the parse only covers that sentence's shard.
+        """
+        if sentence_id is None:
+            g = self.graph(style)
+            tokens, index = self.tokens, self.index
+        else:
+            g = self.sentence(sentence_id, style)
+            tokens, index = g.tokens, g.index
+        if style == 'universal':
+            return UniversalDependencyParse(g.deps, tokens, graph=g, index=index)
+        return EnhancedDependencyParse(g.deps, tokens, graph=g, index=index)
+
+
+def get_document_graphs(doc: OrderedDict) -> DocumentGraphs:
+    """
+    Return the DocumentGraphs of a document, building them on first use.
+    The cached graphs are rebuilt when the document's dependency layers are replaced, added or removed.
+    """
+    cache = document_cache(doc)
+    deps = doc.get('dependencies', [])
+    key = (id(deps), len(deps), id(doc.get('tokenList')))
+    if cache.get('graphs_key') != key:
+        cache['graphs'] = DocumentGraphs(doc)
+        cache['graphs_key'] = key
+    return cache['graphs']
 
 
 class DependencyParse:
@@ -19,7 +190,7 @@ class DependencyParse:
     def get_leaves(self, token_id: int) -> List[OrderedDict]:
         raise NotImplementedError
 
-    def get_leaves_by_arc(self, arc: str, head=None, sentence_id=1) -> Tuple[int, List[OrderedDict]]:
+    def get_leaves_by_arc(self, arc: str, head=None, sentence_id=None) -> Tuple[int, List[OrderedDict]]:
         raise NotImplementedError
 
     def get_child_with_arc(self, token_id: int, arc: str) -> Union[None, OrderedDict]:
@@ -30,31 +201,40 @@ class DependencyParse:
 
 
 class UniversalDependencyParse(DependencyParse):
-    def __init__(self, dependencies: dict, tokens: list):
+    def __init__(self, dependencies: dict, tokens: list, graph: DependencyGraph = None, index: TokenIndex = None):
         self.deps: dict = dependencies
         self.tokens: list = tokens
-        self.nodes: Dict[int, List[Dependency]] = {}
-        self.sentence_heads: Dict[int, int] = {}  # sentenceId -> head
-        if dependencies.get('style', 'universal') != 'universal':
-            raise ValueError(f"{dependencies['style']} is not universal!")
-        self._build_nodes()
+        self.index: TokenIndex = index if index is not None else TokenIndex(tokens)
+        self._check_style()
+        self.graph: DependencyGraph = graph if graph is not None else DependencyGraph(dependencies)
+        self.nodes: Dict[int, List[Dependency]] = self.graph.nodes
+        self.sentence_heads: Dict[int, int] = self.graph.sentence_heads  # sentenceId -> head
 
-    def _build_nodes(self):
-        for t in self.tokens:
-            arc: dict = self.deps['arcs'][t['id']][0]
-            if arc['governor'] not in self.nodes:
-                self.nodes[arc['governor']] = []
-            if arc['governor'] == 0:
-                self.sentence_heads[arc['sentenceId']] = t['id']
-            self.nodes[arc['governor']].append(Dependency(dependent=arc['dependent'], arc=arc['label']))
+    def _check_style(self):
+        if self.deps.get('style', 'universal') != 'universal':
+            raise ValueError(f"{self.deps['style']} is not universal!")
 
-    def is_arc_present_below(self, token_id: int, arc: str) -> bool:
+    def _token(self, token_id: int) -> OrderedDict:
+        return self.index.token(token_id)
+
+    def _walk(self, token_id: int, follow=None):
+        """Depth-first walk over the dependencies below token_id, visiting every dependent once"""
+        seen = {token_id}
         stack = list(self.nodes.get(token_id, []))
         while len(stack):
             dep = stack.pop()
+            if dep.dependent in seen:
+                continue
+            seen.add(dep.dependent)
+            yield dep
+            if follow is None or dep.arc in follow:
+                stack.extend(self.nodes.get(dep.dependent, []))
+
+    def is_arc_present_below(self, token_id: int, arc: str) -> bool:
+        arc = sys.intern(arc)
+        for dep in self._walk(token_id):
             if dep.arc == arc:
                 return True
-            stack.extend(self.nodes.get(dep.dependent, []))
         return False
 
     @property
@@ -62,43 +242,54 @@ class UniversalDependencyParse(DependencyParse):
         return self.deps.get('style', 'universal')
 
     def get_leaves(self, token_id: int) -> List[OrderedDict]:
-        tokens = [self.tokens[token_id-1]]
-        stack = list(self.nodes.get(token_id, []))
-        while len(stack):
-            dep = stack.pop()
-            tokens.append(self.tokens[dep.dependent-1])
-            stack.extend(self.nodes.get(dep.dependent, []))
+        tokens = [self._token(token_id)]
+        for dep in self._walk(token_id):
+            tokens.append(self._token(dep.dependent))
 
         return sorted(tokens, key=lambda t: t['id'])
 
-    def get_leaves_by_arc(self, arc: str, head=None, sentence_id=1) -> Tuple[int, List[OrderedDict]]:
+    def get_leaves_by_arc(self, arc: str, head=None, sentence_id=None) -> Tuple[int, List[OrderedDict]]:
+        """
+        The first dependent below head with the given arc, and its leaves. The head defaults to the root of the
+        sentence, by default the shard's own sentence in a parse of a SentenceGraph, and sentence 1 otherwise.
+        """
         if head is None:
+            if sentence_id is None:
+                sentence_id = self.graph.sentence_id if isinstance(self.graph, SentenceGraph) else 1
             head = self.sentence_heads[sentence_id]
-        stack = list(self.nodes.get(head, []))
-        while len(stack):
-            dep = stack.pop()
+        arc = sys.intern(arc)
+        for dep in self._walk(head):
             if dep.arc == arc:
                 return dep.dependent, self.get_leaves(dep.dependent)
-            stack.extend(self.nodes.get(dep.dependent, []))
         return 0, []
 
     def get_child_with_arc(self, token_id: int, arc: str, follow: Tuple = ()) -> Union[None, OrderedDict]:
         stack = list(self.nodes.get(token_id, []))
+        seen = {token_id}
+        arc = sys.intern(arc)
         while len(stack):
             dep = stack.pop()
             if dep.arc == arc:
-                return self.tokens[dep.dependent-1]
-            if dep.arc in follow:
+                return self._token(dep.dependent)
+            if dep.arc in follow and dep.dependent not in seen:
+                seen.add(dep.dependent)
                 stack.extend(self.nodes.get(dep.dependent, []))
         return None
 
     def collect_compounds(self, token_id: int) -> List[OrderedDict]:
-        compound = [self.tokens[token_id-1]]
-        stack = list(self.nodes.get(token_id, []))
-        while len(stack):
-            dep = stack.pop()
+        compound = [self._token(token_id)]
+        for dep in self._walk(token_id, follow=('compound', )):
             if dep.arc == 'compound':
-                compound.append(self.tokens[dep.dependent-1])
-                stack.extend(self.nodes.get(dep.dependent, []))
+                compound.append(self._token(dep.dependent))
 
         return sorted(compound, key=lambda t: t['id'])
+
+
+class EnhancedDependencyParse(UniversalDependencyParse):
+    """The same queries over enhanced (or any other style of) dependency graphs, where tokens may have several heads"""
+
+    def _check_style(self):
+        pass
+
+    def get_heads(self, token_id: int) -> List[Governor]:
+        return list(self.graph.heads.get(token_id, []))
@@ -0,0 +1,295 @@
+"""
+Lookup indexes over the collections of a JSON-NLP document
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterable, Union
+
+from pyjsonnlp import document_cache
+
+class TokenIndex:
+    """
+    Maps token ids to their position in a tokenList (the key for dict tokenLists, the offset for list tokenLists).
+    Ids do not have to be contiguous, so documents extended by the Unifier or holding CoNLL empty nodes (decimal ids)
+    are handled as well. A stale position is detected on lookup, and the index is then rebuilt once. An id that is not
+    indexed is only looked for again if the tokenList changed in size, or if its first or last token has a new id, as
+    when ids were renumbered in place (t['id'] += 10); other misses cost O(1).
+    """
+
+    def __init__(self, tokens: Union[list, dict]):
+        self.tokens = tokens
+        self.positions: Dict[int, Union[int, str]] = {}
+        self._size = -1
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        if isinstance(self.tokens, dict):
+            self.positions = dict((t['id'], k) for k, t in self.tokens.items())
+            self._last_key = list(self.tokens)[-1] if self.tokens else None
+        else:
+            self.positions = dict((t['id'], i) for i, t in enumerate(self.tokens))
+        self._size = len(self.tokens)
+        self._ends = self._end_ids()
+
+    def _end_ids(self) -> tuple:
+        """The ids of the first and last tokens, to tell in O(1) whether ids were changed in place"""
+        if not self.tokens:
+            return ()
+        if isinstance(self.tokens, dict):
+            first, last = next(iter(self.tokens.values())), self.tokens.get(self._last_key)
+        else:
+            first, last = self.tokens[0], self.tokens[-1]
+        return first.get('id'), last.get('id') if last is not None else None
+
+    def values(self) -> Iterable[dict]:
+        """The tokens in tokenList order"""
+        return self.tokens.values() if isinstance(self.tokens, dict) else self.tokens
+
+    def _lookup(self, token_id):
+        pos = self.positions.get(token_id)
+        if pos is not None:
+            t = self.tokens.get(pos) if isinstance(self.tokens, dict) else \
+                (self.tokens[pos] if pos < len(self.tokens) else None)
+            if t is not None and t['id'] == token_id:
+                return pos
+        elif self._size == len(self.tokens) and self._ends == self._end_ids():
+            return None
+        self.rebuild()
+        return self.positions.get(token_id)
+
+    def position(self, token_id) -> Union[int, str]:
+        pos = self._lookup(token_id)
+        if pos is None:
+            raise KeyError(token_id)
+        return pos
+
+    def token(self, token_id) -> dict:
+        return self.tokens[self.position(token_id)]
+
+    def get(self, token_id, default=None) -> dict:
+        pos = self._lookup(token_id)
+        return default if pos is None else self.tokens[pos]
+
+    def __contains__(self, token_id) -> bool:
+        return self._lookup(token_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def append(self, token: dict) -> None:
+        """Add a token at the end of the tokenList, keeping the index current"""
+        if isinstance(self.tokens, dict):
+            if token['id'] not in self.tokens:
+                self._last_key = token['id']
+            self.tokens[token['id']] = token
+            self.positions[token['id']] = token['id']
+        else:
+            self.positions[token['id']] = len(self.tokens)
+            self.tokens.append(token)
+        self._size = len(self.tokens)
+        self._ends = self._end_ids()
+
+    def extend(self, tokens: Iterable[dict]) -> None:
+        for token in tokens:
+            self.append(token)
+
+    def insert(self, position: int, token: dict) -> None:
+        """Insert a token into a list tokenList, shifting the positions of the tokens after it"""
+        if isinstance(self.tokens, dict):
+            return self.append(token)
+        self.tokens.insert(position, token)
+        if self._size + 1 != len(self.tokens):
+            return self.rebuild()
+        for t in self.tokens[position + 1:]:
+            self.positions[t['id']] += 1
+        self.positions[token['id']] = position
+        self._size = len(self.tokens)
+        self._ends = self._end_ids()
+
+
+def get_token_index(doc: OrderedDict) -> TokenIndex:
+    """Return the TokenIndex of a document's tokenList, building it on first use"""
+    cache = document_cache(doc)
+    tokens = doc.get('tokenList', [])
+    index = cache.get('token_index')
+    if index is None or index.tokens is not tokens:
+        index = cache['token_index'] = TokenIndex(tokens)
+    return index
+
+
+class IntervalIndex:
+    """
+    A static centered interval tree over half-open intervals [begin, end), each carrying an item.
+    Built in O(n log n); stab() and overlap() queries run in O(log n + k) for k results.
+    Results are returned in the order the intervals were added.
+    """
+
+    def __init__(self, intervals: Iterable[tuple] = ()):
+        self.intervals = [(b, e, i, item) for i, (b, e, item) in enumerate(intervals) if b < e]
+        self._root = self._build(self.intervals)
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    @staticmethod
+    def _build(intervals: list):
+        if not intervals:
+            return None
+        # the median begin lies inside at least its own interval, so every node holds one or more intervals
+        center = sorted(iv[0] for iv in intervals)[len(intervals) // 2]
+        left, right, here = [], [], []
+        for iv in intervals:
+            if iv[1] <= center:
+                left.append(iv)
+            elif iv[0] > center:
+                right.append(iv)
+            else:
+                here.append(iv)
+        # a node holds the intervals containing its center, sorted by begin ascending and by end descending
+        return (center,
+                sorted(here, key=lambda iv: iv[0]),
+                sorted(here, key=lambda iv: -iv[1]),
+                IntervalIndex._build(left),
+                IntervalIndex._build(right))
+
+    def stab(self, point) -> list:
+        """All items whose interval contains point"""
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_begin, by_end, left, right = node
+            if point < center:
+                for iv in by_begin:
+                    if iv[0] > point:
+                        break
+                    found.append(iv)
+                node = left
+            else:
+                for iv in by_end:
+                    if iv[1] <= point:
+                        break
+                    found.append(iv)
+                node = right
+        return [iv[3] for iv in sorted(found, key=lambda iv: iv[2])]
+
+    def overlap(self, begin, end) -> list:
+        """All items whose interval overlaps the half-open range [begin, end)"""
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            center, by_begin, by_end, left, right = node
+            if end <= center:
+                # only intervals starting before end can overlap
+                for iv in by_begin:
+                    if iv[0] >= end:
+                        break
+                    found.append(iv)
+                stack.append(left)
+            elif begin > center:
+                # only intervals ending after begin can overlap
+                for iv in by_end:
+                    if iv[1] <= begin:
+                        break
+                    found.append(iv)
+                stack.append(right)
+            else:
+                # the range contains the center, so every interval of this node overlaps it
+                found.extend(by_begin)
+                stack.append(left)
+                stack.append(right)
+        return [iv[3] for iv in sorted(found, key=lambda iv: iv[2])]
+
+
+class SpanIndex:
+    """
+    Interval indexes over the sentences, clauses, paragraphs and expressions of a document, by token range
+    (tokenFrom/tokenTo, or the extent of the token ids) and by character offsets (characterOffsetBegin/End of the item
+    itself, or of its first and last token).
+    """
+
+    collections = ('sentences', 'clauses', 'paragraphs', 'expressions')
+
+    def __init__(self, doc: OrderedDict):
+        self.doc = doc
+        self.tokens = get_token_index(doc)
+        self._by_token: Dict[str, IntervalIndex] = {}
+        self._by_char: Dict[str, IntervalIndex] = {}
+        self._char_tokens: IntervalIndex = None
+
+    def _items(self, collection: str) -> list:
+        items = self.doc.get(collection, [])
+        return list(items.values()) if isinstance(items, dict) else list(items)
+
+    @staticmethod
+    def token_range(item: dict) -> tuple:
+        """The half-open range of token ids covered by an item, or (0, 0) if it covers none"""
+        if 'tokenFrom' in item and 'tokenTo' in item:
+            return item['tokenFrom'], item['tokenTo']
+        tokens = item.get('tokens')
+        if not tokens:
+            return 0, 0
+        return min(tokens), max(tokens) + 1
+
+    def char_range(self, item: dict) -> tuple:
+        """The half-open range of character offsets covered by an item, or (0, 0) if it is unknown"""
+        if 'characterOffsetBegin' in item and 'characterOffsetEnd' in item:
+            return item['characterOffsetBegin'], item['characterOffsetEnd']
+        t_from, t_to = self.token_range(item)
+        ids = item.get('tokens') or [t_from, t_to - 1]
+        first, last = self.tokens.get(min(ids), {}), self.tokens.get(max(ids), {})
+        if 'characterOffsetBegin' not in first or 'characterOffsetEnd' not in last:
+            return 0, 0
+        return first['characterOffsetBegin'], last['characterOffsetEnd']
+
+    def by_token(self, collection: str) -> IntervalIndex:
+        if collection not in self._by_token:
+            self._by_token[collection] = IntervalIndex(self.token_range(item) + (item, )
+                                                       for item in self._items(collection))
+        return self._by_token[collection]
+
+    def by_char(self, collection: str) -> IntervalIndex:
+        if collection not in self._by_char:
+            self._by_char[collection] = IntervalIndex(self.char_range(item) + (item, )
+                                                      for item in self._items(collection))
+        return self._by_char[collection]
+
+    def covering(self, collection: str, token_id) -> list:
+        """The items of a collection that cover a token, e.g. covering('sentences', 12)"""
+        return self.by_token(collection).stab(token_id)
+
+    def in_token_range(self, collection: str, token_from, token_to) -> list:
+        """The items of a collection that overlap the half-open token id range [token_from, token_to)"""
+        return self.by_token(collection).overlap(token_from, token_to)
+
+    def at_char(self, collection: str, offset: int) -> list:
+        return self.by_char(collection).stab(offset)
+
+    def in_char_range(self, collection: str, begin: int, end: int) -> list:
+        """The items of a collection that overlap the character range [begin, end)"""
+        return self.by_char(collection).overlap(begin, end)
+
+    def tokens_in_char_range(self, begin: int, end: int) -> list:
+        """The tokens that overlap the character range [begin, end)"""
+        if self._char_tokens is None:
+            tokens = self.tokens.tokens
+            self._char_tokens = IntervalIndex(
+                (t['characterOffsetBegin'], t['characterOffsetEnd'], t)
+                for t in (tokens.values() if isinstance(tokens, dict) else tokens)
+                if 'characterOffsetBegin' in t and 'characterOffsetEnd' in t)
+        return self._char_tokens.overlap(begin, end)
+
+
+def get_span_index(doc: OrderedDict) -> SpanIndex:
+    """
+    Return the SpanIndex of a document, building it on first use. Each collection is indexed on its first query, and
+    the index is rebuilt when one of the indexed collections is replaced or changes in size.
+    """
+    cache = document_cache(doc)
+    key = tuple((id(doc.get(c)), len(doc.get(c, ()))) for c in SpanIndex.collections + ('tokenList', ))
+    if cache.get('span_index_key') != key:
+        cache['span_index'] = SpanIndex(doc)
+        cache['span_index_key'] = key
+    return cache['span_index']
@@ -0,0 +1,111 @@
+"""
+JSON Lines storage for multi-document JSON-NLP.
+
+Layout:
+    header     one JSON object with everything of the JSON-NLP object but its documents (meta, conll, ...)
+    documents  one JSON object per line, in the order they are written
+
+Documents are read and written one at a time, so a corpus never has to be held in memory. Files without a header line
+(plain one-document-per-line files) are read as well.
+"""
+
+import json
+from collections import OrderedDict
+from typing import Iterable, Iterator, TextIO, Union
+
+
+def _int_keys(pairs) -> OrderedDict:
+    """json object hook restoring the integer keys of tokenLists, sentences, arcs, ..."""
+    return OrderedDict((int(k) if isinstance(k, str) and k.isdigit() else k, v) for k, v in pairs)
+
+
+def _loads(line: str) -> OrderedDict:
+    return json.loads(line, object_pairs_hook=_int_keys)
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def _is_header(obj) -> bool:
+    return isinstance(obj, dict) and 'id' not in obj and 'tokenList' not in obj
+
+
+def _lines(f: TextIO) -> Iterator[str]:
+    for line in f:
+        if line.strip():
+            yield line
+
+
+def read_header(path: str) -> OrderedDict:
+    """The header of a JSON Lines corpus (its JSON-NLP object without the documents), empty if it has none"""
+    with open(path, 'r') as f:
+        for line in _lines(f):
+            obj = _loads(line)
+            return obj if _is_header(obj) else OrderedDict()
+    return OrderedDict()
+
+
+def iter_documents(path: str) -> Iterator[OrderedDict]:
+    """The documents of a JSON Lines corpus, one at a time"""
+    with open(path, 'r') as f:
+        for i, line in enumerate(_lines(f)):
+            obj = _loads(line)
+            if i == 0 and _is_header(obj):
+                continue
+            yield obj
+
+
+class DocumentWriter:
+    """
+    Writes documents to a JSON Lines corpus one at a time, after a header line holding the rest of the JSON-NLP object
+    (e.g. get_base() without its documents). With append=True, the documents are added to the end of an existing
+    corpus and no header is written.
+    """
+
+    def __init__(self, path: str, header: OrderedDict = None, append=False):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'a' if append else 'w')
+        if header is not None and not append:
+            header = OrderedDict((k, v) for k, v in header.items() if k != 'documents')
+            self._file.write(_dumps(header) + '\n')
+
+    def write(self, doc: OrderedDict) -> None:
+        self._file.write(_dumps(doc) + '\n')
+        self.count += 1
+
+    def write_all(self, docs: Iterable[OrderedDict]) -> None:
+        for doc in docs:
+            self.write(doc)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> 'DocumentWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def write_jsonl(path: str, nlp_json: Union[OrderedDict, Iterable[OrderedDict]], header: OrderedDict = None,
+                append=False) -> int:
+    """
+    Write a JSON-NLP object, or an iterable of documents, to a JSON Lines corpus.
+    :returns the number of documents written
+    """
+    if isinstance(nlp_json, dict) and 'documents' in nlp_json:
+        header = nlp_json if header is None else header
+        docs = nlp_json['documents']
+        nlp_json = docs.values() if isinstance(docs, dict) else docs
+    with DocumentWriter(path, header=header, append=append) as writer:
+        writer.write_all(nlp_json)
+    return writer.count
+
+
+def read_jsonl(path: str) -> OrderedDict:
+    """Load a whole JSON Lines corpus as a JSON-NLP object with a list of documents"""
+    j = read_header(path)
+    j['documents'] = list(iter_documents(path))
+    return j
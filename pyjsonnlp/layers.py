@@ -0,0 +1,95 @@
+"""
+Dirty tracking for the layers of JSON-NLP documents.
+
+Derived layers (relations, validation results, CoNLL-U exports) are computed from other layers of a document. A
+LayerManifest remembers the content hashes of the input layers each derived layer was last computed from, so the
+documents whose inputs did not change can be skipped when re-processing a corpus. The manifest is kept apart from the
+documents (the schema allows no extra fields in them) and can be saved to and loaded from a JSON file.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Tuple
+
+# layer -> the document field holding it ('document' is the whole document)
+LAYERS = OrderedDict([
+    ('text', 'text'),
+    ('tokens', 'tokenList'),
+    ('sentences', 'sentences'),
+    ('clauses', 'clauses'),
+    ('paragraphs', 'paragraphs'),
+    ('dependencies', 'dependencies'),
+    ('coreferences', 'coreferences'),
+    ('constituents', 'constituents'),
+    ('expressions', 'expressions'),
+    ('relations', 'relations'),
+    ('document', None),
+])
+
+# derived layer -> the layers it is computed from
+LAYER_DEPENDENCIES = {
+    'relations': ('sentences', 'clauses', 'dependencies'),
+    'conllu': ('tokens', 'sentences', 'dependencies'),
+    'validation': ('document', ),
+}
+
+
+def layer_hash(doc: OrderedDict, layer: str) -> str:
+    """The content hash of a layer of a document (the same for equal content, whatever the key order)"""
+    value = doc if LAYERS[layer] is None else doc.get(LAYERS[layer])
+    try:
+        data = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    except TypeError:
+        # mixed int and str keys cannot be sorted
+        data = json.dumps(value, separators=(',', ':'), default=str)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class LayerManifest:
+    """The input hashes per document id and derived layer, see is_dirty(), mark() and changed()"""
+
+    def __init__(self, entries: Dict[str, Dict[str, Dict[str, str]]] = None):
+        self.entries = entries if entries is not None else {}
+
+    @staticmethod
+    def inputs(doc: OrderedDict, derived: str) -> Dict[str, str]:
+        if derived not in LAYER_DEPENDENCIES:
+            raise ValueError(f'{derived} is not one of {", ".join(LAYER_DEPENDENCIES)}!')
+        return dict((layer, layer_hash(doc, layer)) for layer in LAYER_DEPENDENCIES[derived])
+
+    def is_dirty(self, doc: OrderedDict, derived: str, inputs: Dict[str, str] = None) -> bool:
+        """Whether the inputs of a derived layer changed since it was last marked for the document"""
+        inputs = inputs or self.inputs(doc, derived)
+        return self.entries.get(str(doc['id']), {}).get(derived) != inputs
+
+    def is_recorded(self, doc: OrderedDict, derived: str) -> bool:
+        return derived in self.entries.get(str(doc['id']), {})
+
+    def mark(self, doc: OrderedDict, derived: str, inputs: Dict[str, str] = None) -> None:
+        """Record that a derived layer is now up to date with the document's inputs"""
+        self.entries.setdefault(str(doc['id']), {})[derived] = inputs or self.inputs(doc, derived)
+
+    def changed(self, docs: Iterable[OrderedDict], derived: str) -> Iterator[OrderedDict]:
+        """The documents whose inputs of a derived layer changed"""
+        for doc, _ in self.dirty(docs, derived):
+            yield doc
+
+    def dirty(self, docs: Iterable[OrderedDict], derived: str) -> Iterator[Tuple[OrderedDict, Dict[str, str]]]:
+        """
+        The documents whose inputs of a derived layer changed, with the hashes of their inputs, to pass on to mark()
+        so the inputs are hashed only once
+        """
+        for doc in docs:
+            inputs = self.inputs(doc, derived)
+            if self.is_dirty(doc, derived, inputs):
+                yield doc, inputs
+
+    def save(self, file: str) -> None:
+        with open(file, 'w') as f:
+            json.dump(self.entries, f)
+
+    @staticmethod
+    def load(file: str) -> 'LayerManifest':
+        with open(file, 'r') as f:
+            return LayerManifest(json.load(f))
@@ -0,0 +1,222 @@
+"""
+Lazy access to the documents of a (huge) JSON-NLP file.
+
+The file is memory-mapped, and a byte scanner locates the top-level fields and the boundaries of each document in the
+documents array (or object) without decoding them. Documents, or single fields of them such as the tokenList, are only
+decoded when asked for, so memory use depends on the size of the documents read, not on the size of the file.
+"""
+
+import json
+import mmap
+import re
+from collections import OrderedDict
+from typing import Iterator, List, Tuple
+
+from pyjsonnlp import _DOCUMENT_FIELDS
+from pyjsonnlp.corpus import CorpusError
+from pyjsonnlp.jsonl import _int_keys
+
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_SCALAR = re.compile(rb'[^,\]}\s]+')
+_STRING_TOKEN = re.compile(_STRING, re.S)
+
+
+def _container(inner: bytes) -> bytes:
+    """A pattern for a container whose values match inner (or are scalars); unrolled, so it cannot backtrack badly"""
+    return rb'[\[{][^"\[\]{}]*(?:(?:' + inner + rb')[^"\[\]{}]*)*[\]}]'
+
+
+# containers nested up to _NESTING deep are matched whole by the regex engine, so only the brackets of deeper
+# structures (a document, its tokenList, ...) are counted one by one; the file is assumed to be well-formed JSON
+_NESTING = 3
+_CONTAINERS = [_container(_STRING)]
+for _ in range(_NESTING - 1):
+    _CONTAINERS.insert(0, _container(_CONTAINERS[0] + rb'|' + _STRING))
+_STRUCTURE = re.compile(rb'|'.join(_CONTAINERS + [_STRING, rb'[\[\]{}]']), re.S)
+
+
+def _skip(data, pos: int) -> int:
+    return _WHITESPACE.match(data, pos).end()
+
+
+def _string_end(data, pos: int) -> int:
+    """The end of the string starting at pos (its opening quote)"""
+    m = _STRING_TOKEN.match(data, pos)
+    if m is None:
+        raise CorpusError(f'Unterminated string at byte {pos}!')
+    return m.end()
+
+
+def _value_end(data, pos: int) -> int:
+    """The end of the JSON value starting at pos"""
+    c = data[pos]
+    if c == 0x22:
+        return _string_end(data, pos)
+    if c not in (0x5b, 0x7b):
+        m = _SCALAR.match(data, pos)
+        if m is None:
+            raise CorpusError(f'Unexpected {chr(c)!r} at byte {pos}!')
+        return m.end()
+    depth = 0
+    while True:
+        m = _STRUCTURE.search(data, pos)
+        if m is None:
+            raise CorpusError(f'Unterminated value at byte {pos}!')
+        pos = m.end()
+        if pos - m.start() == 1:
+            depth += 1 if data[m.start()] in (0x5b, 0x7b) else -1
+        if depth == 0:
+            return pos
+
+
+def _members(data, pos: int, value_end=None) -> Iterator[Tuple[str, int, int]]:
+    """
+    The key and value span of each member of the object starting at pos. value_end(key, start) can take over finding
+    the end of a value.
+    """
+    pos = _skip(data, pos + 1)
+    while data[pos] != 0x7d:
+        key_end = _string_end(data, pos)
+        key = json.loads(data[pos:key_end])
+        pos = _skip(data, key_end)
+        if data[pos] != 0x3a:
+            raise CorpusError(f'Expected ":" at byte {pos}!')
+        start = _skip(data, pos + 1)
+        end = _value_end(data, start) if value_end is None else value_end(key, start)
+        yield key, start, end
+        pos = _skip(data, end)
+        if data[pos] == 0x2c:
+            pos = _skip(data, pos + 1)
+
+
+def _elements(data, pos: int) -> Iterator[Tuple[int, int]]:
+    """The span of each element of the array starting at pos"""
+    pos = _skip(data, pos + 1)
+    while data[pos] != 0x5d:
+        end = _value_end(data, pos)
+        yield pos, end
+        pos = _skip(data, end)
+        if data[pos] == 0x2c:
+            pos = _skip(data, pos + 1)
+
+
+class LazyCorpus:
+    """
+    A memory-mapped JSON-NLP file. Documents are indexed by position on opening, and by id on first use of get();
+    corpus[i] and iteration decode whole documents, field() and iter_field() only a single field of each.
+    With complete=True, missing fields of a document are added with empty values, as in get_base_document().
+    """
+
+    def __init__(self, path: str, complete=False):
+        self.path = path
+        self.complete = complete
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise CorpusError(f'{path} is empty!')
+        self._fields: OrderedDict = OrderedDict()
+        self.spans: List[Tuple[int, int]] = []
+        self._ids = None
+        start = _skip(self._data, 0)
+        if start >= len(self._data) or self._data[start] != 0x7b:
+            self.close()
+            raise CorpusError(f'{path} is not a JSON-NLP file!')
+        for key, begin, end in _members(self._data, start, self._index_documents):
+            self._fields[key] = (begin, end)
+
+    def _index_documents(self, key: str, begin: int) -> int:
+        """Find the end of a top-level value, and the spans of the documents on the way"""
+        if key != 'documents':
+            return _value_end(self._data, begin)
+        if self._data[begin] == 0x7b:
+            self.spans = [(b, e) for _, b, e in _members(self._data, begin)]
+        else:
+            self.spans = list(_elements(self._data, begin))
+        return _skip(self._data, self.spans[-1][1] if self.spans else begin + 1) + 1
+
+    def _decode(self, begin: int, end: int):
+        return json.loads(self._data[begin:end], object_pairs_hook=_int_keys)
+
+    @property
+    def header(self) -> OrderedDict:
+        """The JSON-NLP object without its documents"""
+        return OrderedDict((k, self._decode(*span)) for k, span in self._fields.items() if k != 'documents')
+
+    @property
+    def meta(self) -> OrderedDict:
+        return self._decode(*self._fields['meta']) if 'meta' in self._fields else OrderedDict()
+
+    def _document(self, begin: int, end: int) -> OrderedDict:
+        doc = self._decode(begin, end)
+        if not self.complete:
+            return doc
+        completed = OrderedDict((k, doc[k]) for k in ('meta', 'id') if k in doc)
+        for k, empty in _DOCUMENT_FIELDS.items():
+            completed[k] = doc[k] if k in doc else empty()
+        completed.update(doc)
+        return completed
+
+    def _field_span(self, position: int, name: str) -> Tuple[int, int]:
+        for key, begin, end in _members(self._data, self.spans[position][0]):
+            if key == name:
+                return begin, end
+        return None
+
+    def ids(self) -> List:
+        """The document ids, in file order, read without decoding the documents"""
+        if self._ids is None:
+            ids = []
+            for i in range(len(self.spans)):
+                span = self._field_span(i, 'id')
+                ids.append(None if span is None else self._decode(*span))
+            self._ids = dict((d_id, i) for i, d_id in enumerate(ids))
+        return list(self._ids.keys())
+
+    def position(self, doc_id) -> int:
+        self.ids()
+        if doc_id not in self._ids and isinstance(doc_id, str) and doc_id.isdigit():
+            doc_id = int(doc_id)
+        return self._ids[doc_id]
+
+    def get(self, doc_id, default=None) -> OrderedDict:
+        try:
+            return self[self.position(doc_id)]
+        except KeyError:
+            return default
+
+    def field(self, position: int, name: str, default=None):
+        """A single field of the document at a position, e.g. field(0, 'tokenList'), without decoding the rest"""
+        span = self._field_span(position, name)
+        if span is None:
+            return _DOCUMENT_FIELDS[name]() if self.complete and name in _DOCUMENT_FIELDS else default
+        return self._decode(*span)
+
+    def iter_field(self, name: str, default=None) -> Iterator:
+        """A single field of every document, one at a time"""
+        for i in range(len(self.spans)):
+            yield self.field(i, name, default)
+
+    def __getitem__(self, position: int) -> OrderedDict:
+        return self._document(*self.spans[position])
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __iter__(self) -> Iterator[OrderedDict]:
+        for span in self.spans:
+            yield self._document(*span)
+
+    def close(self) -> None:
+        if getattr(self, '_data', None) is not None:
+            self._data.close()
+            self._data = None
+        self._file.close()
+
+    def __enter__(self) -> 'LazyCorpus':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
@@ -7,8 +7,14 @@ Brought to you by the NLP-Lab.org (https://nlp-lab.org/) and Semiring Inc.!
 """
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
 import requests
 
+from pyjsonnlp.tokenization import boundaries
+from pyjsonnlp.unification import Unifier
+
 
 class Pipeline(object):
     """An interface for NLP-Json pipelines"""
@@ -89,3 +95,98 @@ class RemotePipeline(Pipeline):
             corrected[key] = value
 
         return corrected
+
+
+class ChunkedPipeline(Pipeline):
+    """
+    Wraps a Pipeline (e.g. a RemotePipeline) to process long texts in chunks. The text is split at sentence (or
+    paragraph) boundaries into chunks of at most max_chars characters, unless a single sentence is longer, and the
+    chunks are sent to the wrapped pipeline concurrently. The documents returned for the chunks are stitched back
+    into one, with their ids shifted as by Unifier.extend_a_with_b and their character offsets shifted to the
+    offsets in the full text.
+    """
+    def __init__(self, pipeline: Pipeline, max_chars=10000, workers=4, paragraphs=False):
+        super(ChunkedPipeline, self).__init__()
+        self.pipeline = pipeline
+        self.max_chars = max_chars
+        self.workers = workers
+        self.paragraphs = paragraphs
+
+    def chunks(self, text: str) -> List[Tuple[int, str]]:
+        """The chunks of a text with their character offsets; the chunks add up to the full text"""
+        starts, last = [0], 0
+        for offset in boundaries(text, paragraphs=self.paragraphs) + [len(text)]:
+            # cut before the sentence that would make the chunk too long
+            if offset - starts[-1] > self.max_chars and last > starts[-1]:
+                starts.append(last)
+            last = offset
+        return [(begin, text[begin:end]) for begin, end in zip(starts, starts[1:] + [len(text)])]
+
+    def process(self, text='', coreferences=False, constituents=False, dependencies=False, expressions=False,
+                **kwargs) -> OrderedDict:
+        chunks = self.chunks(text)
+        if len(chunks) < 2:
+            return self.pipeline.process(text, coreferences=coreferences, constituents=constituents,
+                                         dependencies=dependencies, expressions=expressions, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(
+                lambda chunk: self.pipeline.process(chunk[1], coreferences=coreferences, constituents=constituents,
+                                                    dependencies=dependencies, expressions=expressions, **kwargs),
+                chunks))
+
+        return ChunkedPipeline.stitch(text, [begin for begin, _ in chunks], results)
+
+    @staticmethod
+    def stitch(text: str, offsets: List[int], results: List[OrderedDict]) -> OrderedDict:
+        """Concatenate the documents of JSON-NLP objects processed from the chunks of text at offsets"""
+        docs = [list(r['documents'].values()) if isinstance(r['documents'], dict) else r['documents']
+                for r in results]
+        stitched = []
+        for parts in zip(*docs):
+            doc = Unifier.concatenate(parts, offsets=offsets)
+            if 'text' in doc:
+                doc['text'] = text
+            stitched.append(doc)
+
+        j = OrderedDict(results[0])
+        if isinstance(results[0]['documents'], dict):
+            j['documents'] = results[0]['documents'].__class__((doc['id'], doc) for doc in stitched)
+        else:
+            j['documents'] = stitched
+        return j
+
+
+class CompositePipeline(Pipeline):
+    """
+    Runs several pipelines concurrently on the same text, each contributing one annotation layer ('tokens',
+    'coreferences', 'dependencies' or 'expressions'), e.g. CompositePipeline({'dependencies': spacy,
+    'coreferences': corenlp}). Each pipeline is only asked for its own layer, and all of them run at once, so the
+    latency is that of the slowest pipeline rather than the sum. All pipelines must tokenize the text identically.
+    The results are merged with the Unifier in the order the pipelines are given, whatever order they complete in: the
+    first pipeline's result is the base document (its meta, and its token attributes take precedence).
+    """
+    layers = ('tokens', 'coreferences', 'dependencies', 'expressions')
+
+    def __init__(self, pipelines: Dict[str, Pipeline], method='add', workers=None):
+        super(CompositePipeline, self).__init__()
+        for layer in pipelines:
+            if layer not in CompositePipeline.layers:
+                raise ValueError(f'{layer} is not one of {", ".join(CompositePipeline.layers)}!')
+        self.pipelines = pipelines
+        self.unify = {'add': Unifier.add_annotation_to_a_from_b,
+                      'overwrite': Unifier.overwrite_annotation_from_a_with_b}[method]
+        self.workers = workers
+
+    def process(self, text='', coreferences=False, constituents=False, dependencies=False, expressions=False,
+                **kwargs) -> OrderedDict:
+        with ThreadPoolExecutor(max_workers=self.workers or len(self.pipelines)) as executor:
+            futures = [(layer, executor.submit(pipeline.process, text, coreferences=layer == 'coreferences',
+                                               dependencies=layer == 'dependencies',
+                                               expressions=layer == 'expressions', **kwargs))
+                       for layer, pipeline in self.pipelines.items()]
+            merged = None
+            for layer, future in futures:
+                result = future.result()
+                merged = result if merged is None else self.unify(merged, result, layer)
+        return merged
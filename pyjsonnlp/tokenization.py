@@ -37,6 +37,19 @@ def segment(text: str) -> List[List[ConllToken]]:
     return sentences
 
 
+def boundaries(text: str, paragraphs=False) -> List[int]:
+    """
+    The character offsets at which the sentences (or with paragraphs=True, the paragraphs) of a text begin.
+    Unlike the token offsets from segment(), which restart with every paragraph, these are offsets into the text.
+    """
+    offsets = []
+    for paragraph in segmenter.analyze(text):
+        for i, sentence in enumerate(paragraph):
+            if sentence and (i == 0 or not paragraphs):
+                offsets.append(sentence[0].offset)
+    return offsets
+
+
 def surface_string(tokens: List[OrderedDict], trim=False) -> str:
     s = ''.join([t['text'] + (' ' if t.get('misc', {}).get('SpaceAfter', 'No') == 'Yes' else '')
                 for t in tokens])
@@ -2,51 +2,155 @@
 
 """
 
-from collections import OrderedDict
-from typing import List
+import heapq
+import os
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Dict, Tuple, Iterable, Iterator, Union
+
+from pyjsonnlp.corpus import read_documents
+from pyjsonnlp.indexes import TokenIndex, get_token_index
+from pyjsonnlp.vocabulary import get_vocabulary
+
+
+def _is_sorted(tokens: List[int]) -> bool:
+    return all(tokens[i] <= tokens[i+1] for i in range(len(tokens) - 1))
+
+
+def _unique_sorted(tokens) -> List[int]:
+    """Drop the duplicates of an iterable of sorted token ids"""
+    merged: List[int] = []
+    for t_id in tokens:
+        if not merged or merged[-1] != t_id:
+            merged.append(t_id)
+    return merged
+
+
+# id space -> the collection whose size shifts it (character offsets are shifted by concatenate's offsets)
+_ID_SPACES = OrderedDict([('tokens', 'tokenList'), ('sentences', 'sentences'), ('clauses', 'clauses'),
+                          ('paragraphs', 'paragraphs'), ('coreferences', 'coreferences'),
+                          ('expressions', 'expressions')])
+_CHARACTER_FIELDS = {'characterOffsetBegin': 'characters', 'characterOffsetEnd': 'characters'}
+_CONTENT_FIELDS = dict(_CHARACTER_FIELDS, mainVerb='tokens', tokens='tokens', subject='tokens', object='tokens')
+# collection -> field -> the id space its ids (or lists of ids) belong to
+_SHIFTED_FIELDS = OrderedDict([
+    ('tokenList', dict(_CHARACTER_FIELDS, id='tokens')),
+    ('clauses', dict(_CONTENT_FIELDS, id='clauses', sentenceId='sentences', root='tokens')),
+    ('sentences', dict(_CONTENT_FIELDS, id='sentences', tokenFrom='tokens', tokenTo='tokens', clauses='clauses')),
+    ('paragraphs', dict(_CHARACTER_FIELDS, id='paragraphs', tokens='tokens')),
+    ('constituents', {'sentenceId': 'sentences'}),
+    ('expressions', dict(_CHARACTER_FIELDS, id='expressions', head='tokens', tokens='tokens')),
+])
+_ARC_FIELDS = {'dependent': 'tokens', 'sentenceId': 'sentences'}
+_MENTION_FIELDS = {'head': 'tokens', 'tokens': 'tokens'}
+
+def _unify_pair(args: tuple) -> OrderedDict:
+    """Apply a sequence of unifications to a pair of documents (the unit of work of Unifier.unify_parallel)"""
+    doc_a, doc_b, unifiers = args
+    for unify in unifiers:
+        doc_a = unify(doc_a, doc_b)
+    return doc_a
 
 
 class Unifier(object):
     @staticmethod
     def merge_tokens(a: List[int], b: List[int]) -> List[int]:
-        a.extend(b)
-        return list(set(a))
+        """
+        Union of two token id lists, without modifying either. Sorted lists are merged in linear time into a sorted
+        list; otherwise the ids of a come first, followed by the new ids of b, in order.
+        """
+        return Unifier.merge_token_lists([a, b])
+
+    @staticmethod
+    def merge_token_lists(token_lists: List[List[int]]) -> List[int]:
+        """Union of any number of token id lists at once, e.g. all mentions of a coreference chain"""
+        if all(_is_sorted(tokens) for tokens in token_lists):
+            return _unique_sorted(heapq.merge(*token_lists))
+        seen = set()
+        return [t_id for tokens in token_lists for t_id in tokens if not (t_id in seen or seen.add(t_id))]
 
     @staticmethod
     def merge_coreferences(a: List[dict], b: List[dict]) -> List[dict]:
+        return Unifier.merge_coreference_sources([a, b])
+
+    @staticmethod
+    def merge_coreference_sources(sources: List[List[dict]]) -> List[dict]:
+        """
+        Merge the coreference chains of any number of annotation sources in one pass.
+        Chains are matched by the head of their representative, and referents within a chain by their head. The
+        chains of the first source keep their ids; chains new in later sources are numbered on from the largest id of
+        the first source, in source order. Token lists are collected and merged once per mention at the end.
+        The sources are not modified: chains and referents are copied when they change, and shared otherwise.
+        """
         merged: List[dict] = []
-        heads = {}
-        # start by adding all coreferences from a
-        for coref in a:
-            heads[coref['representative']['head']] = coref
-            merged.append(coref)
-
-        for coref in b:
-            # add new heads cart-blanche
-            if coref['representative']['head'] not in heads:
-                heads[coref['representative']['head']] = coref
-                merged.append(coref)
-                coref['id'] = len(heads)
-            else:
+        chains: Dict[int, int] = {}  # representative head -> position in merged
+        referents: Dict[Tuple[int, int], int] = {}  # (representative head, referent head) -> position in referents
+        owned = set()  # chains and referents already copied
+        rep_tokens: Dict[int, List[List[int]]] = OrderedDict()
+        ref_tokens: Dict[Tuple[int, int], List[List[int]]] = OrderedDict()
+        next_id = max((coref.get('id', 0) for coref in sources[0]), default=0) + 1 if sources else 1
+
+        def own_chain(head: int) -> dict:
+            if head not in owned:
+                chain = merged[chains[head]]
+                merged[chains[head]] = dict(chain, representative=dict(chain['representative']),
+                                            referents=list(chain['referents']))
+                owned.add(head)
+            return merged[chains[head]]
+
+        def own_referent(key: Tuple[int, int]) -> dict:
+            refs = own_chain(key[0])['referents']
+            if key not in owned:
+                refs[referents[key]] = dict(refs[referents[key]])
+                owned.add(key)
+            return refs[referents[key]]
+
+        for source_num, source in enumerate(sources):
+            for coref in source:
+                head = coref['representative']['head']
+                # add new heads cart-blanche
+                if head not in chains:
+                    chains[head] = len(merged)
+                    merged.append(coref)
+                    if source_num > 0:
+                        own_chain(head)['id'] = next_id
+                        next_id += 1
+                    for i, ref in enumerate(coref['referents']):
+                        referents.setdefault((head, ref['head']), i)
+                    continue
+
                 # merge representative
-                a_rep = heads[coref['representative']['head']]['representative']
+                a_rep = merged[chains[head]]['representative']
                 for k, v in coref['representative'].items():
                     if k == 'tokens':
-                        a_rep[k] = Unifier.merge_tokens(a_rep[k], v)
+                        rep_tokens.setdefault(head, [a_rep[k]]).append(v)
                     elif k not in a_rep:
-                        a_rep[k] = v
+                        own_chain(head)['representative'][k] = v
 
                 # merge references
-                a_refs = dict((ref['head'], ref) for ref in heads[coref['representative']['head']]['referents'])
                 for ref in coref['referents']:
-                    if ref['head'] not in a_refs:
-                        heads[coref['representative']['head']]['referents'].append(ref)
-                    else:
-                        for k, v in ref.items():
-                            if k == 'tokens':
-                                a_refs[ref['head']][k] = Unifier.merge_tokens(a_refs[ref['head']][k], v)
-                            elif k not in a_refs[ref['head']].keys():
-                                a_refs[ref['head']][k] = v
+                    key = (head, ref['head'])
+                    if key not in referents:
+                        chain = own_chain(head)
+                        referents[key] = len(chain['referents'])
+                        chain['referents'].append(ref)
+                        continue
+                    a_ref = merged[chains[head]]['referents'][referents[key]]
+                    for k, v in ref.items():
+                        if k == 'tokens':
+                            ref_tokens.setdefault(key, [a_ref[k]]).append(v)
+                        elif k not in a_ref:
+                            own_referent(key)[k] = v
+
+        for head, token_lists in rep_tokens.items():
+            tokens = Unifier.merge_token_lists(token_lists)
+            if tokens != token_lists[0]:
+                own_chain(head)['representative']['tokens'] = tokens
+        for key, token_lists in ref_tokens.items():
+            tokens = Unifier.merge_token_lists(token_lists)
+            if tokens != token_lists[0]:
+                own_referent(key)['tokens'] = tokens
 
         return merged
 
@@ -55,37 +159,102 @@ class Unifier(object):
         new_doc = OrderedDict(a)
         from_doc = OrderedDict(b)
 
-        # verify that all token ids/texts line up exactly
-        a_tokens = dict((k, {'id': v['id'], 'text': v['text']}) for k, v in a['tokenList'].items())
-        b_tokens = dict((k, {'id': v['id'], 'text': v['text']}) for k, v in b['tokenList'].items())
-        if a_tokens != b_tokens:
-            raise UnificationError('The two documents must have identical tokenLists to unify annotations!')
+        # verify that all token ids/texts line up exactly; tokens shared by both documents are skipped
+        a_tokens, b_tokens = get_token_index(a), get_token_index(b)
+        if a_tokens.tokens is not b_tokens.tokens:
+            mismatch = Unifier._first_token_mismatch(a_tokens, b_tokens)
+            if mismatch:
+                raise UnificationError('The two documents must have identical tokenLists to unify annotations! '
+                                       + mismatch)
 
         return new_doc, from_doc
 
+    @staticmethod
+    def _first_token_mismatch(a_tokens: TokenIndex, b_tokens: TokenIndex) -> Union[str, None]:
+        """Describe the first token whose id or text differs between two tokenLists, or None if they line up"""
+        for t_a, t_b in zip(a_tokens.values(), b_tokens.values()):
+            if t_a is not t_b and (t_a['id'] != t_b['id'] or t_a.get('text') != t_b.get('text')):
+                return f"First mismatch: token {t_a['id']} '{t_a.get('text')}' vs. " \
+                       f"token {t_b['id']} '{t_b.get('text')}'"
+        if len(a_tokens) != len(b_tokens):
+            return f'The tokenLists have {len(a_tokens)} and {len(b_tokens)} tokens'
+        return None
+
+    @staticmethod
+    def _unify_documents(a: OrderedDict, b: OrderedDict, unify) -> OrderedDict:
+        """Apply unify to every pair of documents with the same id, sharing the documents only in a"""
+        new_json = OrderedDict(a)
+        if isinstance(a['documents'], dict):
+            new_json['documents'] = a['documents'].copy()
+            for d_id, doc in a['documents'].items():
+                if d_id in b['documents']:
+                    new_json['documents'][d_id] = unify(doc, b['documents'][d_id])
+        else:
+            b_docs = dict((doc['id'], doc) for doc in b['documents'])
+            new_json['documents'] = [unify(doc, b_docs[doc['id']]) if doc['id'] in b_docs else doc
+                                     for doc in a['documents']]
+        return new_json
+
+    @staticmethod
+    def _document_lookup(j: OrderedDict) -> dict:
+        """The documents of a JSON-NLP object by key (dict documents) or by id (list documents)"""
+        docs = j['documents']
+        return docs if isinstance(docs, dict) else dict((doc['id'], doc) for doc in docs)
+
+    @staticmethod
+    def _unify_document_sources(a: OrderedDict, sources: List[OrderedDict], unify) -> OrderedDict:
+        """Apply unify to every document of a and the documents with the same id in sources (see _unify_documents)"""
+        lookups = [Unifier._document_lookup(b) for b in sources]
+        new_json = OrderedDict(a)
+        if isinstance(a['documents'], dict):
+            new_json['documents'] = a['documents'].copy()
+            for d_id, doc in a['documents'].items():
+                new_json['documents'][d_id] = unify(doc, [docs[d_id] for docs in lookups if d_id in docs])
+        else:
+            new_json['documents'] = [unify(doc, [docs[doc['id']] for docs in lookups if doc['id'] in docs])
+                                     for doc in a['documents']]
+        return new_json
+
+    @staticmethod
+    def _merge_token_lists(a: Union[list, dict], b: Union[list, dict], prioritize_a: bool) -> Union[list, dict]:
+        """
+        Merge aligned tokenLists into a new tokenList, sharing every token that b adds nothing to. The symbols of the
+        merged tokens are interned in the shared vocabulary.
+        """
+        vocabulary = get_vocabulary()
+
+        def merge(t_a: dict, t_b: dict) -> dict:
+            merged_token = Unifier._merged(t_a, t_b, prioritize_a=prioritize_a)
+            return t_a if merged_token is t_a else vocabulary.intern_token(merged_token)
+
+        if isinstance(a, dict):
+            merged = a.copy()
+            for t_id, t_a in a.items():
+                merged[t_id] = merge(t_a, b[t_id])
+            return merged
+        return [merge(t_a, t_b) for t_a, t_b in zip(a, b)]
+
     @staticmethod
     def overwrite_annotation_from_a_with_b(a: OrderedDict, b: OrderedDict, annotation: str) -> OrderedDict:
         # recursively process all documents
         if 'documents' in a and 'documents' in b:
-            new_json = OrderedDict(a)
-            for d_id in set(a['documents'].keys()) | set(b['documents'].keys()):
-                if d_id in a['documents'] and d_id in b['documents']:
-                    new_json['documents'][d_id] = Unifier.overwrite_annotation_from_a_with_b(a['documents'][d_id],
-                                                                                             b['documents'][d_id],
-                                                                                             annotation)
-            return new_json
+            return Unifier._unify_documents(
+                a, b, lambda doc_a, doc_b: Unifier.overwrite_annotation_from_a_with_b(doc_a, doc_b, annotation))
 
         new_doc, from_doc = Unifier.__copy_docs(a, b)
 
         if annotation == 'coreferences':
             new_doc['coreferences'] = from_doc.get('coreferences', [])
-        if annotation == 'expressions':
+        elif annotation == 'expressions':
             new_doc['expressions'] = from_doc.get('expressions', [])
+        elif annotation == 'dependencies':
+            new_doc['dependencies'] = from_doc.get('dependencies', [])
         elif annotation == 'tokens':
-            for ta_id, t_a in new_doc.get('tokenList', {}).items():
-                Unifier._merge_b_into_a(a=t_a, b=from_doc['tokenList'][ta_id], prioritize_a=False)
+            new_doc['tokenList'] = Unifier._merge_token_lists(new_doc['tokenList'], from_doc['tokenList'],
+                                                              prioritize_a=False)
         else:
-            raise UnificationError("Only 'coreferences', 'tokens', and 'expressions' are currently supported!")
+            raise UnificationError("Only 'coreferences', 'dependencies', 'tokens', and 'expressions' are "
+                                   "currently supported!")
 
         return new_doc
 
@@ -93,13 +262,8 @@ class Unifier(object):
     def add_annotation_to_a_from_b(a: OrderedDict, b: OrderedDict, annotation: str) -> OrderedDict:
         # recursively process all documents
         if 'documents' in a and 'documents' in b:
-            new_json = OrderedDict(a)
-            for d_id in set(a['documents'].keys()) | set(b['documents'].keys()):
-                if d_id in a['documents'] and d_id in b['documents']:
-                    new_json['documents'][d_id] = Unifier.add_annotation_to_a_from_b(a['documents'][d_id],
-                                                                                     b['documents'][d_id],
-                                                                                     annotation)
-            return new_json
+            return Unifier._unify_documents(
+                a, b, lambda doc_a, doc_b: Unifier.add_annotation_to_a_from_b(doc_a, doc_b, annotation))
 
         new_doc, from_doc = Unifier.__copy_docs(a, b)
 
@@ -107,150 +271,256 @@ class Unifier(object):
             new_doc['coreferences'] = Unifier.merge_coreferences(new_doc.get('coreferences', []),
                                                                  from_doc.get('coreferences', []))
         elif annotation == 'tokens':
-            for ta_id, t_a in new_doc.get('tokenList', {}).items():
-                Unifier._merge_b_into_a(a=t_a, b=from_doc['tokenList'][ta_id], prioritize_a=True)
+            new_doc['tokenList'] = Unifier._merge_token_lists(new_doc['tokenList'], from_doc['tokenList'],
+                                                              prioritize_a=True)
         elif annotation == 'expressions':
-            for expr in from_doc.get('expressions', []):
-                expr_shift = len(a.get('expressions', []))
-                if 'expressions' not in new_doc:
-                    new_doc['expressions'] = []
-                new_doc['expressions'].append(expr)
-                expr['id'] += expr_shift
+            expr_shift = len(a.get('expressions', []))
+            new_doc['expressions'] = list(a.get('expressions', [])) + [
+                dict(expr, id=expr['id'] + expr_shift) if 'id' in expr else expr
+                for expr in from_doc.get('expressions', [])]
+        elif annotation == 'dependencies':
+            # add the layers of styles a does not have yet
+            styles = set(layer.get('style', 'universal') for layer in a.get('dependencies', []))
+            new_doc['dependencies'] = list(a.get('dependencies', [])) + [
+                layer for layer in from_doc.get('dependencies', []) if layer.get('style', 'universal') not in styles]
         else:
-            raise UnificationError("Only 'coreferences', 'tokens', and 'expressions' are currently supported!")
+            raise UnificationError("Only 'coreferences', 'dependencies', 'tokens', and 'expressions' are "
+                                   "currently supported!")
 
         return new_doc
 
     @staticmethod
-    def _merge_b_into_a(a: dict, b: dict, prioritize_a=True) -> None:
-        """Recursively merge dict b into dict a, optionally prioritizing dict a's values"""
+    def add_coreferences_to_a_from_sources(a: OrderedDict, sources: List[OrderedDict]) -> OrderedDict:
+        """Merge the coreferences of several annotation sources into a at once (see merge_coreference_sources)"""
+        # recursively process all documents
+        if 'documents' in a and all('documents' in b for b in sources):
+            return Unifier._unify_document_sources(a, sources, Unifier.add_coreferences_to_a_from_sources)
+
+        new_doc = OrderedDict(a)
+        from_docs = [Unifier.__copy_docs(a, b)[1] for b in sources]
+        new_doc['coreferences'] = Unifier.merge_coreference_sources(
+            [new_doc.get('coreferences', [])] + [from_doc.get('coreferences', []) for from_doc in from_docs])
+
+        return new_doc
+
+    @staticmethod
+    def _unifier(method: str, annotation: str = None):
+        """The unification function of a method, taking a pair of documents (picklable, for worker processes)"""
+        if method == 'add':
+            return partial(Unifier.add_annotation_to_a_from_b, annotation=annotation)
+        elif method == 'overwrite':
+            return partial(Unifier.overwrite_annotation_from_a_with_b, annotation=annotation)
+        elif method == 'extend':
+            return Unifier.extend_a_with_b
+        raise UnificationError("Only 'add', 'overwrite', and 'extend' are supported!")
+
+    @staticmethod
+    def unify_parallel(a: OrderedDict, b: OrderedDict, annotations: List[str] = None, workers: int = None,
+                       method: str = 'add', chunksize: int = None) -> OrderedDict:
+        """
+        Unify all documents of two JSON-NLP objects in a pool of worker processes, applying each annotation in turn
+        (e.g. annotations=['tokens', 'coreferences']). Documents are independent, so only the pairs of documents
+        present in both a and b are sent to the workers, in chunks, and the results are put back in document order.
+        Documents only in a are passed through unchanged, and documents only in b are dropped, as with
+        add_annotation_to_a_from_b.
+        :param workers: the number of worker processes (default: one per CPU); with workers=1 no pool is started
+        :param method: 'add', 'overwrite' or 'extend' (which takes no annotations), see stream()
+        """
+        if method not in ('add', 'overwrite', 'extend'):
+            raise UnificationError("Only 'add', 'overwrite', and 'extend' are supported!")
+        if method == 'extend':
+            unifiers = [Unifier._unifier(method)]
+        elif not annotations:
+            raise UnificationError(f"Unifying with '{method}' needs at least one annotation!")
+        else:
+            unifiers = [Unifier._unifier(method, annotation) for annotation in annotations]
+
+        as_dict = isinstance(a['documents'], dict)
+        a_docs = list(a['documents'].items()) if as_dict else [(doc['id'], doc) for doc in a['documents']]
+        b_docs = b['documents'] if isinstance(b['documents'], dict) else \
+            dict((doc['id'], doc) for doc in b['documents'])
+        pairs = [(i, (doc, b_docs[d_id], unifiers)) for i, (d_id, doc) in enumerate(a_docs) if d_id in b_docs]
+
+        if workers == 1 or len(pairs) < 2:
+            results = [_unify_pair(args) for _, args in pairs]
+        else:
+            workers = workers or os.cpu_count() or 1
+            if chunksize is None:
+                chunksize = max(1, len(pairs) // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_unify_pair, [args for _, args in pairs], chunksize=chunksize))
+
+        new_json = OrderedDict(a)
+        new_json['documents'] = a['documents'].copy()
+        for (i, _), doc in zip(pairs, results):
+            new_json['documents'][a_docs[i][0] if as_dict else i] = doc
+        return new_json
+
+    @staticmethod
+    def stream(a: Union[str, Iterable[OrderedDict]], b: Union[str, Iterable[OrderedDict]], annotation: str = None,
+               method: str = 'add') -> Iterator[OrderedDict]:
+        """
+        Unify two streams of documents aligned by id, yielding one unified document at a time, so only one pair of
+        documents is held in memory. a and b are iterables of documents, or paths to JSON Lines corpora (see
+        pyjsonnlp.jsonl) or corpus containers, both ordered by ascending document id. As with whole JSON-NLP objects,
+        documents only in a are passed through unchanged, and documents only in b are dropped.
+        :param method: 'add' (add_annotation_to_a_from_b), 'overwrite' (overwrite_annotation_from_a_with_b) or
+        'extend' (extend_a_with_b, which takes no annotation)
+        """
+        unify = Unifier._unifier(method, annotation)
+        a_docs, b_docs = Unifier._ascending(read_documents(a)), Unifier._ascending(read_documents(b))
+        doc_b = next(b_docs, None)
+        for doc_a in a_docs:
+            while doc_b is not None and doc_b['id'] < doc_a['id']:
+                doc_b = next(b_docs, None)
+            if doc_b is not None and doc_b['id'] == doc_a['id']:
+                yield unify(doc_a, doc_b)
+                doc_b = next(b_docs, None)
+            else:
+                yield doc_a
+
+    @staticmethod
+    def _ascending(docs: Iterator[OrderedDict]) -> Iterator[OrderedDict]:
+        """Pass a stream of documents through, raising if their ids are not in ascending order"""
+        last_id = None
+        for doc in docs:
+            if last_id is not None and doc['id'] < last_id:
+                raise UnificationError('Streamed documents must be ordered by ascending id!')
+            last_id = doc['id']
+            yield doc
+
+    @staticmethod
+    def _merged(a: dict, b: dict, prioritize_a=True) -> dict:
+        """
+        Recursively merge dict b into dict a, optionally prioritizing dict a's values.
+        Neither dict is modified: the result is a new dict sharing all unchanged values, or a itself if b adds nothing.
+        """
+        merged = None
         for k, v in b.items():
             if k not in a:
-                a[k] = v
+                new = v
             elif isinstance(v, dict):
-                Unifier._merge_b_into_a(a[k], b[k])
+                new = Unifier._merged(a[k], v)
             elif not prioritize_a:
-                a[k] = v
+                new = v
+            else:
+                continue
+            if k in a and a[k] is new:
+                continue
+            if merged is None:
+                merged = a.copy()
+            merged[k] = new
+        return a if merged is None else merged
+
+    @staticmethod
+    def _counts(doc: OrderedDict) -> Dict[str, int]:
+        """The number of items per id space of a document, i.e. the id shift for a document appended after it"""
+        return dict((kind, len(doc.get(collection, ()))) for kind, collection in _ID_SPACES.items())
+
+    @staticmethod
+    def _shifted(item: dict, fields: Dict[str, str], shifts: Dict[str, int]) -> dict:
+        """A copy of item with every id field shifted, or item itself if nothing moves"""
+        if not any(shifts[kind] for kind in fields.values()):
+            return item
+        shifted = dict(item)
+        for k, kind in fields.items():
+            if k in shifted and shifts[kind]:
+                v, shift = shifted[k], shifts[kind]
+                shifted[k] = [i + shift for i in v] if isinstance(v, list) else v + shift
+        return shifted
+
+    @staticmethod
+    def _shifted_arcs(layer: dict, shifts: Dict[str, int]) -> dict:
+        token_shift = shifts['tokens']
+        if not token_shift and not shifts['sentences']:
+            return layer
+        arcs = OrderedDict()
+        for dep_id, dep_arcs in layer.get('arcs', {}).items():
+            shifted = [Unifier._shifted(arc, _ARC_FIELDS, shifts) for arc in dep_arcs]
+            for arc in shifted:
+                # governor 0 is the root, not a token
+                if arc.get('governor'):
+                    arc['governor'] += token_shift
+            arcs[dep_id + token_shift] = shifted
+        return dict(layer, arcs=arcs)
+
+    @staticmethod
+    def _merged_arcs(layers: List[dict]) -> dict:
+        """One dependency layer with the (already shifted, so disjoint) arcs of the layers of several documents"""
+        if len(layers) == 1:
+            return layers[0]
+        arcs = OrderedDict()
+        for layer in layers:
+            arcs.update(layer.get('arcs', {}))
+        return dict(layers[0], arcs=arcs)
+
+    @staticmethod
+    def _shifted_coref(coref: dict, shifts: Dict[str, int]) -> dict:
+        if not shifts['tokens'] and not shifts['coreferences']:
+            return coref
+        return dict(Unifier._shifted(coref, {'id': 'coreferences'}, shifts),
+                    representative=Unifier._shifted(coref['representative'], _MENTION_FIELDS, shifts),
+                    referents=[Unifier._shifted(ref, _MENTION_FIELDS, shifts) for ref in coref['referents']])
+
+    @staticmethod
+    def concatenate(docs: List[OrderedDict], offsets: List[int] = None) -> OrderedDict:
+        """
+        Concatenate a sequence of documents, e.g. the chunks of a long document parsed separately, into one.
+        The id shifts of each document are computed once from the documents before it, and every collection is
+        built in a single pass over all documents, so the cost is linear in the total size rather than quadratic
+        as with repeated extend_a_with_b. The items of the first document are shared, and the others are copied with
+        their ids shifted. The dependency layers of a style are merged into one layer holding the arcs of all
+        documents, as consumers such as DocumentGraphs only read the first layer of each style. The inputs are not
+        modified.
+        :param offsets: the character offset of each document in the concatenated text, to shift the character
+        offsets of tokens, sentences, clauses, paragraphs and expressions by (by default, they are kept as they are)
+        """
+        docs = list(docs)
+        if not docs:
+            raise UnificationError('Nothing to concatenate!')
+        items = OrderedDict((collection, []) for collection in _SHIFTED_FIELDS)
+        dependencies: Dict[Tuple[str, int], List[dict]] = OrderedDict()
+        coreferences = []
+        shifts = dict((kind, 0) for kind in _ID_SPACES)
+
+        for i, doc in enumerate(docs):
+            shifts['characters'] = offsets[i] if offsets else 0
+            for collection, fields in _SHIFTED_FIELDS.items():
+                values = doc.get(collection, ())
+                values = values.values() if isinstance(values, dict) else values
+                items[collection].extend(Unifier._shifted(item, fields, shifts) for item in values)
+            occurrences = defaultdict(int)
+            for layer in doc.get('dependencies', []):
+                # the n-th layer of a style in each document becomes one layer, e.g. the 'universal' arcs of all chunks
+                key = (layer.get('style'), occurrences[layer.get('style')])
+                occurrences[layer.get('style')] += 1
+                dependencies.setdefault(key, []).append(Unifier._shifted_arcs(layer, shifts))
+            coreferences.extend(Unifier._shifted_coref(coref, shifts) for coref in doc.get('coreferences', []))
+            for kind, count in Unifier._counts(doc).items():
+                shifts[kind] += count
+
+        new_doc = OrderedDict(docs[0])
+        for collection, values in items.items():
+            if not any(collection in doc for doc in docs):
+                continue
+            form = next(doc[collection] for doc in docs if collection in doc)
+            if isinstance(form, dict):
+                new_doc[collection] = form.__class__((item['id'], item) for item in values)
+            else:
+                new_doc[collection] = values
+        if any('dependencies' in doc for doc in docs):
+            new_doc['dependencies'] = [Unifier._merged_arcs(layers) for layers in dependencies.values()]
+        if any('coreferences' in doc for doc in docs):
+            new_doc['coreferences'] = coreferences
+        return new_doc
 
     @staticmethod
     def extend_a_with_b(a: OrderedDict, b: OrderedDict) -> OrderedDict:
         # recursively process all documents
         if 'documents' in a and 'documents' in b:
-            new_json = OrderedDict(a)
-            for d_id in set(a['documents'].keys()) | set(b['documents'].keys()):
-                if d_id in a['documents'] and d_id in b['documents']:
-                    new_json['documents'][d_id] = Unifier.extend_a_with_b(a['documents'][d_id],
-                                                                          b['documents'][d_id])
-            return new_json
+            return Unifier._unify_documents(a, b, Unifier.extend_a_with_b)
 
-        new_doc = OrderedDict(a)
-        from_doc = OrderedDict(b)
-        token_shift = len(a['tokenList'])
-        sent_shift = len(a.get('sentences', {}))
-        clause_shift = len(a.get('clauses', {}))
-        par_shift = len(a.get('paragraphs', {}))
-        coref_shift = len(a.get('coreferences', []))
-        expr_shift = len(a.get('expressions', []))
-
-        # tokens
-        for t_id, token in from_doc['tokenList'].items():
-            new_doc['tokenList'][t_id+token_shift] = token
-            token['id'] += token_shift
-            
-        # clauses
-        for c_id, clause in from_doc.get('clauses', {}).items():
-            if 'clauses' not in new_doc:
-                new_doc['clauses'] = {}
-            new_doc['clauses'][c_id+clause_shift] = clause
-
-            clause['sentenceId'] += sent_shift
-            clause['id'] += clause_shift
-
-            for tokens in ('mainVerb', 'tokens', 'subject', 'object'):
-                if tokens in clause:
-                    clause[tokens] = [t_id+token_shift for t_id in clause[tokens]]
-
-            for token in ('root', ):
-                if token in clause:
-                    clause[token] += token_shift
-            
-        # sentences
-        for s_id, sentence in from_doc.get('sentences', {}).items():
-            if 'sentences' not in new_doc:
-                new_doc['sentences'] = {}
-            new_doc['sentences'][s_id+sent_shift] = sentence
-            sentence['id'] += sent_shift
-
-            for tokens in ('mainVerb', 'tokens', 'subject', 'object'):
-                if tokens in sentence:
-                    sentence[tokens] = [t_id + token_shift for t_id in sentence[tokens]]
-
-            for token in ('tokenFrom', 'tokenTo'):
-                if token in sentence:
-                    sentence[token] += token_shift
-
-            if 'clauses' in sentence:
-                sentence['clauses'] = [c_id + clause_shift for c_id in sentence['clauses']]
-
-        # paragraphs
-        for p_id, par in from_doc.get('paragraphs', {}).items():
-            if 'paragraphs' not in new_doc:
-                new_doc['paragraphs'] = {}
-            new_doc['paragraphs'][p_id+par_shift] = par
-            par['id'] += par_shift
-            par['tokens'] = [t_id + token_shift for t_id in par['tokens']]
-
-        # dependencies
-        for dependencies in from_doc.get('dependencies', []):
-            if 'dependencies' not in new_doc:
-                new_doc['dependencies'] = []
-            new_doc['dependencies'].append(dependencies)
-
-            for dep_id, arcs in dependencies['arcs'].items():
-                dependencies['arcs'][dep_id+token_shift] = arcs
-                del dependencies['arcs'][dep_id]
-
-                for arc in arcs:
-                    if 'sentenceId' in arc:
-                        arc['sentenceId'] += sent_shift
-                    arc['governor'] += token_shift
-                    if 'dependent' in arc:
-                        arc['dependent'] += token_shift
-
-        # coreferences
-        for coref in from_doc.get('coreferences', []):
-            if 'coreferences' not in new_doc:
-                new_doc['coreferences'] = []
-            new_doc['coreferences'].append(coref)
-            coref['id'] += coref_shift
-
-            coref['representative']['head'] += token_shift
-            coref['representative']['tokens'] = [t_id+token_shift for t_id in coref['representative']['tokens']]
-
-            for ref in coref['referents']:
-                ref['head'] += token_shift
-                ref['tokens'] = [t_id + token_shift for t_id in ref['tokens']]
-
-        # constituents
-        for phrases in from_doc.get('constituents', []):
-            if 'constituents' not in new_doc:
-                new_doc['constituents'] = []
-            new_doc['constituents'].append(phrases)
-
-            phrases['sentenceId'] += sent_shift
-
-        # expressions
-        for expr in from_doc.get('expressions', []):
-            if 'expressions' not in new_doc:
-                new_doc['expressions'] = []
-            new_doc['expressions'] = expr
-            if 'id' in expr:
-                expr['id'] += expr_shift
-            if 'head' in expr:
-                expr['head'] += token_shift
-            expr['tokens'] = [t_id+token_shift for t_id in expr['tokens']]
-        
-        return new_doc
+        return Unifier.concatenate([a, b])
 
 
 class UnificationError(Exception):
@@ -10,11 +10,14 @@ Validates the results of pipelines against the NLP-JSON schema.
 import json
 from collections import OrderedDict
 from os.path import realpath, dirname, join
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Tuple, Union
 
 from pyjsonnlp.pipeline import Pipeline
 from jsonschemanlplab import Draft7Validator, ValidationError
 from pyjsonnlp import remove_empty_fields
+from pyjsonnlp.corpus import CorpusReader, is_corpus, read_documents
+from pyjsonnlp.jsonl import read_header
+from pyjsonnlp.layers import LayerManifest
 
 
 validator = None
@@ -33,21 +36,59 @@ def __load_validator() -> Draft7Validator:
     return validator
 
 
-def is_valid(nlpjson: OrderedDict) -> Tuple[bool, List[str]]:
+def is_valid(nlpjson: OrderedDict, manifest: LayerManifest = None) -> Tuple[bool, List[str]]:
     """
     Validates a json-nlp ordered dictionary.
     :param nlpjson: The json-nlp to be validated
+    :param manifest: Only validate the documents that changed since they last validated, and mark them if they do
     :return: True if the json-nlp validates, False otherwise
     """
+    dirty = []
+    if manifest is not None and nlpjson.get('documents'):
+        nlpjson = OrderedDict(nlpjson)
+        if isinstance(nlpjson['documents'], dict):
+            keys = dict((id(d), k) for k, d in nlpjson['documents'].items())
+            dirty = list(manifest.dirty(nlpjson['documents'].values(), 'validation'))
+            # the rest of the object is always validated, along with at least one document
+            nlpjson['documents'] = nlpjson['documents'].__class__(
+                [(keys[id(d)], d) for d, _ in dirty] or list(nlpjson['documents'].items())[:1])
+        else:
+            dirty = list(manifest.dirty(nlpjson['documents'], 'validation'))
+            nlpjson['documents'] = [d for d, _ in dirty] or nlpjson['documents'][:1]
     valid = True
     errors = []
     v = __load_validator()
     for error in sorted(v.iter_errors(remove_empty_fields(nlpjson)), key=str):
         errors.append(format_error(error))
         valid = False
+    if valid:
+        for d, inputs in dirty:
+            manifest.mark(d, 'validation', inputs)
     return valid, errors
 
 
+def validate_documents(docs: Union[str, Iterable[OrderedDict]],
+                       meta: OrderedDict = None) -> Iterator[Tuple[object, bool, List[str]]]:
+    """
+    Validates documents one at a time, e.g. streamed from a CorpusReader, so a corpus never has to be held in memory.
+    :param docs: The documents to be validated, or the path to a JSON Lines corpus or corpus container
+    :param meta: The meta data of the corpus, if any (read from the corpus if docs is a path)
+    :return: The id of each document, whether it validates, and its errors
+    """
+    if isinstance(docs, str) and meta is None:
+        if is_corpus(docs):
+            with CorpusReader(docs) as reader:
+                meta = reader.meta
+        else:
+            meta = read_header(docs).get('meta')
+    for doc in read_documents(docs):
+        nlpjson = OrderedDict({'documents': {0: doc}})
+        if meta:
+            nlpjson['meta'] = meta
+        valid, errors = is_valid(nlpjson)
+        yield doc.get('id'), valid, errors
+
+
 def validate_pipeline(pipeline: Pipeline, text: str) -> bool:
     """
     Validate a Pipeline with a given text, lang, and any other options.
@@ -0,0 +1,127 @@
+"""
+Interned vocabularies for the small, endlessly repeated strings of a corpus: POS tags, dependency labels and styles,
+feature keys and values.
+
+A Vocabulary keeps one instance of each symbol, so documents parsed or merged with it share their tag and label
+strings instead of holding a copy per token. Symbols are also interned with sys.intern, so comparisons with string
+literals ('nsubj', 'compound') succeed on identity. In compact mode, symbols are mapped to small int codes instead
+(code() and symbol()), e.g. for columnar or in-memory analytics.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+# token fields holding symbols
+TOKEN_SYMBOLS = ('upos', 'xpos', 'entity', 'entity_iob')
+# bound of the shared vocabulary; tag sets and label inventories stay far below it
+SHARED_VOCABULARY_SIZE = 1 << 16
+
+
+class Vocabulary:
+    """
+    A corpus-level symbol table, safe to share between threads.
+    With a max_size, a full vocabulary stops adding symbols: intern() falls back to sys.intern, code() raises.
+    """
+
+    def __init__(self, symbols: Iterable[str] = (), max_size: int = None):
+        self.codes: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        for symbol in symbols:
+            self.code(symbol)
+
+    def intern(self, symbol):
+        """The shared instance of a symbol (anything but a string is returned as it is)"""
+        if not isinstance(symbol, str):
+            return symbol
+        code = self._add(symbol)
+        return sys.intern(symbol) if code is None else self.symbols[code]
+
+    def code(self, symbol: str) -> int:
+        """The int code of a symbol, added to the vocabulary if it is new"""
+        code = self._add(symbol)
+        if code is None:
+            raise ValueError(f'The vocabulary is full ({self.max_size} symbols)!')
+        return code
+
+    def _add(self, symbol: str):
+        """The code of a symbol, added if it is new, or None if the vocabulary is full"""
+        code = self.codes.get(symbol)
+        if code is not None:
+            return code
+        with self._lock:
+            # another thread may have added it meanwhile
+            code = self.codes.get(symbol)
+            if code is None and (self.max_size is None or len(self.symbols) < self.max_size):
+                symbol = sys.intern(symbol)
+                code = len(self.symbols)
+                # the symbol is in place before its code can be looked up
+                self.symbols.append(symbol)
+                self.codes[symbol] = code
+        return code
+
+    def symbol(self, code: int) -> str:
+        return self.symbols[code]
+
+    def clear(self) -> None:
+        """
+        Drop every symbol, e.g. between the batches of a long-running service. Not while other threads use the
+        vocabulary: codes handed out before are no longer valid.
+        """
+        with self._lock:
+            self.codes = {}
+            self.symbols = []
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self.codes
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def intern_features(self, features: dict) -> OrderedDict:
+        """A copy of a feature dict with interned keys and values"""
+        return OrderedDict((self.intern(k), self.intern(v)) for k, v in features.items())
+
+    def intern_token(self, token: dict) -> dict:
+        """Intern the symbols of a token in place (its feature dict is replaced, not changed)"""
+        for field in TOKEN_SYMBOLS:
+            if field in token:
+                token[field] = self.intern(token[field])
+        if token.get('features'):
+            token['features'] = self.intern_features(token['features'])
+        return token
+
+    def intern_dependencies(self, dependencies: dict) -> dict:
+        """Intern the style and arc labels of a dependency layer in place"""
+        if 'style' in dependencies:
+            dependencies['style'] = self.intern(dependencies['style'])
+        for arcs in dependencies.get('arcs', {}).values():
+            for arc in arcs:
+                if 'label' in arc:
+                    arc['label'] = self.intern(arc['label'])
+        return dependencies
+
+    def intern_document(self, doc: OrderedDict) -> OrderedDict:
+        """Intern the token symbols and dependency labels of a document in place"""
+        tokens = doc.get('tokenList', [])
+        for token in (tokens.values() if isinstance(tokens, dict) else tokens):
+            self.intern_token(token)
+        for dependencies in doc.get('dependencies', []):
+            self.intern_dependencies(dependencies)
+        return doc
+
+
+_vocabulary = Vocabulary(max_size=SHARED_VOCABULARY_SIZE)
+
+
+def get_vocabulary() -> Vocabulary:
+    """
+    The vocabulary shared by the conversion and unification modules unless they are given one.
+    It lives as long as the process and only grows, up to SHARED_VOCABULARY_SIZE symbols, after which new symbols are
+    interned with sys.intern alone. Lemmas and feature values of open text can fill it, so long-running services should
+    pass their own vocabulary (e.g. one per corpus or request) to parse_conllu and friends, or clear() this one.
+    """
+    return _vocabulary
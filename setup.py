@@ -14,7 +14,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/SemiringInc/Py-JSON-NLP",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['tests', 'benchmarks']),
     install_requires=[
         'conllu>=1.2.3',
         'jsonschemanlplab>=3.0.1.1',
@@ -23,6 +23,9 @@ setuptools.setup(
         'syntok>=1.1.1',
         'aioify>=0.3.1'
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3.7",
         "License :: OSI Approved :: Apache Software License",
@@ -1,6 +1,9 @@
 import datetime
+import re
 from collections import OrderedDict
 
+from pyjsonnlp import get_base, get_base_document
+
 from pyjsonnlp.microservices import Microservice
 
 from pyjsonnlp.pipeline import Pipeline
@@ -33,6 +36,39 @@ class MockPipeline(Pipeline):
         return OrderedDict(**kwargs)
 
 
+class MockTokenizingPipeline(Pipeline):
+    """Splits text at whitespace, with a sentence ending at every token ending with a period"""
+    def __init__(self):
+        self.texts = []
+
+    def process(self, text='', coreferences=False, constituents=False, dependencies=False, expressions=False,
+                **kwargs) -> OrderedDict:
+        self.texts.append(text)
+        doc = get_base_document(1)
+        doc['text'] = text
+        sentence = None
+        for i, m in enumerate(re.finditer(r'\S+', text)):
+            doc['tokenList'].append({'id': i + 1, 'text': m.group(), 'characterOffsetBegin': m.start(),
+                                     'characterOffsetEnd': m.end()})
+            if sentence is None:
+                sentence = {'id': len(doc['sentences']) + 1, 'tokenFrom': i + 1, 'tokenTo': i + 2}
+                doc['sentences'].append(sentence)
+            sentence['tokenTo'] = i + 2
+            if m.group().endswith('.'):
+                sentence = None
+        if dependencies:
+            doc['dependencies'].append({'style': 'universal', 'arcs': dict(
+                (t['id'], [{'governor': t['id'] - 1, 'label': 'dep'}]) for t in doc['tokenList'])})
+        if coreferences and len(doc['tokenList']) > 1:
+            doc['coreferences'].append({'id': 1, 'representative': {'head': 1, 'tokens': [1]},
+                                        'referents': [{'head': 2, 'tokens': [2]}]})
+        if expressions:
+            doc['expressions'].append({'id': 1, 'type': 'NP', 'head': 1, 'tokens': [1]})
+        j = get_base()
+        j['documents'].append(doc)
+        return j
+
+
 class MockResponse:
     @property
     def status_code(self):
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from unittest import TestCase
+
+import pytest
+
+from pyjsonnlp.annotation import Annotator, AnnotatorChain, DocumentResources
+from pyjsonnlp import document_cache
+from pyjsonnlp.annotation.relations import PresuppositionRelationAnnotator, RelationAnnotator
+
+
+class RecordingAnnotator(Annotator):
+    def __init__(self, name: str, requires=(), provides=(), log=None):
+        self.name = name
+        self.requires = requires
+        self.provides = provides
+        self.log = log if log is not None else []
+
+    def annotate_document(self, doc: OrderedDict, resources: DocumentResources) -> None:
+        self.log.append((self.name, doc['id'], resources))
+
+
+def build_json() -> OrderedDict:
+    docs = []
+    for d_id in (1, 2, 3):
+        docs.append(OrderedDict({
+            'id': d_id,
+            'tokenList': [{'id': 1, 'text': 'Dogs'}, {'id': 2, 'text': 'chase'}, {'id': 3, 'text': 'cats'}],
+            'sentences': {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 4, 'complex': False, 'transitivity': 'transitive',
+                              'mainVerb': [2], 'subject': [1], 'object': [3]}},
+            'dependencies': [{'style': 'universal', 'arcs': {1: [{'governor': 2, 'label': 'nsubj'}],
+                                                             2: [{'governor': 0, 'label': 'root'}],
+                                                             3: [{'governor': 2, 'label': 'obj'}]}}],
+        }))
+    return OrderedDict({'documents': docs})
+
+
+class TestAnnotatorChain(TestCase):
+    def test_order(self):
+        log = []
+        relations = RecordingAnnotator('relations', requires=('clauses', ), provides=('relations', ), log=log)
+        clauses = RecordingAnnotator('clauses', requires=('dependencies', ), provides=('clauses', ), log=log)
+        other = RecordingAnnotator('other', log=log)
+        chain = AnnotatorChain([relations, other, clauses])
+        assert [other, clauses, relations] == chain.annotators
+        assert ('dependencies', ) == chain.requires
+        assert ('clauses', 'relations') == chain.provides
+        chain.annotate(build_json())
+        assert ['other', 'clauses', 'relations'] * 3 == [name for name, _, _ in log]
+        # one set of resources per document, shared by all annotators
+        for d_id in (1, 2, 3):
+            resources = [r for _, d, r in log if d == d_id]
+            assert resources[0] is resources[1] is resources[2]
+        assert log[0][2] is not log[3][2]
+
+    def test_circular(self):
+        with pytest.raises(ValueError):
+            AnnotatorChain([RecordingAnnotator('a', requires=('b', ), provides=('a', )),
+                            RecordingAnnotator('b', requires=('a', ), provides=('b', ))])
+
+    def test_parallel(self):
+        log = []
+        j = build_json()
+        AnnotatorChain([RelationAnnotator(), RecordingAnnotator('log', requires=('relations', ), log=log)],
+                       workers=3).annotate(j)
+        assert [1, 2, 3] == sorted(d for _, d, _ in log)
+        for doc in j['documents']:
+            assert {1: {'id': 1, 'predicate': [2], 'from': [1], 'to': [3]}} == doc['relations']
+
+    def test_resources(self):
+        doc = build_json()['documents'][0]
+        resources = DocumentResources(doc)
+        assert resources.graphs is resources.graphs
+        assert 'cats' == resources.tokens.token(3)['text']
+        assert [2] == [dep.dependent for dep in resources.parse().nodes[0]]
+
+    def test_not_implemented(self):
+        with pytest.raises(NotImplementedError):
+            Annotator().annotate(build_json())
+
+    def test_presupposition_builds_nothing(self):
+        doc = build_json()['documents'][0]
+        annotator = PresuppositionRelationAnnotator()
+        assert () == annotator.requires
+        annotator.annotate_document(doc, DocumentResources(doc))
+        assert {} == doc['relations']
+        assert 'graphs' not in document_cache(doc)
@@ -0,0 +1,59 @@
+import io
+from unittest import TestCase, mock
+
+from benchmarks.corpora import synthetic_corpus
+from benchmarks.harness import compare, measure, percentile
+from benchmarks.run import iter_benchmarks, main
+from pyjsonnlp.validation import is_valid
+
+
+class TestBenchmarks(TestCase):
+    def test_synthetic_corpus(self):
+        j = synthetic_corpus(25, doc_tokens=10, sentence_tokens=4)
+        assert [10, 10, 5] == [len(d['tokenList']) for d in j['documents']]
+        assert 3 == len(j['documents'][0]['sentences'])
+        assert 10 == len(j['documents'][0]['dependencies'][0]['arcs'])
+
+    def test_synthetic_corpus_valid(self):
+        j = synthetic_corpus(25, doc_tokens=10, sentence_tokens=4)
+        keyed = synthetic_corpus(25, doc_tokens=10, sentence_tokens=4, keyed=True)
+        valid, errors = is_valid(keyed)
+        assert valid, errors
+        assert ['1', '2', '3'] == list(keyed['documents'])
+        for doc, keyed_doc in zip(j['documents'], keyed['documents'].values()):
+            assert doc['tokenList'] == list(keyed_doc['tokenList'].values())
+            assert doc['sentences'] == list(keyed_doc['sentences'].values())
+            assert doc['dependencies'] == keyed_doc['dependencies']
+        # the list form is not what the schema describes
+        assert not is_valid(j)[0]
+
+    def test_percentile(self):
+        assert 1 == percentile([3, 1, 2, 4], 25)
+        assert 2 == percentile([3, 1, 2, 4], 50)
+        assert 4 == percentile([3, 1, 2, 4], 99)
+
+    def test_measure(self):
+        result = measure(lambda corpus: (lambda: sum(range(1000)), 1000), None, repeat=3, warmup=0)
+        assert 3 == result['repeat']
+        assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+        assert result['peak_kb'] >= 0
+
+    def test_compare(self):
+        baseline = {'a': {'p50_ms': 100, 'peak_kb': 1000}, 'b': {'p50_ms': 0.1, 'peak_kb': 1}}
+        results = {'a': {'p50_ms': 130, 'peak_kb': 1100}, 'b': {'p50_ms': 0.5, 'peak_kb': 4}, 'c': {'p50_ms': 1}}
+        assert [('a', 'p50_ms', 100, 130)] == compare(results, baseline, threshold=0.25)
+        assert [] == compare(results, baseline, threshold=0.5)
+
+    def test_iter_benchmarks(self):
+        names = [name for name, _ in iter_benchmarks()]
+        assert 'conversion.to_conllu' in names
+        assert 'unification.extend_a_with_b' in names
+        assert ['dependencies.dependency_queries', 'dependencies.universal_dependency_parse'] == \
+            [name for name, _ in iter_benchmarks('dependencies')]
+
+    def test_main(self):
+        # every benchmark runs, so the exit status is a usable gate
+        with mock.patch('sys.stdout', io.StringIO()) as out:
+            assert 0 == main(['--scale', 'tiny', '--repeat', '1', '--warmup', '0'])
+        assert 'conversion.parse_conllu' in out.getvalue()
+        assert 'ERROR' not in out.getvalue()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+import pytest
+
+from pyjsonnlp import get_base, get_base_document
+from pyjsonnlp.conversion import to_conllu
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from pyjsonnlp.columnar import iter_tables, read_tables, table_files, write_tables  # noqa: E402
+
+
+def build_json(doc_ids=(1, 2, 3)) -> OrderedDict:
+    j = get_base()
+    for d_id in doc_ids:
+        doc = get_base_document(d_id)
+        doc['text'] = 'Cats sleep. Dogs bark.'
+        doc['tokenList'] = [
+            {'id': 1, 'text': 'Cats', 'lemma': 'cat', 'upos': 'NOUN', 'xpos': 'NNS',
+             'features': {'Overt': True, 'Number': 'Plur'}, 'characterOffsetBegin': 0, 'characterOffsetEnd': 4},
+            {'id': 2, 'text': 'sleep', 'lemma': 'sleep', 'upos': 'VERB', 'xpos': 'VBP', 'features': {'Overt': True}},
+            {'id': 3, 'text': 'Dogs', 'lemma': 'dog', 'upos': 'NOUN', 'xpos': 'NNS',
+             'features': {'Overt': True, 'Number': 'Plur'}, 'misc': {'SpaceAfter': 'No'}},
+            {'id': 4, 'text': 'bark', 'lemma': 'bark', 'upos': 'VERB', 'xpos': 'VBP', 'features': {'Overt': True}},
+        ]
+        doc['sentences'] = [OrderedDict([('id', 1), ('tokenFrom', 1), ('tokenTo', 3), ('text', 'Cats sleep.')]),
+                            OrderedDict([('id', 2), ('tokenFrom', 3), ('tokenTo', 5)])]
+        doc['dependencies'] = [{'style': 'universal', 'arcs': {
+            1: [{'label': 'nsubj', 'governor': 2, 'dependent': 1, 'sentenceId': 1}],
+            2: [{'label': 'root', 'governor': 0, 'dependent': 2, 'sentenceId': 1}],
+            3: [{'label': 'nsubj', 'governor': 4, 'dependent': 3, 'sentenceId': 2}],
+            4: [{'label': 'root', 'governor': 0, 'dependent': 4, 'sentenceId': 2}],
+        }}]
+        j['documents'].append(doc)
+    return j
+
+
+class TestColumnar(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def round_trip(self, file: str):
+        j = build_json()
+        counts = write_tables(j, file, batch_size=5)
+        assert {'documents': 3, 'sentences': 6, 'tokens': 12} == counts
+        actual = read_tables(file)
+        assert 3 == len(actual['documents'])
+        for expected, doc in zip(j['documents'], actual['documents']):
+            assert expected['id'] == doc['id']
+            assert expected['meta'] == doc['meta']
+            assert expected['text'] == doc['text']
+            assert expected['tokenList'] == doc['tokenList']
+            assert expected['sentences'] == doc['sentences']
+            assert expected['dependencies'] == doc['dependencies']
+        assert to_conllu(j) == to_conllu(actual)
+
+    def test_parquet(self):
+        file = os.path.join(self.dir.name, 'corpus.parquet')
+        self.round_trip(file)
+        tokens = pq.read_table(table_files(file)['tokens'])
+        assert ['cat', 'sleep', 'dog', 'bark'] * 3 == tokens.column('lemma').to_pylist()
+        assert pa.types.is_dictionary(pq.read_schema(table_files(file)['tokens']).field('upos').type)
+
+    def test_arrow(self):
+        file = os.path.join(self.dir.name, 'corpus.arrow')
+        self.round_trip(file)
+        with pa.ipc.open_stream(table_files(file)['tokens']) as reader:
+            table = reader.read_all()
+        assert pa.types.is_dictionary(table.schema.field('deprel').type)
+        assert ['nsubj', 'root'] * 6 == table.column('deprel').to_pylist()
+
+    def test_stream(self):
+        file = os.path.join(self.dir.name, 'corpus.parquet')
+        write_tables(iter(build_json(range(1, 11))['documents']), file, batch_size=1)
+        assert list(range(1, 11)) == [doc['id'] for doc in iter_tables(file)]
+
+    def test_format(self):
+        with pytest.raises(ValueError):
+            write_tables(build_json(), os.path.join(self.dir.name, 'corpus.csv'), file_format='csv')
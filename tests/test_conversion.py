@@ -1,9 +1,16 @@
+import io
+import os
+import tempfile
 from collections import OrderedDict
 from unittest import TestCase
 
+import pytest
+
 from pyjsonnlp import conversion
 from . import mocks
 import pyjsonnlp
+from pyjsonnlp.jsonl import read_jsonl, write_jsonl
+from pyjsonnlp.vocabulary import Vocabulary
 
 pyjsonnlp.__version__ = "0.2.2"
 
@@ -182,3 +189,121 @@ class TestConllu(TestCase):
 
     def test_conllu2json_syntax(self):
         pass
+
+
+CONLLU = """# newdoc id = a
+# sent_id = 1
+# text = John visited Spain.
+1	John	John	PROPN	NNP	Number=Sing	2	nsubj	_	_
+2	visited	visit	VERB	VBD	Tense=Past	0	root	_	_
+3	Spain	Spain	PROPN	NNP	Number=Sing	2	obj	_	_
+4	.	.	PUNCT	.	_	2	punct	_	_
+
+# sent_id = 2
+# text = He left.
+1	He	he	PRON	PRP	_	2	nsubj	_	_
+2	left	leave	VERB	VBD	Tense=Past	0	root	_	_
+3	.	.	PUNCT	.	_	2	punct	_	_
+
+# newdoc id = b
+# sent_id = 3
+# text = Mary stayed.
+1	Mary	Mary	PROPN	NNP	Number=Sing	2	nsubj	_	_
+2	stayed	stay	VERB	VBD	Tense=Past	0	root	_	_
+3	.	.	PUNCT	.	_	2	punct	_	_
+"""
+
+
+class TestConlluRoundTrip(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'corpus.jsonl')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_single_sentence(self):
+        j = conversion.parse_conllu(CONLLU.split('\n\n')[0])
+        assert 1 == len(j['documents'])
+        doc = j['documents'][0]
+        assert 'a' == doc['conllId']
+        assert ['John', 'visited', 'Spain', '.'] == [t['text'] for t in doc['tokenList']]
+        assert [1, 2, 3, 4] == doc['sentences'][0]['tokens']
+        assert 'John visited Spain.' == doc['text']
+        arcs = doc['dependencies'][0]['arcs']
+        assert 'universal' == doc['dependencies'][0]['style']
+        assert [(2, 'nsubj')] == [(a['governor'], a['label']) for a in arcs[1]]
+        assert [(0, 'root')] == [(a['governor'], a['label']) for a in arcs[2]]
+
+    def test_documents(self):
+        j = conversion.parse_conllu(CONLLU)
+        a, b = j['documents']
+        assert (1, 'a') == (a['id'], a['conllId'])
+        assert (2, 'b') == (b['id'], b['conllId'])
+        # token ids and arcs are per document
+        assert [[1, 2, 3, 4], [5, 6, 7]] == [s['tokens'] for s in a['sentences']]
+        assert [[1, 2, 3]] == [s['tokens'] for s in b['sentences']]
+        assert [1, 2, 3] == [t['id'] for t in b['tokenList']]
+        assert list(range(1, 8)) == sorted(a['dependencies'][0]['arcs'])
+        assert [1, 2, 3] == sorted(b['dependencies'][0]['arcs'])
+        assert 6 == a['dependencies'][0]['arcs'][5][0]['governor']
+        assert 'John visited Spain. He left.' == a['text']
+
+    def test_round_trip(self):
+        c = conversion.to_conllu(conversion.parse_conllu(CONLLU))
+        j = conversion.parse_conllu(c)
+        assert c == conversion.to_conllu(j)
+        assert 2 == len(j['documents'])
+        assert ['Mary', 'stayed', '.'] == [t['text'] for t in j['documents'][1]['tokenList']]
+
+    def test_ranges_and_paragraphs(self):
+        text = """# newpar id = p1
+1-2	haven't	_	_	_	_	_	_	_	_
+1	have	have	VERB	VBP	_	0	root	_	_
+2	not	not	PART	RB	_	1	neg	_	_
+
+1-2	don't	_	_	_	_	_	_	_	_
+1	do	do	VERB	VBP	_	0	root	_	_
+2	not	not	PART	RB	_	1	neg	_	NewPar=Yes
+"""
+        doc = conversion.parse_conllu(text)['documents'][0]
+        assert [{'id': 1, 'type': 'conll-range', 'tokens': [1, 2]},
+                {'id': 2, 'type': 'conll-range', 'tokens': [3, 4]}] == doc['expressions']
+        assert [1, 2, 3, 4] == doc['paragraphs'][0]['tokens']
+        assert 'p1' == doc['paragraphs'][0]['conllId']
+
+    def test_vocabulary(self):
+        vocabulary = Vocabulary()
+        doc = conversion.parse_conllu(CONLLU, vocabulary=vocabulary)['documents'][0]
+        tokens = doc['tokenList']
+        assert 'PROPN' in vocabulary and 'nsubj' in vocabulary
+        assert tokens[0]['upos'] is tokens[2]['upos'] is vocabulary.intern('PROPN')
+        assert tokens[0]['features']['Number'] is tokens[2]['features']['Number']
+        arcs = doc['dependencies'][0]['arcs']
+        assert arcs[1][0]['label'] is arcs[5][0]['label']
+
+    def test_iter_conllu_documents(self):
+        docs = list(conversion.iter_conllu_documents(io.StringIO(CONLLU)))
+        assert [1, 2] == [d['id'] for d in docs]
+        assert ['a', 'b'] == [d['conllId'] for d in docs]
+        assert [1, 2, 3] == [t['id'] for t in docs[1]['tokenList']]
+
+    def test_conllu_to_jsonl(self):
+        assert 2 == conversion.conllu_to_jsonl(io.StringIO(CONLLU), self.path)
+        j = read_jsonl(self.path)
+        assert [1, 2] == [d['id'] for d in j['documents']]
+        assert ['John', 'visited', 'Spain', '.', 'He', 'left', '.'] == \
+            [t['text'] for t in j['documents'][0]['tokenList']]
+        assert not os.path.exists(self.path + '.partial')
+
+    def test_conllu_to_jsonl_error(self):
+        existing = conversion.parse_conllu(CONLLU)
+        write_jsonl(self.path, existing)
+        with open(self.path) as f:
+            before = f.read()
+        broken = CONLLU + "\n# newdoc id = c\n1\tOops\toops\tX\tX\t_\t9\tdep\t_\t_\n"
+        with pytest.raises(KeyError):
+            conversion.conllu_to_jsonl(io.StringIO(broken), self.path)
+        with open(self.path) as f:
+            assert before == f.read()
+        assert not os.path.exists(self.path + '.partial')
@@ -0,0 +1,98 @@
+import os
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase, mock
+
+import pytest
+
+from pyjsonnlp import get_base, get_base_document
+from pyjsonnlp.corpus import CorpusError, CorpusReader, CorpusWriter, is_corpus, read_corpus, write_corpus
+from pyjsonnlp.unification import Unifier
+from pyjsonnlp.validation import validate_documents
+
+
+def build_json(doc_ids=(1, 2, 3)) -> OrderedDict:
+    j = get_base()
+    for d_id in doc_ids:
+        doc = get_base_document(d_id)
+        doc['text'] = f'Document {d_id}.'
+        doc['tokenList'] = {1: {'id': 1, 'text': 'Document'}, 2: {'id': 2, 'text': str(d_id)}}
+        j['documents'].append(doc)
+    return j
+
+
+class TestCorpus(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'corpus.jnc')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        j = build_json()
+        assert 3 == write_corpus(self.path, j)
+        assert is_corpus(self.path)
+        actual = read_corpus(self.path)
+        assert j['meta'] == actual['meta']
+        assert j['documents'] == actual['documents']
+
+    def test_random_access(self):
+        write_corpus(self.path, build_json(range(1, 101)))
+        with CorpusReader(self.path) as reader:
+            assert 100 == len(reader)
+            assert '57' == reader[57]['tokenList'][2]['text']
+            assert '57' == reader.get('57')['tokenList'][2]['text']
+            assert 101 not in reader
+            with pytest.raises(KeyError):
+                reader[101]
+
+    def test_contains(self):
+        write_corpus(self.path, build_json())
+        with CorpusReader(self.path) as reader:
+            # membership is answered from the index, without decoding the record
+            with mock.patch.object(reader, '_record', side_effect=AssertionError):
+                assert 2 in reader
+                assert '2' in reader
+                assert 4 not in reader
+                assert '4' not in reader
+                assert 'two' not in reader
+
+    def test_append(self):
+        write_corpus(self.path, build_json())
+        write_corpus(self.path, build_json([4, 5]), append=True)
+        with CorpusReader(self.path) as reader:
+            assert [1, 2, 3, 4, 5] == reader.ids()
+            assert [1, 2, 3, 4, 5] == [doc['id'] for doc in reader]
+            assert reader.meta['DC.conformsTo']
+        with pytest.raises(CorpusError):
+            write_corpus(self.path, build_json([5]), append=True)
+
+    def test_recover_without_footer(self):
+        writer = CorpusWriter(self.path, meta=OrderedDict({'DC.title': 'test'}))
+        writer.write_all(build_json()['documents'])
+        writer._file.close()
+        with CorpusReader(self.path) as reader:
+            assert [1, 2, 3] == reader.ids()
+            assert 'test' == reader.meta['DC.title']
+
+    def test_not_a_corpus(self):
+        with open(self.path, 'w') as f:
+            f.write('{"documents": []}')
+        assert not is_corpus(self.path)
+        with pytest.raises(CorpusError):
+            CorpusReader(self.path)
+
+    def test_stream(self):
+        a = build_json()
+        b = build_json()
+        for doc in b['documents']:
+            doc['tokenList'][1]['lemma'] = 'document'
+        write_corpus(self.path, b)
+        actual = list(Unifier.stream(a['documents'], self.path, 'tokens'))
+        assert ['document'] * 3 == [doc['tokenList'][1]['lemma'] for doc in actual]
+        with CorpusReader(self.path) as reader:
+            results = list(validate_documents(reader, reader.meta))
+        # the schema expects string document ids
+        assert [1, 2, 3] == [d_id for d_id, _, _ in results]
+        assert [["1 is not of type 'string' in documents, 0, id"]] == [errors for _, _, errors in results][:1]
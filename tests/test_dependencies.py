@@ -1,7 +1,11 @@
 from collections import OrderedDict
 from unittest import TestCase
 
-from pyjsonnlp.dependencies import UniversalDependencyParse
+import pytest
+
+from pyjsonnlp import document_cache
+from pyjsonnlp.dependencies import UniversalDependencyParse, DocumentGraphs, EnhancedDependencyParse, \
+    get_document_graphs
 from pyjsonnlp.tokenization import surface_string
 
 j = OrderedDict({
@@ -393,6 +397,101 @@ class TestUniversalDependencies(TestCase):
         expected = {'id': 1, 'text': 'I', 'lemma': '-PRON-', 'xpos': 'PRP', 'upos': 'PRON', 'entity_iob': 'O', 'characterOffsetBegin': 0, 'characterOffsetEnd': 1, 'lang': 'en', 'features': {'Overt': 'Yes', 'Stop': 'Yes', 'Alpha': 'Yes', 'PronType': 'Prs', 'Foreign': 'No'}, 'misc': {'SpaceAfter': 'Yes'}, 'shape': 'X'}
         assert expected == actual, actual
         assert not self.d.get_child_with_arc(2, 'fake')
-        
 
 
+def build_layered_doc() -> OrderedDict:
+    doc = OrderedDict(j['documents'][1])
+    doc['tokenList'] = list(j['documents'][1]['tokenList'].values())
+    doc['dependencies'] = [j['documents'][1]['dependencies'][0], {
+        'style': 'enhanced',
+        'arcs': {
+            1: [{'sentenceId': 1, 'label': 'nsubj', 'governor': 2, 'dependent': 1},
+                {'sentenceId': 1, 'label': 'nsubj:xsubj', 'governor': 4, 'dependent': 1}],
+            2: [{'sentenceId': 1, 'label': 'root', 'governor': 0, 'dependent': 2}],
+            3: [{'sentenceId': 1, 'label': 'mark', 'governor': 4, 'dependent': 3}],
+            4: [{'sentenceId': 1, 'label': 'xcomp', 'governor': 2, 'dependent': 4}],
+        }
+    }]
+    return doc
+
+
+class TestDocumentGraphs(TestCase):
+    def test_styles(self):
+        graphs = DocumentGraphs(build_layered_doc())
+        assert ['universal', 'enhanced'] == graphs.styles, graphs.styles
+
+    def test_missing_style(self):
+        graphs = DocumentGraphs(build_layered_doc())
+        with pytest.raises(ValueError):
+            graphs.graph('Enhanced++')
+
+    def test_universal_parse(self):
+        d = DocumentGraphs(build_layered_doc()).parse('universal')
+        assert isinstance(d, UniversalDependencyParse)
+        actual = surface_string(d.get_leaves(8))
+        assert 'a big red car' == actual, actual
+
+    def test_enhanced_multiple_heads(self):
+        d = DocumentGraphs(build_layered_doc()).parse('enhanced')
+        assert isinstance(d, EnhancedDependencyParse)
+        actual = [(g.governor, g.arc) for g in d.get_heads(1)]
+        assert [(2, 'nsubj'), (4, 'nsubj:xsubj')] == actual, actual
+        actual = [t['id'] for t in d.get_leaves(2)]
+        assert [1, 2, 3, 4] == actual, actual
+
+    def test_cached_on_document(self):
+        doc = build_layered_doc()
+        graphs = get_document_graphs(doc)
+        assert graphs is get_document_graphs(doc)
+        doc['dependencies'] = doc['dependencies'][:1]
+        rebuilt = get_document_graphs(doc)
+        assert rebuilt is not graphs
+        assert ['universal'] == rebuilt.styles, rebuilt.styles
+
+    def test_sentence_shard(self):
+        doc = build_layered_doc()
+        doc['sentences'] = {
+            1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 5, 'tokens': [1, 2, 3, 4]},
+            2: {'id': 2, 'tokenFrom': 5, 'tokenTo': 10, 'tokens': [5, 6, 7, 8, 9]},
+        }
+        graphs = DocumentGraphs(doc)
+        shard = graphs.sentence(2)
+        assert 5 == len(shard.tokens), shard.tokens
+        assert 0 == shard.index.position(5), shard.index.position(5)
+        assert {8: [(5, 'det'), (6, 'amod'), (7, 'amod')]} == dict((k, v) for k, v in shard.nodes.items() if k == 8)
+        assert shard is graphs.sentence(2)
+        assert [('universal', 2)] == list(graphs.shards.keys()), graphs.shards.keys()
+        actual = surface_string(graphs.parse(sentence_id=2).get_leaves(8))
+        assert 'a big red car' == actual, actual
+        assert 'token_index' not in document_cache(doc)
+
+    def test_sentence_shard_unordered_tokens(self):
+        doc = build_layered_doc()
+        doc['tokenList'] = doc['tokenList'][::-1]
+        doc['sentences'] = {2: {'id': 2, 'tokenFrom': 5, 'tokenTo': 10}}
+        graphs = DocumentGraphs(doc)
+        assert [5, 6, 7, 8, 9] == [t['id'] for t in graphs.sentence(2).tokens]
+        actual = surface_string(graphs.parse(sentence_id=2).get_leaves(8))
+        assert 'a big red car' == actual, actual
+
+    def test_sentence_shard_leaves_by_arc(self):
+        words = ['Dogs', 'chase', 'cats', 'Birds', 'eat', 'seeds']
+        doc = OrderedDict({
+            'tokenList': [{'id': i + 1, 'text': w} for i, w in enumerate(words)],
+            'sentences': [{'id': 1, 'tokenFrom': 1, 'tokenTo': 4}, {'id': 2, 'tokenFrom': 4, 'tokenTo': 7}],
+            'dependencies': [{'style': 'universal', 'arcs': dict(
+                (dependent, [{'governor': governor, 'label': label, 'dependent': dependent}])
+                for dependent, governor, label in [(1, 2, 'nsubj'), (2, 0, 'root'), (3, 2, 'dobj'),
+                                                   (4, 5, 'nsubj'), (5, 0, 'root'), (6, 5, 'dobj')])}],
+        })
+        graphs = DocumentGraphs(doc)
+        head, leaves = graphs.parse(sentence_id=2).get_leaves_by_arc('dobj')
+        assert (6, ['seeds']) == (head, [t['text'] for t in leaves])
+        assert 3 == graphs.parse(sentence_id=1).get_leaves_by_arc('dobj')[0]
+
+    def test_build_sentences(self):
+        doc = build_layered_doc()
+        graphs = DocumentGraphs(doc)
+        graphs.build_sentences()
+        assert [('universal', 1)] == list(graphs.shards.keys()), graphs.shards.keys()
+        assert 2 == graphs.sentence(1).sentence_heads[1]
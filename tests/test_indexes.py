@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from unittest import TestCase
+
+import pytest
+
+from pyjsonnlp.indexes import TokenIndex, get_token_index, IntervalIndex, get_span_index
+
+
+def build_tokens() -> list:
+    return [{'id': 1, 'text': 'a'}, {'id': 2, 'text': 'b'}, {'id': 2.1, 'text': 'c'}, {'id': 3, 'text': 'd'}]
+
+
+class TestTokenIndex(TestCase):
+    def test_list_lookup(self):
+        index = TokenIndex(build_tokens())
+        assert 'c' == index.token(2.1)['text']
+        assert 'd' == index.token(3)['text']
+        assert 3 in index
+        assert 4 not in index
+        assert index.get(4) is None
+        with pytest.raises(KeyError):
+            index.token(4)
+
+    def test_dict_lookup(self):
+        tokens = OrderedDict((k, t) for k, t in zip([1, 2, 3, 4], build_tokens()))
+        index = TokenIndex(tokens)
+        assert 3 == index.position(2.1)
+        assert 'd' == index.token(3)['text']
+
+    def test_insert_and_append(self):
+        tokens = build_tokens()
+        index = TokenIndex(tokens)
+        index.insert(0, {'id': 0, 'text': 'z'})
+        index.append({'id': 10, 'text': 'y'})
+        assert [0, 1, 2, 2.1, 3, 10] == [t['id'] for t in tokens]
+        assert 4 == index.position(3)
+        assert 'y' == index.token(10)['text']
+
+    def test_stale_index_rebuilds(self):
+        tokens = build_tokens()
+        index = TokenIndex(tokens)
+        tokens.insert(0, {'id': 0, 'text': 'z'})
+        assert 'd' == index.token(3)['text']
+        assert 'z' == index.token(0)['text']
+
+    def test_ids_changed_in_place(self):
+        doc = OrderedDict({'tokenList': build_tokens()})
+        index = get_token_index(doc)
+        assert 11 not in index
+        for t in doc['tokenList']:
+            t['id'] += 10
+        assert 11 in index
+        assert 'a' == index.get(11)['text']
+        assert 'd' == get_token_index(doc).token(13)['text']
+        assert index.get(1) is None
+        # misses do not scan the tokenList again while it is unchanged
+        index.rebuild = None
+        assert 1 not in index
+        assert index.get(20) is None
+
+    def test_dict_ids_changed_in_place(self):
+        tokens = OrderedDict((k, t) for k, t in zip([1, 2, 3, 4], build_tokens()))
+        index = TokenIndex(tokens)
+        index.append({'id': 5, 'text': 'e'})
+        assert 15 not in index
+        for t in tokens.values():
+            t['id'] += 10
+        assert 'e' == index.token(15)['text']
+        assert 5 == index.position(15)
+
+    def test_cached_on_document(self):
+        doc = OrderedDict({'tokenList': build_tokens()})
+        index = get_token_index(doc)
+        assert index is get_token_index(doc)
+        doc['tokenList'] = build_tokens()[:2]
+        assert index is not get_token_index(doc)
+
+
+def build_doc() -> OrderedDict:
+    words = ['The', 'big', 'dog', 'barked', '.', 'It', 'ran', '.']
+    tokens, offset = [], 0
+    for i, w in enumerate(words):
+        tokens.append({'id': i + 1, 'text': w, 'characterOffsetBegin': offset, 'characterOffsetEnd': offset + len(w)})
+        offset += len(w) + 1
+    return OrderedDict({
+        'tokenList': tokens,
+        'sentences': {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 6}, 2: {'id': 2, 'tokenFrom': 6, 'tokenTo': 9}},
+        'paragraphs': [{'id': 1, 'tokens': [1, 2, 3, 4, 5, 6, 7, 8]}],
+        'expressions': [{'id': 1, 'type': 'NP', 'tokens': [1, 2, 3]}, {'id': 2, 'type': 'NP', 'tokens': [2, 3]},
+                        {'id': 3, 'type': 'NP', 'tokens': [6]}],
+    })
+
+
+class TestIntervalIndex(TestCase):
+    def test_stab_and_overlap_match_scan(self):
+        intervals = [(b, b + w, (b, w)) for b in range(0, 60, 3) for w in (1, 4, 9, 20)]
+        index = IntervalIndex(intervals)
+        for p in range(-2, 85):
+            expected = [item for b, e, item in intervals if b <= p < e]
+            assert expected == index.stab(p), p
+        for begin in range(-2, 85, 5):
+            for end in range(begin + 1, begin + 12, 4):
+                expected = [item for b, e, item in intervals if b < end and e > begin]
+                assert expected == index.overlap(begin, end), (begin, end)
+
+    def test_empty(self):
+        assert [] == IntervalIndex().stab(1)
+        assert [] == IntervalIndex([(3, 3, 'empty')]).overlap(0, 10)
+
+
+class TestSpanIndex(TestCase):
+    def test_covering(self):
+        spans = get_span_index(build_doc())
+        assert [2] == [s['id'] for s in spans.covering('sentences', 7)]
+        assert [1, 2] == [e['id'] for e in spans.covering('expressions', 3)]
+        assert [1] == [p['id'] for p in spans.covering('paragraphs', 8)]
+        assert [] == spans.covering('clauses', 1)
+
+    def test_ranges(self):
+        spans = get_span_index(build_doc())
+        assert [1, 2] == [s['id'] for s in spans.in_token_range('sentences', 5, 7)]
+        # "dog barked" is characters 8-18
+        assert [1, 2] == [e['id'] for e in spans.in_char_range('expressions', 8, 18)]
+        assert [3] == [e['id'] for e in spans.at_char('expressions', 22)]
+        assert ['dog', 'barked'] == [t['text'] for t in spans.tokens_in_char_range(8, 18)]
+
+    def test_rebuilt_on_change(self):
+        doc = build_doc()
+        spans = get_span_index(doc)
+        assert spans is get_span_index(doc)
+        doc['expressions'].append({'id': 4, 'tokens': [7]})
+        assert [4] == [e['id'] for e in get_span_index(doc).covering('expressions', 7)]
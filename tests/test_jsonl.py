@@ -0,0 +1,98 @@
+import os
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+from pyjsonnlp import get_base, get_base_document
+from pyjsonnlp.conversion import _conllu_chunks, to_conllu, write_conllu
+from pyjsonnlp.jsonl import DocumentWriter, iter_documents, read_header, read_jsonl, write_jsonl
+from pyjsonnlp.unification import Unifier
+from pyjsonnlp.validation import validate_documents
+
+
+def build_json(doc_ids=(1, 2, 3)) -> OrderedDict:
+    j = get_base()
+    for d_id in doc_ids:
+        doc = get_base_document(d_id)
+        doc['text'] = f'Document {d_id}.'
+        doc['tokenList'] = {1: {'id': 1, 'text': 'Document', 'upos': 'NOUN'},
+                            2: {'id': 2, 'text': str(d_id), 'upos': 'NUM'}}
+        doc['sentences'] = {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 3, 'tokens': [1, 2]}}
+        j['documents'].append(doc)
+    return j
+
+
+class TestJsonl(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'corpus.jsonl')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        j = build_json()
+        assert 3 == write_jsonl(self.path, j)
+        with open(self.path) as f:
+            assert 4 == len(f.readlines())
+        assert j['meta'] == read_header(self.path)['meta']
+        assert 'documents' not in read_header(self.path)
+        assert j['documents'] == list(iter_documents(self.path))
+        assert j == read_jsonl(self.path)
+
+    def test_writer(self):
+        with DocumentWriter(self.path, header=get_base()) as writer:
+            for doc in build_json()['documents']:
+                writer.write(doc)
+        with DocumentWriter(self.path, append=True) as writer:
+            writer.write_all(build_json([4])['documents'])
+        assert [1, 2, 3, 4] == [doc['id'] for doc in iter_documents(self.path)]
+
+    def test_without_header(self):
+        write_jsonl(self.path, build_json()['documents'])
+        assert OrderedDict() == read_header(self.path)
+        assert [1, 2, 3] == [doc['id'] for doc in iter_documents(self.path)]
+
+    def test_to_conllu(self):
+        j = build_json()
+        write_jsonl(self.path, j)
+        expected = to_conllu(j)
+        assert expected == to_conllu(self.path)
+        assert expected.startswith('# newdoc id = 1\n# sent id = 1\n1\tDocument\t')
+        conllu_path = os.path.join(self.dir.name, 'corpus.conllu')
+        assert 3 == write_conllu(self.path, conllu_path)
+        with open(conllu_path) as f:
+            assert expected == f.read().rstrip()
+
+    def test_conllu_chunks(self):
+        c = '# newdoc id = a\n# sent_id = 1\n1\tA\ta\t_\t_\t_\t0\troot\t_\t_\n\n' \
+            '# newdoc id = b\n# sent_id = 2\n1\tB\tb\t_\t_\t_\t0\troot\t_\t_\n\n'
+        with open(self.path, 'w') as f:
+            f.write(c)
+        with open(self.path) as f:
+            chunks = list(_conllu_chunks(f))
+        assert 2 == len(chunks)
+        assert chunks[1].startswith('# newdoc id = b')
+        assert c == ''.join(chunks)
+
+    def test_validate(self):
+        j = build_json()
+        j['documents'][1]['tokenList'][1]['id'] = 'one'
+        write_jsonl(self.path, j)
+        results = list(validate_documents(self.path))
+        assert [1, 2, 3] == [d_id for d_id, _, _ in results]
+        assert any('one' in e for e in results[1][2])
+        assert not any('one' in e for e in results[0][2])
+
+    def test_stream(self):
+        a, b = build_json(), build_json([2])
+        b['documents'][0]['tokenList'][1]['lemma'] = 'document'
+        a_path = os.path.join(self.dir.name, 'a.jsonl')
+        write_jsonl(a_path, a)
+        write_jsonl(self.path, b)
+        with DocumentWriter(os.path.join(self.dir.name, 'out.jsonl'), header=read_header(a_path)) as writer:
+            writer.write_all(Unifier.stream(a_path, self.path, 'tokens', method='overwrite'))
+        docs = list(iter_documents(writer.path))
+        assert [1, 2, 3] == [doc['id'] for doc in docs]
+        assert 'document' == docs[1]['tokenList'][1]['lemma']
+        assert 'lemma' not in docs[0]['tokenList'][1]
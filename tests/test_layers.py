@@ -0,0 +1,101 @@
+import os
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+import pytest
+
+from pyjsonnlp.annotation.relations import RelationAnnotator
+from pyjsonnlp.conversion import to_conllu
+from pyjsonnlp.layers import LayerManifest, layer_hash
+
+
+def build_json() -> OrderedDict:
+    docs = []
+    for d_id in (1, 2):
+        docs.append(OrderedDict({
+            'id': d_id,
+            'tokenList': [{'id': 1, 'text': 'Dogs'}, {'id': 2, 'text': 'chase'}, {'id': 3, 'text': 'cats'}],
+            'sentences': {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 4, 'complex': False, 'transitivity': 'transitive',
+                              'mainVerb': [2], 'subject': [1], 'object': [3]}},
+            'dependencies': [{'style': 'universal', 'arcs': {1: [{'governor': 2, 'label': 'nsubj'}],
+                                                             2: [{'governor': 0, 'label': 'root'}],
+                                                             3: [{'governor': 2, 'label': 'obj'}]}}],
+            'coreferences': [],
+        }))
+    return OrderedDict({'documents': docs})
+
+
+class TestLayerManifest(TestCase):
+    def test_layer_hash(self):
+        a, b = build_json()['documents']
+        assert layer_hash(a, 'tokens') == layer_hash(b, 'tokens')
+        assert layer_hash(a, 'document') != layer_hash(b, 'document')
+        b['tokenList'][0] = {'text': 'Dogs', 'id': 1}
+        assert layer_hash(a, 'tokens') == layer_hash(b, 'tokens')
+        b['tokenList'][0]['lemma'] = 'dog'
+        assert layer_hash(a, 'tokens') != layer_hash(b, 'tokens')
+
+    def test_dirty(self):
+        doc = build_json()['documents'][0]
+        manifest = LayerManifest()
+        assert manifest.is_dirty(doc, 'relations')
+        manifest.mark(doc, 'relations')
+        assert not manifest.is_dirty(doc, 'relations')
+        # coreferences are no input of relations
+        doc['coreferences'].append({'id': 1, 'representative': {'head': 1, 'tokens': [1]}, 'referents': []})
+        assert not manifest.is_dirty(doc, 'relations')
+        doc['sentences'][1]['transitivity'] = 'intransitive'
+        assert manifest.is_dirty(doc, 'relations')
+        with pytest.raises(ValueError):
+            manifest.is_dirty(doc, 'nonsense')
+
+    def test_save_load(self):
+        doc = build_json()['documents'][0]
+        manifest = LayerManifest()
+        manifest.mark(doc, 'conllu')
+        with tempfile.TemporaryDirectory() as d:
+            manifest.save(os.path.join(d, 'manifest.json'))
+            loaded = LayerManifest.load(os.path.join(d, 'manifest.json'))
+        assert manifest.entries == loaded.entries
+        assert not loaded.is_dirty(doc, 'conllu')
+
+    def test_to_conllu(self):
+        j = build_json()
+        manifest = LayerManifest()
+        assert 2 == to_conllu(j, manifest).count('# newdoc')
+        assert '' == to_conllu(j, manifest)
+        j['documents'][1]['tokenList'][0]['lemma'] = 'dog'
+        assert to_conllu(j, manifest).startswith('# newdoc id = 2')
+
+    def test_relations(self):
+        j = build_json()
+        manifest = LayerManifest()
+        annotator = RelationAnnotator(manifest=manifest)
+        annotator.annotate(j)
+        assert [1, 1] == [len(doc['relations']) for doc in j['documents']]
+        # unchanged documents are skipped, so re-running adds no relations
+        j['documents'][0]['relations'][1]['from'] = [3]
+        annotator.annotate(j)
+        assert [3] == j['documents'][0]['relations'][1]['from']
+        # changed documents are annotated anew
+        j['documents'][0]['sentences'][1]['subject'] = [2]
+        annotator.annotate(j)
+        assert {1: {'id': 1, 'predicate': [2], 'from': [2], 'to': [3]}} == j['documents'][0]['relations']
+
+    def test_inputs_hashed_once(self):
+        from unittest import mock
+        from pyjsonnlp import layers
+        from pyjsonnlp.annotation import AnnotatorChain
+        from pyjsonnlp.validation import is_valid
+
+        def count(run) -> int:
+            with mock.patch.object(layers, 'layer_hash', wraps=layers.layer_hash) as hashed:
+                run()
+            return hashed.call_count
+
+        # one hash per input layer and document: sentences, clauses and dependencies of two documents
+        assert 6 == count(lambda: RelationAnnotator(manifest=LayerManifest()).annotate(build_json()))
+        assert 6 == count(lambda: AnnotatorChain([RelationAnnotator(manifest=LayerManifest())]).annotate(build_json()))
+        assert 6 == count(lambda: to_conllu(build_json(), LayerManifest()))
+        assert 2 == count(lambda: is_valid(build_json(), LayerManifest()))
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+import pytest
+
+from pyjsonnlp import get_base, get_base_document, remove_empty_fields
+from pyjsonnlp.corpus import CorpusError
+from pyjsonnlp.lazy import LazyCorpus
+
+
+def build_json(doc_ids=(1, 2, 3)) -> OrderedDict:
+    j = get_base()
+    for d_id in doc_ids:
+        doc = get_base_document(d_id)
+        doc['text'] = f'Document {d_id} says "hi" \\ {{[bye]}}.'
+        doc['tokenList'] = {1: {'id': 1, 'text': 'Document'}, 2: {'id': 2, 'text': str(d_id)},
+                            3: {'id': 3, 'text': '"\\"', 'misc': {'weight': -1.5e3, 'ok': True, 'none': None}}}
+        j['documents'].append(doc)
+    return j
+
+
+class TestLazyCorpus(TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'corpus.json')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def write(self, j, **kwargs) -> None:
+        with open(self.path, 'w') as f:
+            json.dump(j, f, **kwargs)
+
+    def test_documents(self):
+        j = build_json()
+        self.write(j, indent=2)
+        expected = json.loads(json.dumps(j))
+        with LazyCorpus(self.path) as corpus:
+            assert 3 == len(corpus)
+            assert expected['meta'] == corpus.meta
+            assert ['meta', 'conll'] == list(corpus.header.keys())
+            doc = corpus[1]
+            assert isinstance(doc, OrderedDict)
+            assert list(get_base_document(2).keys()) == list(doc.keys())
+            assert j['documents'][1]['text'] == doc['text']
+            assert j['documents'][1]['tokenList'] == doc['tokenList']
+            assert [1, 2, 3] == [d['id'] for d in corpus]
+
+    def test_by_id(self):
+        j = build_json([5, 7, 9])
+        j['documents'] = OrderedDict((str(d['id']), d) for d in j['documents'])
+        self.write(j)
+        with LazyCorpus(self.path) as corpus:
+            assert [5, 7, 9] == corpus.ids()
+            assert '7' == corpus.get(7)['tokenList'][2]['text']
+            assert '9' == corpus.get('9')['tokenList'][2]['text']
+            assert corpus.get(8) is None
+
+    def test_field(self):
+        j = build_json()
+        self.write(j)
+        with LazyCorpus(self.path) as corpus:
+            assert j['documents'][2]['tokenList'] == corpus.field(2, 'tokenList')
+            assert [3, 3, 3] == [len(t) for t in corpus.iter_field('tokenList')]
+            assert corpus.field(0, 'missing') is None
+
+    def test_complete(self):
+        j = remove_empty_fields(build_json())
+        self.write(j)
+        with LazyCorpus(self.path) as corpus:
+            assert 'sentences' not in corpus[0]
+            assert corpus.field(0, 'sentences') is None
+        with LazyCorpus(self.path, complete=True) as corpus:
+            assert [] == corpus[0]['sentences']
+            assert list(get_base_document(1).keys()) == list(corpus[0].keys())
+            assert [] == corpus.field(0, 'sentences')
+
+    def test_not_json_nlp(self):
+        self.write([1, 2])
+        with pytest.raises(CorpusError):
+            LazyCorpus(self.path)
@@ -3,8 +3,10 @@ from unittest import TestCase, mock
 
 import pytest
 
-from pyjsonnlp.pipeline import Pipeline, RemotePipeline
-from tests.mocks import MockPipeline, MockResponse, MockBadResponse
+from pyjsonnlp import find_head
+from pyjsonnlp.dependencies import get_document_graphs
+from pyjsonnlp.pipeline import Pipeline, RemotePipeline, ChunkedPipeline, CompositePipeline
+from tests.mocks import MockPipeline, MockResponse, MockBadResponse, MockTokenizingPipeline
 
 
 class TestPipeline(TestCase):
@@ -39,3 +41,84 @@ class TestRemotePipeline(TestCase):
         pipeline = RemotePipeline('localhost')
         with pytest.raises(BrokenPipeError):
             pipeline.process()
+
+
+class TestChunkedPipeline(TestCase):
+    text = 'The first sentence is here. A second one follows.\n\nThen a new paragraph starts. It ends now.'
+
+    def test_chunks(self):
+        pipeline = ChunkedPipeline(MockTokenizingPipeline(), max_chars=30)
+        chunks = pipeline.chunks(self.text)
+        assert self.text == ''.join(chunk for _, chunk in chunks)
+        assert [0, 28, 51, 80] == [begin for begin, _ in chunks], chunks
+        pipeline = ChunkedPipeline(MockTokenizingPipeline(), max_chars=60, paragraphs=True)
+        assert [0, 51] == [begin for begin, _ in pipeline.chunks(self.text)]
+        pipeline = ChunkedPipeline(MockTokenizingPipeline(), max_chars=10)
+        assert 4 == len(pipeline.chunks(self.text))
+
+    def test_process(self):
+        expected = MockTokenizingPipeline().process(self.text)['documents'][0]
+        mock = MockTokenizingPipeline()
+        actual = ChunkedPipeline(mock, max_chars=30).process(self.text)['documents'][0]
+        assert 4 == len(mock.texts)
+        assert expected['text'] == actual['text']
+        assert expected['tokenList'] == actual['tokenList'], actual['tokenList']
+        assert expected['sentences'] == actual['sentences'], actual['sentences']
+        for t in actual['tokenList']:
+            assert t['text'] == self.text[t['characterOffsetBegin']:t['characterOffsetEnd']]
+
+    def test_process_dependencies(self):
+        actual = ChunkedPipeline(MockTokenizingPipeline(), max_chars=30).process(self.text, dependencies=True)
+        doc = actual['documents'][0]
+        # the arcs of all chunks are in one layer, with the ids of the stitched document
+        assert ['universal'] == [layer['style'] for layer in doc['dependencies']]
+        assert [t['id'] for t in doc['tokenList']] == list(doc['dependencies'][0]['arcs'])
+        # the second chunk, 'A second one follows.', starts at token 6
+        assert [{'governor': 0, 'label': 'dep'}] == doc['dependencies'][0]['arcs'][6]
+        assert 7 == find_head(doc, [8, 7])
+        assert 6 == find_head(doc, [9, 8, 7, 6])
+        graphs = get_document_graphs(doc)
+        assert 8 == graphs.graph().heads[9][0].governor
+        assert [6, 7, 8, 9] == sorted(t['id'] for t in graphs.parse().get_leaves(6))
+
+    def test_short_text(self):
+        mock = MockTokenizingPipeline()
+        ChunkedPipeline(mock).process(self.text)
+        assert [self.text] == mock.texts
+
+
+class TestCompositePipeline(TestCase):
+    def test_process(self):
+        mocks = dict((layer, MockTokenizingPipeline()) for layer in ('dependencies', 'coreferences', 'expressions'))
+        actual = CompositePipeline(mocks).process('Some words here.')
+        doc = actual['documents'][0]
+        assert ['universal'] == [layer['style'] for layer in doc['dependencies']]
+        assert 1 == len(doc['coreferences'])
+        assert 1 == len(doc['expressions'])
+        assert ['Some words here.'] == mocks['coreferences'].texts
+
+    def test_declared_order(self):
+        import threading
+        done = threading.Event()
+
+        class Source(MockTokenizingPipeline):
+            def __init__(self, name, wait=False):
+                super(Source, self).__init__()
+                self.name, self.wait = name, wait
+
+            def process(self, text='', **kwargs):
+                if self.wait:
+                    assert done.wait(5)
+                result = super(Source, self).process(text, **kwargs)
+                result['documents'][0]['meta']['DC.source'] = self.name
+                if not self.wait:
+                    done.set()
+                return result
+
+        pipelines = OrderedDict([('dependencies', Source('slow', wait=True)), ('coreferences', Source('fast'))])
+        actual = CompositePipeline(pipelines).process('Some words here.')
+        assert 'slow' == actual['documents'][0]['meta']['DC.source']
+
+    def test_layers(self):
+        with pytest.raises(ValueError):
+            CompositePipeline({'nonsense': MockTokenizingPipeline()})
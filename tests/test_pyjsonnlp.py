@@ -1,3 +1,6 @@
+import copy
+import json
+import pickle
 from collections import OrderedDict
 from unittest import TestCase
 import pyjsonnlp
@@ -20,6 +23,30 @@ class TestJsonNlpConstruction(TestCase):
         expected = OrderedDict([('meta', {'DC.conformsTo': 0.1, 'DC.source': '', 'DC.created': '2019-01-25T17:04:34', 'DC.date': '2019-01-25T17:04:34', 'DC.creator': '', 'DC.publisher': '', 'DC.title': '', 'DC.description': '', 'DC.identifier': '', 'DC.language': '', 'DC.subject': '', 'DC.contributors': '', 'DC.type': '', 'DC.format': '', 'DC.relation': '', 'DC.coverage': '', 'DC.rights': '', 'counts': {}}), ('id', 2), ('conllId', ''), ('text', ''), ('tokenList', {}), ('clauses', {}), ('sentences', {}), ('paragraphs', {}), ('dependencies', []), ('coreferences', []), ('constituents', []), ('expressions', [])])
         assert actual == expected, actual
 
+    def test_get_base_created(self):
+        j = pyjsonnlp.get_base(created='2019-01-25T17:04:34')
+        doc = pyjsonnlp.get_base_document(1, created=j['meta']['DC.created'])
+        assert '2019-01-25T17:04:34' == j['meta']['DC.date'] == doc['meta']['DC.created'] == doc['meta']['DC.date']
+        assert doc['meta'] is not pyjsonnlp.get_base_document(2, created='2019-01-25T17:04:34')['meta']
+
+    def test_get_base_document_lazy(self):
+        doc = pyjsonnlp.get_base_document(3, created='2019-01-25T17:04:34', lazy=True)
+        assert OrderedDict([('id', 3)]) == doc
+        assert 'tokenList' not in doc
+        assert [] == doc.get('sentences', [])
+        doc['tokenList'].append({'id': 1, 'text': 'Hi'})
+        assert '2019-01-25T17:04:34' == doc['meta']['DC.created']
+        assert ['id', 'tokenList', 'meta'] == list(doc.keys())
+        assert json.dumps(doc).startswith('{"id": 3, "tokenList": [{"id": 1, "text": "Hi"}], "meta": {')
+        with pytest.raises(KeyError):
+            doc['relations']
+        assert doc == copy.deepcopy(doc)
+        assert doc == pickle.loads(pickle.dumps(doc))
+        eager = pyjsonnlp.get_base_document(3)
+        assert list(eager.keys()) == [
+            'meta', 'id', 'conllId', 'text', 'tokenList', 'clauses', 'sentences', 'paragraphs', 'dependencies', 'coreferences',
+            'constituents', 'expressions']
+
     def test_build_coreference(self):
         actual = pyjsonnlp.build_coreference(42)
         expected = {'id': 42, 'representative': {'tokens': []}, 'referents': []}
@@ -88,6 +115,49 @@ class TestJsonNLPManipulation(TestCase):
         actual = pyjsonnlp.find_head(doc, token_ids, 'universal')
         assert 4 == actual, actual
 
+    def test_find_head_sentence(self):
+        doc = OrderedDict(j['documents'][0])
+        doc['sentences'] = {0: dict(doc['sentences'][0], id=0), 1: dict(doc['sentences'][1], id=1)}
+        doc['dependencies'] = [{'style': 'universal', 'arcs': dict(
+            (k, [v]) for k, v in j['documents'][0]['dependencies'][0]['arcs'].items())}]
+        assert 20 == pyjsonnlp.find_head(doc, [17, 18, 19, 20], 1)
+        assert 10 == pyjsonnlp.find_head(doc, [9, 10], 0)
+
+    def test_find_heads(self):
+        doc = OrderedDict({
+            'dependencies': [{
+                'style': 'universal',
+                'arcs': {
+                    1: [{'governor': 2}],
+                    2: [{'governor': 3}],
+                    3: [{'governor': 4}],
+                    4: [{'governor': 0}],
+                    5: [{'governor': 4}],
+                }
+            }]
+        })
+        actual = pyjsonnlp.find_heads(doc, [[1, 2], [3, 4, 5], [], [5]])
+        assert [2, 4, None, 5] == actual, actual
+
+    def test_find_head_plain_dict(self):
+        from pyjsonnlp.dependencies import DocumentGraphs, get_document_graphs
+        doc = {'dependencies': [{'style': 'universal', 'arcs': {1: [{'governor': 2}], 2: [{'governor': 0}]}}]}
+        assert pyjsonnlp.document_cache(doc) is pyjsonnlp.document_cache(doc)
+        graphs = get_document_graphs(doc)
+        assert 2 == pyjsonnlp.find_head(doc, [1, 2])
+        assert graphs is get_document_graphs(doc)
+        own = DocumentGraphs(doc)
+        assert [2] == pyjsonnlp.find_heads(doc, [[1, 2]], graphs=own)
+        assert 'universal' in own.layers
+
+    def test_document_cache_plain_dict_bounded(self):
+        docs = [{} for _ in range(pyjsonnlp.PLAIN_DOCUMENT_CACHE_SIZE + 1)]
+        first = pyjsonnlp.document_cache(docs[0])
+        first['x'] = 1
+        for doc in docs[1:]:
+            pyjsonnlp.document_cache(doc)
+        assert 'x' not in pyjsonnlp.document_cache(docs[0])
+
     def test_find_head_no_enhanced(self):
         with pytest.raises(ValueError):
             pyjsonnlp.find_head(OrderedDict(), [], 'Enhanced++')
@@ -1,6 +1,112 @@
+import os
+import tempfile
+from collections import OrderedDict
 from unittest import TestCase
 
+import pytest
+
+from pyjsonnlp.annotation.relations import RelationAnnotator, RelationWriter, write_snap
+
+
+def build_json() -> OrderedDict:
+    docs = []
+    for d_id, words in ((1, ['Dogs', 'chase', 'cats']), (2, ['cats', 'chase', 'mice']), (3, ['Dogs', 'eat'])):
+        docs.append(OrderedDict({
+            'id': d_id,
+            'tokenList': [{'id': i + 1, 'text': w} for i, w in enumerate(words)],
+            'sentences': {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': len(words) + 1, 'complex': False,
+                              'transitivity': 'transitive' if len(words) == 3 else 'intransitive',
+                              'mainVerb': [2], 'subject': [1], 'object': [3]}},
+        }))
+    return OrderedDict({'documents': docs})
+
 
 class TestRelationAnnotator(TestCase):
     def test_annotate(self):
-        pass
+        j = build_json()
+        RelationAnnotator().annotate(j)
+        assert {1: {'id': 1, 'predicate': [2], 'from': [1], 'to': [3]}} == j['documents'][0]['relations']
+        assert {} == j['documents'][2]['relations']
+
+    def test_annotate_requires_clauses(self):
+        j = build_json()
+        del j['documents'][1]['sentences'][1]['complex']
+        with pytest.raises(BrokenPipeError, match='document 2, sentence 1'):
+            RelationAnnotator().annotate(j)
+        # nothing is annotated if any document fails the check
+        assert 'relations' not in j['documents'][0]
+
+    def test_annotate_parallel(self):
+        expected = build_json()
+        RelationAnnotator().annotate(expected)
+        actual = build_json()
+        RelationAnnotator(workers=2, chunksize=1).annotate(actual)
+        assert expected == actual, actual
+
+    def test_annotate_parallel_without_manifest_in_batches(self):
+        import threading
+        from pyjsonnlp.layers import LayerManifest
+        manifest = LayerManifest()
+        manifest.lock = threading.Lock()  # unpicklable, so sending it to the workers would fail
+        expected = build_json()
+        RelationAnnotator().annotate(expected)
+        actual = build_json()
+        RelationAnnotator(workers=2, chunksize=1, manifest=manifest).annotate(actual)
+        assert expected == actual, actual
+
+    def test_annotate_incremental(self):
+        j = build_json()
+        RelationAnnotator().annotate(j)
+        doc = j['documents'][0]
+        doc['tokenList'].extend([{'id': 4, 'text': 'Cats'}, {'id': 5, 'text': 'hate'}, {'id': 6, 'text': 'dogs'}])
+        doc['sentences'][2] = {'id': 2, 'tokenFrom': 4, 'tokenTo': 7, 'complex': False, 'transitivity': 'transitive',
+                               'mainVerb': [5], 'subject': [4], 'object': [6]}
+        # sentences with relations are neither checked nor extracted again
+        del doc['sentences'][1]['complex']
+        annotator = RelationAnnotator(incremental=True)
+        assert [doc['sentences'][2]] == annotator.pending(doc)
+        annotator.annotate(j)
+        assert [1, 2] == list(doc['relations'].keys())
+        assert {'id': 2, 'predicate': [5], 'from': [4], 'to': [6]} == doc['relations'][2]
+        assert 1 == len(j['documents'][1]['relations'])
+
+
+class TestWriteSnap(TestCase):
+    def setUp(self) -> None:
+        self.j = build_json()
+        RelationAnnotator().annotate(self.j)
+        self.j['documents'][1]['relations'][1]['from'] = {'head': 1, 'semantic': [1], 'phrase': [1]}
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def read(self, name: str) -> list:
+        with open(os.path.join(self.dir.name, name)) as f:
+            return f.read().splitlines()
+
+    def test_snap(self):
+        file = os.path.join(self.dir.name, 'relations.txt')
+        assert (2, 3) == write_snap(self.j, file, batch_size=1)
+        assert ['# from\tto\tdocument\trelation\tpredicate', '1\t2\t1\t1\tchase', '2\t3\t2\t1\tchase'] == \
+            self.read('relations.txt')
+        assert ['# id\tlabel', '1\tDogs', '2\tcats', '3\tmice'] == self.read('relations.nodes.txt')
+
+    def test_csv_from_documents(self):
+        file = os.path.join(self.dir.name, 'relations.csv')
+        assert (2, 3) == write_snap(iter(self.j['documents']), file)
+        assert ['document,relation,from,to,predicate', '1,1,1,2,chase', '2,1,2,3,chase'] == \
+            self.read('relations.csv')
+        assert ['id,label', '1,Dogs', '2,cats', '3,mice'] == self.read('relations.nodes.csv')
+
+    def test_parquet(self):
+        parquet = pytest.importorskip('pyarrow.parquet')
+        file = os.path.join(self.dir.name, 'relations.parquet')
+        write_snap(self.j, file, batch_size=1)
+        assert [1, 2] == parquet.read_table(file).column('document').to_pylist()
+        assert ['Dogs', 'cats', 'mice'] == \
+            parquet.read_table(os.path.join(self.dir.name, 'relations.nodes.parquet')).column('label').to_pylist()
+
+    def test_format(self):
+        with pytest.raises(ValueError):
+            RelationWriter(os.path.join(self.dir.name, 'relations.csv'), file_format='xml')
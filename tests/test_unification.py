@@ -95,6 +95,24 @@ class TestUnification(TestCase):
         expected = [1, 2, 3, 4]
         assert expected == actual, actual
 
+    def test_merge_tokens_no_side_effects(self):
+        a = [1, 3, 5]
+        b = [2, 3, 6]
+        actual = self.u.merge_tokens(a, b)
+        assert [1, 2, 3, 5, 6] == actual, actual
+        assert [1, 3, 5] == a, a
+        assert [2, 3, 6] == b, b
+
+    def test_merge_tokens_unsorted(self):
+        actual = self.u.merge_tokens([3, 1], [2, 1, 4])
+        expected = [3, 1, 2, 4]
+        assert expected == actual, actual
+
+    def test_merge_token_lists(self):
+        actual = self.u.merge_token_lists([[1, 2], [2, 3], [7], [], [3, 4, 7]])
+        expected = [1, 2, 3, 4, 7]
+        assert expected == actual, actual
+
     def test_add_annotation_to_a_from_b_errors(self):
         a = build_json()
         b = build_json()
@@ -104,12 +122,39 @@ class TestUnification(TestCase):
             del a['documents'][1]['tokenList'][2]
             self.u.add_annotation_to_a_from_b(a, b, 'tokens')
 
+    def test_token_mismatch(self):
+        a = build_json()
+        b = build_json()
+        b['documents'][1]['tokenList'][3] = {'id': 3, 'text': 'x'}
+        with pytest.raises(UnificationError, match="token 3 'c' vs. token 3 'x'"):
+            self.u.add_annotation_to_a_from_b(a, b, 'tokens')
+
+    def test_token_mismatch_after_unification(self):
+        a, b = build_json(), build_json()
+        a_doc, b_doc = a['documents'][1], b['documents'][1]
+        self.u.add_annotation_to_a_from_b(a_doc, b_doc, 'tokens')
+        b_doc['tokenList'][2]['text'] = 'DIFFERENT'
+        with pytest.raises(UnificationError, match="token 2 'b' vs. token 2 'DIFFERENT'"):
+            self.u.add_annotation_to_a_from_b(a_doc, b_doc, 'tokens')
+        b_doc['tokenList'][2] = {'id': 2, 'text': 'REPLACED'}
+        with pytest.raises(UnificationError, match="token 2 'b' vs. token 2 'REPLACED'"):
+            self.u.add_annotation_to_a_from_b(a_doc, b_doc, 'tokens')
+
+    def test_add_annotation_to_a_from_b_dependencies(self):
+        a = build_json()
+        b = build_json()
+        b['documents'][1]['dependencies'].append({'style': 'enhanced', 'arcs': {1: [{'governor': 3}]}})
+        actual = self.u.add_annotation_to_a_from_b(a, b, 'dependencies')['documents'][1]['dependencies']
+        assert [None, 'enhanced'] == [layer.get('style') for layer in actual], actual
+        actual = self.u.overwrite_annotation_from_a_with_b(a, b, 'dependencies')['documents'][1]['dependencies']
+        assert actual is b['documents'][1]['dependencies']
+
     def test_add_annotation_to_a_from_b_expressions(self):
         a = build_json()
         b = build_json()
         b['documents'][1]['expressions'].append({'id': 2})
         actual = self.u.add_annotation_to_a_from_b(a, b, 'expressions')
-        expected = OrderedDict([('documents', {1: OrderedDict([('tokenList', {1: {'id': 1, 'text': 'a'}, 2: {'id': 2, 'text': 'b'}, 3: {'id': 3, 'text': 'c'}, 4: {'id': 4, 'text': 'd'}}), ('clauses', {1: {'sentenceId': 1, 'id': 1, 'tokens': [1, 2], 'root': 1}, 2: {'sentenceId': 1, 'id': 2, 'tokens': [3, 4], 'root': 3}}), ('sentences', {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 5, 'clauses': [1, 2], 'object': [1]}}), ('paragraphs', {1: {'id': 1, 'tokens': [1, 2, 3, 4]}}), ('dependencies', [{'arcs': {1: [{'governor': 2}], 2: [{'governor': 3}]}}]), ('coreferences', [{'id': 1, 'representative': {'head': 1, 'tokens': [1, 2]}, 'referents': [{'head': 3, 'tokens': [3, 4]}]}, {'id': 2, 'representative': {'head': 2, 'tokens': [1, 2]}, 'referents': [{'head': 3, 'tokens': [3, 4]}]}]), ('constituents', [{'sentenceId': 1}]), ('expressions', [{'id': 1, 'head': 1, 'tokens': [1]}, {'id': 2, 'head': 1, 'tokens': [1]}, {'id': 4}])])})])
+        expected = OrderedDict([('documents', {1: OrderedDict([('tokenList', {1: {'id': 1, 'text': 'a'}, 2: {'id': 2, 'text': 'b'}, 3: {'id': 3, 'text': 'c'}, 4: {'id': 4, 'text': 'd'}}), ('clauses', {1: {'sentenceId': 1, 'id': 1, 'tokens': [1, 2], 'root': 1}, 2: {'sentenceId': 1, 'id': 2, 'tokens': [3, 4], 'root': 3}}), ('sentences', {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 5, 'clauses': [1, 2], 'object': [1]}}), ('paragraphs', {1: {'id': 1, 'tokens': [1, 2, 3, 4]}}), ('dependencies', [{'arcs': {1: [{'governor': 2}], 2: [{'governor': 3}]}}]), ('coreferences', [{'id': 1, 'representative': {'head': 1, 'tokens': [1, 2]}, 'referents': [{'head': 3, 'tokens': [3, 4]}]}, {'id': 2, 'representative': {'head': 2, 'tokens': [1, 2]}, 'referents': [{'head': 3, 'tokens': [3, 4]}]}]), ('constituents', [{'sentenceId': 1}]), ('expressions', [{'id': 1, 'head': 1, 'tokens': [1]}, {'id': 2, 'head': 1, 'tokens': [1]}, {'id': 3}])])})])
         assert expected == actual, actual
 
     def test_add_annotation_to_a_from_b_coreferences_new_same_head(self):
@@ -144,6 +189,38 @@ class TestUnification(TestCase):
         actual = self.u.add_annotation_to_a_from_b(a, b, 'coreferences')
         assert len(actual['documents'][1]['coreferences']) == 3, len(actual['documents'][1]['coreferences'])
 
+    def test_merge_coreference_sources(self):
+        def chain(c_id, head, tokens, refs):
+            return {'id': c_id, 'representative': {'head': head, 'tokens': tokens},
+                    'referents': [{'head': h, 'tokens': t} for h, t in refs]}
+        a = [chain(0, 1, [1], [(5, [5])])]
+        b = [chain(0, 1, [1, 2], [(5, [4, 5]), (9, [9])]), chain(1, 3, [3], [])]
+        c = [chain(7, 3, [3, 4], []), chain(8, 6, [6], []), chain(9, 1, [0, 1], [(5, [5, 6])])]
+        actual = self.u.merge_coreference_sources([a, b, c])
+        assert [0, 1, 2] == [coref['id'] for coref in actual], actual
+        assert [0, 1, 2] == actual[0]['representative']['tokens']
+        assert [(5, [4, 5, 6]), (9, [9])] == [(r['head'], r['tokens']) for r in actual[0]['referents']]
+        assert [3, 4] == actual[1]['representative']['tokens']
+
+    def test_add_coreferences_to_a_from_sources(self):
+        a = build_json()
+        b = build_json()
+        c = build_json()
+        c['documents'][1]['coreferences'][0]['representative']['head'] = 4
+        actual = self.u.add_coreferences_to_a_from_sources(a, [b, c])
+        assert [1, 2, 3] == [coref['id'] for coref in actual['documents'][1]['coreferences']]
+
+    def test_add_coreferences_to_a_from_sources_list_documents(self):
+        a, b, c = build_json(), build_json(), build_json()
+        c['documents'][1]['coreferences'][0]['representative']['head'] = 4
+        for j in (a, b, c):
+            j['documents'] = [dict(j['documents'][1], id=1)]
+        del b['documents'][0]
+        actual = self.u.add_coreferences_to_a_from_sources(a, [b, c])
+        assert [1] == [doc['id'] for doc in actual['documents']]
+        assert [1, 2, 3] == [coref['id'] for coref in actual['documents'][0]['coreferences']]
+        assert a['documents'][0] is not actual['documents'][0]
+
     def test_add_annotation_to_a_from_b_coreferences_new_properties(self):
         a = build_json()
         b = build_json()
@@ -168,7 +245,7 @@ class TestUnification(TestCase):
         a = build_json()
         b = build_json()
         actual = self.u.extend_a_with_b(a, b)
-        expected = OrderedDict([('documents', {1: OrderedDict([('tokenList', {1: {'id': 1, 'text': 'a'}, 2: {'id': 2, 'text': 'b'}, 3: {'id': 3, 'text': 'c'}, 4: {'id': 4, 'text': 'd'}, 5: {'id': 5, 'text': 'a'}, 6: {'id': 6, 'text': 'b'}, 7: {'id': 7, 'text': 'c'}, 8: {'id': 8, 'text': 'd'}}), ('clauses', {1: {'sentenceId': 1, 'id': 1, 'tokens': [1, 2], 'root': 1}, 2: {'sentenceId': 1, 'id': 2, 'tokens': [3, 4], 'root': 3}, 3: {'sentenceId': 2, 'id': 3, 'tokens': [5, 6], 'root': 5}, 4: {'sentenceId': 2, 'id': 4, 'tokens': [7, 8], 'root': 7}}), ('sentences', {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 5, 'clauses': [1, 2], 'object': [1]}, 2: {'id': 2, 'tokenFrom': 5, 'tokenTo': 9, 'clauses': [3, 4], 'object': [5]}}), ('paragraphs', {1: {'id': 1, 'tokens': [1, 2, 3, 4]}, 2: {'id': 2, 'tokens': [5, 6, 7, 8]}}), ('dependencies', [{'arcs': {1: [{'governor': 2}], 2: [{'governor': 3}]}}, {'arcs': {9: [{'governor': 10}], 10: [{'governor': 11}]}}]), ('coreferences', [{'id': 1, 'representative': {'head': 1, 'tokens': [1, 2]}, 'referents': [{'head': 3, 'tokens': [3, 4]}]}, {'id': 2, 'representative': {'head': 2, 'tokens': [1, 2]}, 'referents': [{'head': 3, 'tokens': [3, 4]}]}, {'id': 3, 'representative': {'head': 5, 'tokens': [5, 6]}, 'referents': [{'head': 7, 'tokens': [7, 8]}]}, {'id': 4, 'representative': {'head': 6, 'tokens': [5, 6]}, 'referents': [{'head': 7, 'tokens': [7, 8]}]}]), ('constituents', [{'sentenceId': 1}, {'sentenceId': 2}]), ('expressions', {'id': 2, 'head': 5, 'tokens': [5]})])})])
+        expected = OrderedDict([('documents', {1: OrderedDict([('tokenList', {1: {'id': 1, 'text': 'a'}, 2: {'id': 2, 'text': 'b'}, 3: {'id': 3, 'text': 'c'}, 4: {'id': 4, 'text': 'd'}, 5: {'id': 5, 'text': 'a'}, 6: {'id': 6, 'text': 'b'}, 7: {'id': 7, 'text': 'c'}, 8: {'id': 8, 'text': 'd'}}), ('clauses', {1: {'sentenceId': 1, 'id': 1, 'tokens': [1, 2], 'root': 1}, 2: {'sentenceId': 1, 'id': 2, 'tokens': [3, 4], 'root': 3}, 3: {'sentenceId': 2, 'id': 3, 'tokens': [5, 6], 'root': 5}, 4: {'sentenceId': 2, 'id': 4, 'tokens': [7, 8], 'root': 7}}), ('sentences', {1: {'id': 1, 'tokenFrom': 1, 'tokenTo': 5, 'clauses': [1, 2], 'object': [1]}, 2: {'id': 2, 'tokenFrom': 5, 'tokenTo': 9, 'clauses': [3, 4], 'object': [5]}}), ('paragraphs', {1: {'id': 1, 'tokens': [1, 2, 3, 4]}, 2: {'id': 2, 'tokens': [5, 6, 7, 8]}}), ('dependencies', [{'arcs': {1: [{'governor': 2}], 2: [{'governor': 3}], 5: [{'governor': 6}], 6: [{'governor': 7}]}}]), ('coreferences', [{'id': 1, 'representative': {'head': 1, 'tokens': [1, 2]}, 'referents': [{'head': 3, 'tokens': [3, 4]}]}, {'id': 2, 'representative': {'head': 2, 'tokens': [1, 2]}, 'referents': [{'head': 3, 'tokens': [3, 4]}]}, {'id': 3, 'representative': {'head': 5, 'tokens': [5, 6]}, 'referents': [{'head': 7, 'tokens': [7, 8]}]}, {'id': 4, 'representative': {'head': 6, 'tokens': [5, 6]}, 'referents': [{'head': 7, 'tokens': [7, 8]}]}]), ('constituents', [{'sentenceId': 1}, {'sentenceId': 2}]), ('expressions', [{'id': 1, 'head': 1, 'tokens': [1]}, {'id': 2, 'head': 5, 'tokens': [5]}])])})])
         assert expected == actual, actual
 
     def test_extend_a_with_b_no_side_effects(self):
@@ -179,3 +256,122 @@ class TestUnification(TestCase):
         self.u.extend_a_with_b(a, b)
         assert a_copy == a, a
         assert b_copy == b, b
+
+    def test_unification_copy_on_write(self):
+        import copy
+        a = build_json()
+        b = build_json()
+        b['documents'][1]['tokenList'][1]['new'] = 1
+        b['documents'][1]['coreferences'][0]['referents'].append({'head': 4, 'tokens': [4]})
+        b['documents'][1]['coreferences'].append({'id': 1, 'representative': {'head': 4, 'tokens': [4]},
+                                                  'referents': []})
+        a_copy, b_copy = copy.deepcopy(a), copy.deepcopy(b)
+        for annotation in ('tokens', 'coreferences', 'expressions'):
+            self.u.add_annotation_to_a_from_b(a, b, annotation)
+            self.u.overwrite_annotation_from_a_with_b(a, b, annotation)
+        self.u.extend_a_with_b(a, b)
+        assert a_copy == a, a
+        assert b_copy == b, b
+
+        actual = self.u.add_annotation_to_a_from_b(a, b, 'tokens')['documents'][1]
+        assert actual is not a['documents'][1]
+        assert actual['tokenList'][1] is not a['documents'][1]['tokenList'][1]
+        assert actual['tokenList'][2] is a['documents'][1]['tokenList'][2]
+        assert actual['clauses'] is a['documents'][1]['clauses']
+
+        actual = self.u.add_annotation_to_a_from_b(a, b, 'coreferences')['documents'][1]
+        assert actual['coreferences'][0] is not a['documents'][1]['coreferences'][0]
+        assert actual['coreferences'][1] is a['documents'][1]['coreferences'][1]
+        assert 3 == actual['coreferences'][2]['id'], actual['coreferences']
+
+    def test_concatenate(self):
+        chunks = [build_json()['documents'][1] for _ in range(3)]
+        for chunk in chunks:
+            chunk['dependencies'][0]['arcs'][3] = [{'governor': 0, 'label': 'root', 'sentenceId': 1}]
+        actual = self.u.concatenate(chunks)
+        expected = self.u.extend_a_with_b(self.u.extend_a_with_b(chunks[0], chunks[1]), chunks[2])
+        assert expected == actual, actual
+        assert list(range(1, 13)) == list(actual['tokenList'].keys())
+        assert [1, 2, 3] == [s['id'] for s in actual['sentences'].values()]
+        assert [9, 10] == actual['clauses'][5]['tokens']
+        # one layer holding the arcs of all chunks
+        assert 1 == len(actual['dependencies'])
+        assert [{'governor': 0, 'label': 'root', 'sentenceId': 3}] == actual['dependencies'][0]['arcs'][11]
+        assert [{'governor': 10}] == actual['dependencies'][0]['arcs'][9]
+        assert [1, 2, 3, 5, 6, 7, 9, 10, 11] == list(actual['dependencies'][0]['arcs'])
+        assert [5, 6] == [c['id'] for c in actual['coreferences'][-2:]]
+        assert [11, 12] == actual['coreferences'][-1]['referents'][0]['tokens']
+        assert actual['tokenList'][1] is chunks[0]['tokenList'][1]
+        assert 1 == chunks[2]['tokenList'][1]['id']
+        with pytest.raises(UnificationError):
+            self.u.concatenate([])
+
+    def test_unify_parallel(self):
+        a = build_json()
+        b = build_json()
+        for d_id in (2, 3, 4):
+            a['documents'][d_id] = build_json()['documents'][1]
+            b['documents'][d_id] = build_json()['documents'][1]
+            b['documents'][d_id]['tokenList'][1]['new'] = d_id
+        del b['documents'][3]
+        b['documents'][5] = build_json()['documents'][1]
+        expected = self.u.add_annotation_to_a_from_b(a, b, 'tokens')
+        expected = self.u.add_annotation_to_a_from_b(expected, b, 'coreferences')
+        actual = self.u.unify_parallel(a, b, ['tokens', 'coreferences'], workers=2, chunksize=1)
+        assert expected == actual, actual
+        assert [1, 2, 3, 4] == list(actual['documents'].keys())
+        assert actual['documents'][3] is a['documents'][3]
+        assert expected == self.u.unify_parallel(a, b, ['tokens', 'coreferences'], workers=1)
+
+        a['documents'] = list(a['documents'].values())
+        for i, doc in enumerate(a['documents']):
+            doc['id'] = i + 1
+        actual = self.u.unify_parallel(a, b, ['tokens'], workers=2, method='overwrite')
+        assert [None, 2, None, 4] == [doc['tokenList'][1].get('new') for doc in actual['documents']]
+
+    def test_unify_parallel_no_annotations(self):
+        for method in ('add', 'overwrite'):
+            with pytest.raises(UnificationError, match='annotation'):
+                self.u.unify_parallel(build_json(), build_json(), workers=1, method=method)
+        with pytest.raises(UnificationError, match='supported'):
+            self.u.unify_parallel(build_json(), build_json(), [], workers=1, method='nonsense')
+        with pytest.raises(UnificationError, match='supported'):
+            self.u.unify_parallel(build_json(), build_json(), ['tokens'], workers=1, method='nonsense')
+
+    def test_stream(self):
+        a_docs = [build_json()['documents'][1] for _ in range(3)]
+        b_docs = [build_json()['documents'][1] for _ in range(3)]
+        for i, (doc_a, doc_b) in enumerate(zip(a_docs, b_docs)):
+            doc_a['id'] = doc_b['id'] = i + 1
+            doc_b['tokenList'][1]['new'] = i
+        del b_docs[1]
+        actual = list(self.u.stream(iter(a_docs), iter(b_docs), 'tokens'))
+        assert [1, 2, 3] == [doc['id'] for doc in actual]
+        assert [0, None, 2] == [doc['tokenList'][1].get('new') for doc in actual]
+
+    def test_stream_jsonl(self):
+        import json
+        import os
+        import tempfile
+        doc_a = build_json()['documents'][1]
+        doc_a['id'] = 1
+        doc_b = build_json()['documents'][1]
+        doc_b['id'] = 1
+        doc_b['expressions'].append({'id': 2, 'tokens': [2]})
+        with tempfile.TemporaryDirectory() as d:
+            for name, doc in (('a.jsonl', doc_a), ('b.jsonl', doc_b)):
+                with open(os.path.join(d, name), 'w') as f:
+                    f.write(json.dumps({'meta': {}}) + '\n' + json.dumps(doc) + '\n')
+            actual = list(self.u.stream(os.path.join(d, 'a.jsonl'), os.path.join(d, 'b.jsonl'), 'expressions'))
+        assert 1 == len(actual)
+        assert 3 == len(actual[0]['expressions'])
+        assert 'a' == actual[0]['tokenList'][1]['text']
+
+    def test_stream_unordered(self):
+        a_docs = [{'id': 2, 'tokenList': {}}, {'id': 1, 'tokenList': {}}]
+        with pytest.raises(UnificationError):
+            list(self.u.stream(a_docs, [], 'tokens'))
+        a_docs = [{'id': 1, 'tokenList': {}}, {'id': 2, 'tokenList': {}}, {'id': 3, 'tokenList': {}}]
+        b_docs = [{'id': 3, 'tokenList': {}}, {'id': 2, 'tokenList': {}}]
+        with pytest.raises(UnificationError):
+            list(self.u.stream(a_docs, b_docs, 'tokens'))
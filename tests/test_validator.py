@@ -3,6 +3,7 @@ from unittest import TestCase
 
 from jsonschema import ValidationError
 
+from pyjsonnlp.layers import LayerManifest
 from pyjsonnlp.pipeline import Pipeline
 from pyjsonnlp.validation import format_error, validate_pipeline, is_valid
 
@@ -13,6 +14,17 @@ class TestValidation(TestCase):
         assert not valid
         assert len(errors)
 
+    def test_is_valid_manifest(self):
+        j = MockValidPipeline().process()
+        j['documents'] = {0: j['documents']['1']}
+        manifest = LayerManifest()
+        assert is_valid(j, manifest)[0]
+        assert not manifest.is_dirty(j['documents'][0], 'validation')
+        assert is_valid(j, manifest)[0]
+        j['documents'][0]['tokenList'][1]['id'] = 'one'
+        assert not is_valid(j, manifest)[0]
+        assert manifest.is_dirty(j['documents'][0], 'validation')
+
     def test_validate_pipeline(self):
         assert not validate_pipeline(MockInvalidPipeline(), '')
         assert validate_pipeline(MockValidPipeline(), '')
@@ -0,0 +1,107 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+import pytest
+
+from pyjsonnlp import get_base, get_base_document
+from pyjsonnlp.dependencies import DependencyGraph
+from pyjsonnlp.unification import Unifier
+from pyjsonnlp.vocabulary import Vocabulary, get_vocabulary
+
+
+def fresh(s: str) -> str:
+    """An equal string that is not the same object"""
+    return ''.join(list(s))
+
+
+class TestVocabulary(TestCase):
+    def test_intern(self):
+        v = Vocabulary()
+        a, b = fresh('NOUN'), fresh('NOUN')
+        assert a is not b
+        assert v.intern(a) is v.intern(b)
+        assert v.intern(b) is sys.intern('NOUN')
+        assert 1 == len(v)
+        assert 'NOUN' in v
+        assert 7 == v.intern(7)
+
+    def test_codes(self):
+        v = Vocabulary(['NOUN', 'VERB'])
+        assert 0 == v.code('NOUN')
+        assert 2 == v.code('ADJ')
+        assert 'VERB' == v.symbol(1)
+        assert 3 == len(v)
+
+    def test_threads(self):
+        v = Vocabulary()
+        symbols = [f'TAG{i}' for i in range(50)]
+
+        def slow_intern(symbol):
+            # widen the window between looking a new symbol up and adding it
+            time.sleep(0.0005)
+            return sys.intern(symbol)
+
+        with mock.patch('pyjsonnlp.vocabulary.sys', SimpleNamespace(intern=slow_intern)):
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                codes = list(executor.map(lambda _: [v.code(fresh(s)) for s in symbols], range(8)))
+        # every thread got the same code for a symbol, and each symbol was added once
+        assert all(c == codes[0] for c in codes)
+        assert len(symbols) == len(v)
+        assert symbols == [v.symbol(c) for c in codes[0]]
+
+    def test_intern_document(self):
+        v = Vocabulary()
+        doc = get_base_document(1)
+        features = {fresh('Number'): fresh('Plur')}
+        doc['tokenList'] = [{'id': 1, 'text': 'cats', 'upos': fresh('NOUN'), 'features': features},
+                            {'id': 2, 'text': 'dogs', 'upos': fresh('NOUN'), 'features': {'Number': 'Plur'}}]
+        doc['dependencies'] = [{'style': fresh('universal'), 'arcs': {
+            1: [{'label': fresh('nsubj'), 'governor': 0, 'dependent': 1}]}}]
+        v.intern_document(doc)
+        assert doc['tokenList'][0]['upos'] is doc['tokenList'][1]['upos']
+        key_0, key_1 = next(iter(doc['tokenList'][0]['features'])), next(iter(doc['tokenList'][1]['features']))
+        assert key_0 is key_1
+        assert doc['tokenList'][0]['features'] is not features
+        assert doc['dependencies'][0]['arcs'][1][0]['label'] is sys.intern('nsubj')
+        assert 'universal' in v
+
+    def test_dependency_labels(self):
+        g = DependencyGraph({'arcs': {1: [{'label': fresh('compound'), 'governor': 2, 'dependent': 1}]}})
+        assert g.nodes[2][0].arc is sys.intern('compound')
+        assert g.heads[1][0].arc is get_vocabulary().intern('compound')
+
+    def test_unification(self):
+        a, b = get_base(), get_base()
+        doc_a, doc_b = get_base_document(1), get_base_document(1)
+        doc_a['tokenList'] = [{'id': 1, 'text': 'cats'}, {'id': 2, 'text': 'sleep'}]
+        doc_b['tokenList'] = [{'id': 1, 'text': 'cats', 'upos': fresh('NOUN')}, {'id': 2, 'text': 'sleep'}]
+        a['documents'].append(doc_a)
+        b['documents'].append(doc_b)
+        actual = Unifier.add_annotation_to_a_from_b(a, b, 'tokens')
+        assert actual['documents'][0]['tokenList'][0]['upos'] is sys.intern('NOUN')
+        assert actual['documents'][0]['tokenList'][1] is doc_a['tokenList'][1]
+
+    def test_max_size(self):
+        v = Vocabulary(['NOUN'], max_size=2)
+        assert v.intern(fresh('VERB')) is sys.intern('VERB')
+        # a full vocabulary interns new symbols without keeping them
+        assert v.intern(fresh('ADJ')) is sys.intern('ADJ')
+        assert 'ADJ' not in v
+        assert 2 == len(v)
+        assert 1 == v.code('VERB')
+        with pytest.raises(ValueError):
+            v.code('ADJ')
+        v.clear()
+        assert 0 == len(v)
+        assert 0 == v.code('ADJ')
+
+    def test_shared_vocabulary(self):
+        shared = get_vocabulary()
+        size = len(shared)
+        DependencyGraph({'arcs': {1: [{'label': 'nsubj:unseen', 'governor': 0, 'dependent': 1}]}})
+        assert 'nsubj:unseen' not in shared
+        assert size == len(shared)
+        assert shared.max_size is not None